@@ -0,0 +1,217 @@
+# aggregator.py
+"""
+เครื่องกลางรับ record จาก Pi หลายตัว (sync.py) เก็บลง SQLite เดียว ค้นหาตามป้าย / เวลา / Pi / กล้อง
+
+    python aggregator.py --db ./aggregator.db --port 8100 --token SECRET
+
+- POST /ingest   body = gzip JSON {"node": ..., "records": [...]} (ตัดซ้ำด้วย node + id ของ record บน Pi)
+- GET  /records  ?plate= &province= &node= &camera= &since= &until= &limit=
+- GET  /nodes    จำนวน record / record ล่าสุด / เวลาที่ส่งมาล่าสุดของแต่ละ Pi
+"""
+import argparse
+import gzip
+import io
+import json
+import threading
+import time
+from datetime import datetime
+from typing import Optional
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+from starlette.concurrency import run_in_threadpool
+
+from config import AGGREGATOR_DB_PATH, AGGREGATOR_PORT, AGGREGATOR_TOKEN, AGGREGATOR_MAX_BODY_BYTES
+from record_store import connect
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS records (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    node TEXT NOT NULL,
+    local_id INTEGER NOT NULL,
+    ts REAL NOT NULL,
+    plate TEXT NOT NULL,
+    province TEXT NOT NULL,
+    confidence REAL,
+    province_score REAL,
+    camera TEXT,
+    received REAL NOT NULL,
+    UNIQUE (node, local_id)
+);
+CREATE INDEX IF NOT EXISTS idx_agg_ts ON records (ts);
+CREATE INDEX IF NOT EXISTS idx_agg_plate_ts ON records (plate, ts);
+CREATE INDEX IF NOT EXISTS idx_agg_node_ts ON records (node, ts);
+CREATE TABLE IF NOT EXISTS nodes (
+    node TEXT PRIMARY KEY,
+    last_seen REAL NOT NULL,
+    last_local_id INTEGER NOT NULL,
+    batches INTEGER NOT NULL DEFAULT 0
+);
+"""
+
+
+class Aggregator:
+    """
+    Pi หลายตัวส่งพร้อมกันได้: request แต่ละตัวแปลง/ตรวจข้อมูลเองนอก lock
+    แล้วเขียนทีละ batch ใต้ lock เดียว (SQLite มี writer ได้ทีละตัว) / อ่านผ่าน WAL ไม่ต้องรอ
+    """
+
+    def __init__(self, path=AGGREGATOR_DB_PATH):
+        self.path = path
+        self._write_lock = threading.Lock()
+        self._conn = connect(path)
+        self._conn.executescript(SCHEMA)
+
+    def ingest(self, node, records):
+        """คืนค่า (accepted, duplicates)"""
+        now = time.time()
+        rows = [
+            (node, int(r["id"]), float(r["ts"]), str(r["plate"]), str(r["province"]),
+             r.get("confidence"), r.get("province_score"), r.get("camera"), now)
+            for r in records
+        ]
+        with self._write_lock, self._conn:
+            before = self._conn.total_changes
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO records "
+                "(node, local_id, ts, plate, province, confidence, province_score, camera, received) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+            accepted = self._conn.total_changes - before
+            self._conn.execute(
+                "INSERT INTO nodes (node, last_seen, last_local_id, batches) VALUES (?, ?, ?, 1) "
+                "ON CONFLICT(node) DO UPDATE SET last_seen = excluded.last_seen, "
+                "last_local_id = MAX(last_local_id, excluded.last_local_id), batches = batches + 1",
+                (node, now, max(r[1] for r in rows)),
+            )
+        return accepted, len(rows) - accepted
+
+    def query(self, plate=None, province=None, node=None, camera=None, since=None, until=None, limit=100):
+        where, args = [], []
+        for column, value in (("plate", plate), ("province", province), ("node", node), ("camera", camera)):
+            if value:
+                where.append(f"{column} = ?")
+                args.append(value)
+        if since is not None:
+            where.append("ts >= ?")
+            args.append(since)
+        if until is not None:
+            where.append("ts < ?")
+            args.append(until)
+
+        sql = "SELECT node, local_id, ts, plate, province, confidence, province_score, camera FROM records"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY ts DESC LIMIT ?"
+        args.append(limit)
+
+        conn = connect(self.path)
+        try:
+            rows = conn.execute(sql, args).fetchall()
+        finally:
+            conn.close()
+        records = []
+        for row in rows:
+            rec = dict(row)
+            rec["time"] = datetime.fromtimestamp(rec["ts"]).isoformat(timespec="seconds")
+            records.append(rec)
+        return records
+
+    def nodes(self):
+        conn = connect(self.path)
+        try:
+            rows = conn.execute(
+                "SELECT n.node, n.last_seen, n.last_local_id, n.batches, "
+                "(SELECT COUNT(*) FROM records r WHERE r.node = n.node) AS records, "
+                "(SELECT MAX(ts) FROM records r WHERE r.node = n.node) AS last_ts "
+                "FROM nodes n ORDER BY n.node"
+            ).fetchall()
+        finally:
+            conn.close()
+        return [dict(row) for row in rows]
+
+
+def create_app(path=AGGREGATOR_DB_PATH, token=AGGREGATOR_TOKEN):
+    app = FastAPI()
+    store = Aggregator(path)
+    app.state.store = store
+
+    def unauthorized(request):
+        return token and request.headers.get("authorization") != f"Bearer {token}"
+
+    @app.post("/ingest")
+    async def ingest(request: Request):
+        if unauthorized(request):
+            return JSONResponse({"error": "unauthorized"}, status_code=401)
+        # จำกัดขนาดตั้งแต่ตอนรับ (ก่อนเก็บทั้ง body ไว้ใน memory / ก่อน decompress)
+        too_large = JSONResponse({"error": "too_large"}, status_code=413)
+        try:
+            if int(request.headers.get("content-length", 0)) > AGGREGATOR_MAX_BODY_BYTES:
+                return too_large
+        except ValueError:
+            return JSONResponse({"error": "bad_request", "detail": "invalid Content-Length"}, status_code=400)
+        chunks = []
+        received = 0
+        async for chunk in request.stream():
+            received += len(chunk)
+            if received > AGGREGATOR_MAX_BODY_BYTES:
+                return too_large
+            chunks.append(chunk)
+        body = b"".join(chunks)
+        try:
+            if request.headers.get("content-encoding") == "gzip":
+                decoder = gzip.GzipFile(fileobj=io.BytesIO(body))
+                body = decoder.read(AGGREGATOR_MAX_BODY_BYTES + 1)
+            if len(body) > AGGREGATOR_MAX_BODY_BYTES:
+                return too_large
+            payload = json.loads(body)
+            node = str(payload["node"])
+            records = payload["records"]
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            return JSONResponse({"error": "bad_request", "detail": str(e)}, status_code=400)
+        if not records:
+            return {"accepted": 0, "duplicates": 0, "last_id": None}
+        try:
+            # เขียน SQLite ใน thread pool (ไม่บล็อก event loop ระหว่างรอ lock ของ writer)
+            accepted, duplicates = await run_in_threadpool(store.ingest, node, records)
+        except (KeyError, ValueError, TypeError) as e:
+            return JSONResponse({"error": "bad_record", "detail": str(e)}, status_code=400)
+        return {"accepted": accepted, "duplicates": duplicates, "last_id": max(int(r["id"]) for r in records)}
+
+    @app.get("/records")
+    def list_records(
+        plate: Optional[str] = None,
+        province: Optional[str] = None,
+        node: Optional[str] = None,
+        camera: Optional[str] = None,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+        limit: int = 100,
+    ):
+        return store.query(
+            plate=plate,
+            province=province,
+            node=node,
+            camera=camera,
+            since=since.timestamp() if since else None,
+            until=until.timestamp() if until else None,
+            limit=max(1, min(limit, 1000)),
+        )
+
+    @app.get("/nodes")
+    def list_nodes():
+        return store.nodes()
+
+    return app
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Central record aggregator for several LPR nodes")
+    parser.add_argument("--db", default=AGGREGATOR_DB_PATH)
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=AGGREGATOR_PORT)
+    parser.add_argument("--token", default=AGGREGATOR_TOKEN, help="require 'Authorization: Bearer TOKEN' on /ingest")
+    args = parser.parse_args()
+    uvicorn.run(create_app(args.db, args.token), host=args.host, port=args.port)
@@ -0,0 +1,117 @@
+# batch_scan.py
+"""
+อ่านป้ายจากภาพที่เก็บไว้ (ไม่ใช่จากกล้อง): YOLO ทีละ batch + OCR หลายภาพพร้อมกัน
+ผลของแต่ละภาพออกมาทันทีที่ OCR เสร็จ (ลำดับอาจไม่ตรงกับลำดับไฟล์ ดูจาก "index")
+
+ใช้ผ่าน POST /scan_batch ของ main.py หรือรันเป็น CLI กับโฟลเดอร์:
+    python batch_scan.py ./snapshots --batch 4 > results.ndjson
+"""
+import argparse
+import json
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from itertools import islice
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+from config import BATCH_DETECT_SIZE, BATCH_OCR_WORKERS
+from detector import detect_batch, results_to_detections, tuning
+from ocr import ocr_plates
+
+IMAGE_EXTS = {".jpg", ".jpeg", ".png", ".bmp"}
+
+
+def decode_image(data):
+    """bytes ของไฟล์ภาพ -> ภาพ BGR (None ถ้าไม่ใช่ภาพ)"""
+    return cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+
+
+def read_folder(folder):
+    """(name, bytes) ของภาพในโฟลเดอร์ เรียงตามชื่อ"""
+    for path in sorted(Path(folder).iterdir()):
+        if path.suffix.lower() in IMAGE_EXTS:
+            yield path.name, path.read_bytes()
+
+
+def _ocr(index, name, frame, detections):
+    """OCR ของภาพเดียว พังแค่ภาพนี้ ({"error": ...}) ภาพอื่นใน batch ยังได้ผลตามปกติ"""
+    try:
+        return index, name, detections, [data for _, data in ocr_plates(frame, detections)]
+    except Exception as e:
+        return index, name, detections, {"error": f"ocr failed: {type(e).__name__}: {e}"}
+
+
+def scan_images(items, batch_size=BATCH_DETECT_SIZE, ocr_workers=BATCH_OCR_WORKERS):
+    """
+    items = iterable ของ (name, bytes ของไฟล์ภาพ)
+    yield (index, name, detections, data) ต่อภาพ
+      data = [ผลของแต่ละป้ายจาก ocr_plates] / None ถ้าไม่เจอป้าย / {"error": ...} ถ้าอ่านไฟล์หรือ OCR ไม่ได้
+    ระหว่างที่ OCR ของ batch ก่อนยังทำอยู่ batch ถัดไปก็ detect ต่อได้เลย
+    """
+    items = iter(enumerate(items))
+    pending = set()
+    with ThreadPoolExecutor(max_workers=ocr_workers, thread_name_prefix="batch-ocr") as executor:
+        while True:
+            chunk = list(islice(items, batch_size))
+            if not chunk:
+                break
+
+            frames = []
+            for index, (name, data) in chunk:
+                frame = decode_image(data)
+                if frame is None:
+                    yield index, name, None, {"error": "unreadable image"}
+                else:
+                    frames.append((index, name, frame))
+
+            if frames:
+                # conf เดียวกับ /scan (DETECT_CONF หรือค่าที่ governor ปรับ) ผล batch กับ live จะได้ไม่ต่างกัน
+                results = detect_batch([f for _, _, f in frames], conf=tuning["conf"])
+                for (index, name, frame), detections in zip(frames, results_to_detections(results)):
+                    if detections is None:
+                        yield index, name, None, None
+                    else:
+                        pending.add(executor.submit(_ocr, index, name, frame, detections))
+
+            # ส่งผลที่เสร็จแล้วออกไปก่อน แล้วค่อย detect batch ถัดไป
+            done = {f for f in pending if f.done()}
+            pending -= done
+            for future in done:
+                yield future.result()
+
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield future.result()
+
+
+def result_record(index, name, detections, data):
+    """แปลงผลของภาพหนึ่งเป็น dict สำหรับ NDJSON"""
+    record = {"index": index, "file": name, "boxes": 0 if detections is None else len(detections)}
+    if data is None:
+        record.update(chars="ไม่พบอักษร", province="ไม่พบจังหวัด", plates=[])
+    elif isinstance(data, list):
+        # field บนสุด = ป้ายแรก (ใหญ่สุด) เหมือน /scan / ทุกป้ายอยู่ใน "plates"
+        record.update(data[0], plates=data)
+    else:
+        record.update(data)
+    return record
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Read plates from a folder of images, NDJSON to stdout")
+    parser.add_argument("folder")
+    parser.add_argument("--batch", type=int, default=BATCH_DETECT_SIZE, help="images per YOLO call")
+    parser.add_argument("--ocr-workers", type=int, default=BATCH_OCR_WORKERS)
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    count = 0
+    for result in scan_images(read_folder(args.folder), args.batch, args.ocr_workers):
+        print(json.dumps(result_record(*result), ensure_ascii=False), flush=True)
+        count += 1
+    elapsed = time.perf_counter() - started
+    print(f"{count} images in {elapsed:.2f} s ({count / elapsed if elapsed else 0:.2f} images/s)", file=sys.stderr)
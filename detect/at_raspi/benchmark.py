@@ -0,0 +1,203 @@
+# benchmark.py
+"""
+วัดความเร็ว/ความแม่นของ detect + OCR แบบ offline (ไม่ต้องมีกล้อง) ด้วย mockcamera
+
+usage:
+    python benchmark.py ./samples --labels ./samples/labels.csv --out bench.json
+    python benchmark.py ./clip.mp4 --limit 300 --baseline bench-old.json
+
+labels.csv: file,plate,province  (file = ชื่อไฟล์ภาพ หรือเลขเฟรมของวิดีโอ)
+"""
+import argparse
+import csv
+import json
+import platform
+import resource
+import subprocess
+import time
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+
+import mockcamera
+cameralow = mockcamera.install()
+
+import config
+from detector import detect_plate
+from ocr import ocr_plates
+
+STAGES = ["capture", "detect", "ocr", "total"]
+
+
+def load_labels(path):
+    with open(path, newline="", encoding="utf-8") as f:
+        return {row["file"].strip(): row for row in csv.DictReader(f)}
+
+
+def normalize_plate(text):
+    return "".join((text or "").split())
+
+
+def latency_summary(samples):
+    if not samples:
+        return {"count": 0}
+    ms = np.asarray(samples) * 1000
+    p50, p95, p99 = np.percentile(ms, [50, 95, 99])
+    return {
+        "count": len(samples),
+        "mean_ms": round(float(ms.mean()), 2),
+        "p50_ms": round(float(p50), 2),
+        "p95_ms": round(float(p95), 2),
+        "p99_ms": round(float(p99), 2),
+        "max_ms": round(float(ms.max()), 2),
+    }
+
+
+def peak_rss_mb():
+    # Linux: ru_maxrss เป็น KB
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=Path(__file__).parent, text=True, stderr=subprocess.DEVNULL
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(source, limit=None, warmup=3, labels=None):
+    times = {name: [] for name in STAGES}
+    frames = []
+    score = {"labelled": 0, "detected": 0, "plate": 0, "province": 0, "both": 0}
+
+    # รอบแรกของ backend มีการจอง memory / compile graph ไม่นับรวมในผล
+    cameralow.init_camera(source, fps=0, loop=False)
+    main, lores = cameralow.capture_frames()
+    for _ in range(warmup if main is not None else 0):
+        detections = detect_plate(main, lores)
+        if detections is not None:
+            ocr_plates(main, detections)
+    cameralow.close_camera()
+
+    cameralow.init_camera(source, fps=0, loop=False)
+    started = time.perf_counter()
+    while limit is None or len(frames) < limit:
+        t0 = time.perf_counter()
+        main, lores = cameralow.capture_frames()
+        if main is None:
+            break
+        name = cameralow.current_name
+        t1 = time.perf_counter()
+        detections = detect_plate(main, lores)
+        t2 = time.perf_counter()
+        # OCR ทุกป้ายในเฟรม (เวลา ocr รวมทุกป้าย) เทียบ label กับป้ายแรก = ป้ายใหญ่สุด
+        plates = ocr_plates(main, detections) if detections is not None else []
+        data = plates[0][1] if plates else None
+        t3 = time.perf_counter()
+
+        times["capture"].append(t1 - t0)
+        times["detect"].append(t2 - t1)
+        if data is not None:
+            times["ocr"].append(t3 - t2)
+        times["total"].append(t3 - t0)
+
+        result = {"file": name, "boxes": 0 if detections is None else len(detections), "plates": len(plates)}
+        if data is not None:
+            result.update(chars=data["chars"], province=data["province"], province_score=data["province_score"])
+
+        label = labels.get(name) if labels else None
+        if label is not None:
+            score["labelled"] += 1
+            plate_ok = data is not None and normalize_plate(data["chars"]) == normalize_plate(label["plate"])
+            province_ok = data is not None and data["province"] == label["province"].strip()
+            score["detected"] += data is not None
+            score["plate"] += plate_ok
+            score["province"] += province_ok
+            score["both"] += plate_ok and province_ok
+            result.update(plate_ok=plate_ok, province_ok=province_ok)
+        frames.append(result)
+    elapsed = time.perf_counter() - started
+    cameralow.close_camera()
+
+    report = {
+        "frames": len(frames),
+        "elapsed_s": round(elapsed, 3),
+        "fps": round(len(frames) / elapsed, 2) if elapsed > 0 else 0.0,
+        "stages": {name: latency_summary(times[name]) for name in STAGES},
+        "peak_rss_mb": peak_rss_mb(),
+    }
+    if labels:
+        n = max(score["labelled"], 1)
+        report["accuracy"] = dict(
+            score,
+            plate_acc=round(score["plate"] / n, 4),
+            province_acc=round(score["province"] / n, 4),
+            both_acc=round(score["both"] / n, 4),
+            detect_rate=round(score["detected"] / n, 4),
+        )
+    report["per_frame"] = frames
+    return report
+
+
+def compare(report, baseline):
+    """พิมพ์ผลต่างเทียบกับไฟล์ JSON ของเวอร์ชันก่อน (ค่าบวก = ช้าลง / แม่นขึ้น)"""
+    print(f"\nvs baseline {baseline.get('meta', {}).get('git')}:")
+    for name in STAGES:
+        old, new = baseline["stages"].get(name, {}), report["stages"][name]
+        if "p50_ms" in old and "p50_ms" in new:
+            print(f"  {name:8s} p50 {new['p50_ms'] - old['p50_ms']:+8.2f} ms   p95 {new['p95_ms'] - old['p95_ms']:+8.2f} ms")
+    print(f"  fps      {report['fps'] - baseline['fps']:+8.2f}")
+    print(f"  peak rss {report['peak_rss_mb'] - baseline['peak_rss_mb']:+8.1f} MB")
+    if "accuracy" in report and "accuracy" in baseline:
+        for key in ("plate_acc", "province_acc", "both_acc"):
+            print(f"  {key:12s} {report['accuracy'][key] - baseline['accuracy'][key]:+.4f}")
+
+
+def print_report(report):
+    print(f"\n{report['frames']} frames in {report['elapsed_s']} s  ->  {report['fps']} FPS, peak RSS {report['peak_rss_mb']} MB")
+    print(f"{'stage':8s} {'count':>6s} {'p50':>9s} {'p95':>9s} {'p99':>9s} {'max':>9s}")
+    for name, s in report["stages"].items():
+        if s["count"]:
+            print(f"{name:8s} {s['count']:6d} {s['p50_ms']:9.2f} {s['p95_ms']:9.2f} {s['p99_ms']:9.2f} {s['max_ms']:9.2f}")
+    if "accuracy" in report:
+        a = report["accuracy"]
+        print(f"accuracy ({a['labelled']} labelled): plate {a['plate_acc']:.2%}  province {a['province_acc']:.2%}  "
+              f"both {a['both_acc']:.2%}  detected {a['detect_rate']:.2%}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Offline detect + OCR benchmark (image folder or video file)")
+    parser.add_argument("source", help="folder of images or a video file")
+    parser.add_argument("--labels", default=None, help="CSV with columns file,plate,province")
+    parser.add_argument("--limit", type=int, default=None, help="stop after N frames")
+    parser.add_argument("--warmup", type=int, default=3, help="untimed inferences before measuring")
+    parser.add_argument("--out", default=None, help="write the JSON report here")
+    parser.add_argument("--baseline", default=None, help="previous JSON report to diff against")
+    parser.add_argument("--no-per-frame", action="store_true", help="omit per-frame results from the JSON")
+    args = parser.parse_args()
+
+    report = run(args.source, args.limit, args.warmup, load_labels(args.labels) if args.labels else None)
+    report["meta"] = {
+        "time": datetime.now().isoformat(timespec="seconds"),
+        "git": git_revision(),
+        "source": args.source,
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "detect_backend": config.DETECT_BACKEND,
+        "detect_int8": config.DETECT_INT8,
+        "detect_imgsz": config.DETECT_IMGSZ,
+        "lores_detection": config.USE_LORES_DETECTION,
+        "ocr_backend": config.OCR_BACKEND,
+    }
+    if args.no_per_frame:
+        del report["per_frame"]
+
+    print_report(report)
+    if args.baseline:
+        compare(report, json.loads(Path(args.baseline).read_text(encoding="utf-8")))
+    if args.out:
+        Path(args.out).write_text(json.dumps(report, indent=2, ensure_ascii=False), encoding="utf-8")
+        print(f"Report: {args.out}")
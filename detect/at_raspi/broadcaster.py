@@ -0,0 +1,107 @@
+# broadcaster.py
+import asyncio
+import itertools
+import threading
+
+
+def mjpeg_part(jpeg):
+    # มี Content-Length ให้ browser แสดงภาพได้ทันทีโดยไม่ต้องรอ boundary ถัดไป
+    return (b"--frame\r\n"
+            b"Content-Type: image/jpeg\r\n"
+            b"Content-Length: " + str(len(jpeg)).encode() + b"\r\n\r\n" + jpeg + b"\r\n")
+
+
+class StreamClient:
+    """ผู้ชม 1 คน: mailbox ช่องเดียว ถ้ายังส่งภาพเก่าไม่เสร็จ ภาพใหม่จะทับภาพที่รออยู่ (skip)"""
+
+    def __init__(self, client_id):
+        self.id = client_id
+        self.pending = None         # (seq, jpeg) ที่รอส่ง
+        self.event = asyncio.Event()
+        self.last_seq = 0
+        self.sent = 0
+        self.skipped = 0
+
+
+# -----------------------------
+# MJPEG Broadcaster
+# -----------------------------
+class MJPEGBroadcaster:
+    """
+    รับ JPEG จาก encoder ของกล้อง (thread ของ Picamera2) แล้วกระจายให้ผู้ชมทุกคนบน event loop
+    - ไม่ใช้ thread ต่อผู้ชม: ผู้ชมแต่ละคนเป็นแค่ async generator
+    - ผู้ชมที่ช้าจะข้ามเฟรมเอง ไม่ถ่วงคนอื่น
+    - ไม่มีเฟรมใหม่ (เช่นตอน Freeze) ก็ไม่ส่งซ้ำ ผู้ชมที่เข้ามาใหม่ได้ภาพล่าสุดครั้งเดียว
+    """
+
+    def __init__(self):
+        self._loop = None
+        self._clients = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._latest = None         # (seq, jpeg)
+        self._seq = 0
+        self._closed_sent = 0       # ยอดรวมของผู้ชมที่ปิดไปแล้ว (ให้ตัวนับรวมไม่ลดลง)
+        self._closed_skipped = 0
+
+    @property
+    def latest(self):
+        return self._latest
+
+    @property
+    def viewers(self):
+        return len(self._clients)
+
+    def publish(self, jpeg):
+        """เรียกจาก thread ไหนก็ได้ (เช่น FrameOutputWriter.write)"""
+        with self._lock:
+            self._seq += 1
+            self._latest = (self._seq, jpeg)
+        loop = self._loop
+        if loop is not None and self._clients:
+            loop.call_soon_threadsafe(self._deliver)
+
+    def _deliver(self):
+        frame = self._latest
+        for client in self._clients.values():
+            if frame[0] <= client.last_seq:
+                continue
+            if client.pending is not None:
+                client.skipped += 1
+            client.pending = frame
+            client.event.set()
+
+    async def stream(self):
+        """async generator ของ multipart MJPEG สำหรับผู้ชม 1 คน"""
+        if self._loop is None:
+            self._loop = asyncio.get_running_loop()
+
+        client = StreamClient(next(self._ids))
+        client.pending = self._latest
+        if client.pending is not None:
+            client.event.set()
+        self._clients[client.id] = client
+        try:
+            while True:
+                await client.event.wait()
+                client.event.clear()
+                frame, client.pending = client.pending, None
+                if frame is None or frame[0] <= client.last_seq:
+                    continue
+                client.last_seq = frame[0]
+                yield mjpeg_part(frame[1])
+                client.sent += 1
+        finally:
+            del self._clients[client.id]
+            self._closed_sent += client.sent
+            self._closed_skipped += client.skipped
+
+    def stats(self):
+        clients = list(self._clients.values())
+        return {
+            "seq": self._seq,
+            "viewers": len(clients),
+            "sent_total": self._closed_sent + sum(c.sent for c in clients),
+            "skipped_total": self._closed_skipped + sum(c.skipped for c in clients),
+            "clients": {c.id: {"sent": c.sent, "skipped": c.skipped} for c in clients},
+        }
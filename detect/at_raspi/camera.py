@@ -1,56 +1,41 @@
 # camera.py
-import cv2
+import sys
 import uvicorn
-from picamera2 import Picamera2
 from fastapi import FastAPI
 from fastapi.responses import StreamingResponse
 
-picam2 = None
+from config import CAMERAS
+from sources import open_camera
+
+camera = None
 app = FastAPI()
 
-def init_camera():
-    global picam2
-    picam2 = Picamera2()
-    # ตั้งค่า format เป็น RGB888 เพื่อคุณภาพสีที่ถูกต้อง
-    config = picam2.create_preview_configuration(
-        main={"format": "RGB888", "size": (1600, 1080)}
-    )
-    picam2.configure(config)
-    picam2.start()
-    picam2.set_controls({"AfMode": 2}) # Auto Focus
-    print("📷 Camera ready")
+def init_camera(camera_id=None):
+    """เปิดกล้องหนึ่งตัวจาก CAMERAS (None = ตัวแรก)"""
+    global camera
+    if camera is not None:
+        return
+    spec = next((s for s in CAMERAS if camera_id in (None, s["id"])), None)
+    if spec is None:
+        raise ValueError(f"Unknown camera {camera_id!r} (CAMERAS: {[s['id'] for s in CAMERAS]})")
+    camera = open_camera(spec)
+    camera.init_camera()
+    print(f"📷 Camera {spec['id']} ready")
 
 def capture_frame():
-    if picam2:
-        return picam2.capture_array()
+    if camera:
+        return camera.capture_frame()
     return None
 
 # --- ส่วนที่เพิ่มเข้ามา ---
 
-def generate_frames():
-    """ฟังก์ชัน Generator สำหรับแปลงภาพเป็น MJPEG Stream"""
-    while True:
-        frame = capture_frame()
-        if frame is None:
-            continue
-        
-        # แปลงภาพเป็น JPEG
-        ret, buffer = cv2.imencode('.jpg', frame)
-        if not ret:
-            continue
-            
-        frame_bytes = buffer.tobytes()
-        # ส่งข้อมูลภาพกลับไปในรูปแบบ Multipart Stream
-        yield (b'--frame\r\n'
-               b'Content-Type: image/jpeg\r\n\r\n' + frame_bytes + b'\r\n')
-
 @app.get("/")
 def video_feed():
     """Route สำหรับดู Preview"""
-    return StreamingResponse(generate_frames(), media_type="multipart/x-mixed-replace;boundary=frame")
+    return StreamingResponse(camera.broadcaster.stream(), media_type="multipart/x-mixed-replace;boundary=frame")
 
 if __name__ == "__main__":
-    # ทดสอบกล้อง Raspberry Pi ได้ที่ Port 8020
-    init_camera()
+    # python camera.py [camera id]
+    init_camera(sys.argv[1] if len(sys.argv) > 1 else None)
     print("🚀 Starting Preview Server at http://0.0.0.0:8020")
-    uvicorn.run(app, host="0.0.0.0", port=8020)
\ No newline at end of file
+    uvicorn.run(app, host="0.0.0.0", port=8020)
@@ -0,0 +1,215 @@
+# char_classifier.py
+"""
+จำแนกตัวอักษรบนป้ายทีละตัว (ก-ฮ, 0-9) จากกรอบ CHAR_CLASS_ID ของ YOLO ด้วย template matching (NumPy)
+- แต่ละ crop -> binarize (Otsu) -> ตัดขอบให้พอดีตัวอักษร -> ย่อเป็น 32x32 -> vector ความยาว 1
+- เทียบทุกตัวกับ template ทั้งหมดด้วย matrix multiply ครั้งเดียว (cosine similarity)
+- ตัวไหนคะแนนต่ำหรือห่างจากอันดับสองน้อยเกินไป ให้ run_ocr กลับไปใช้ Tesseract ทั้งบรรทัด
+
+สร้างไฟล์ template:
+    python char_classifier.py build --samples ./char_samples      (โฟลเดอร์ย่อยชื่อตามตัวอักษร เช่น char_samples/ก/*.png)
+    python char_classifier.py build --font ./fonts/THSarabunNew.ttf (เรนเดอร์จากฟอนต์ ถ้ายังไม่มีภาพจริง)
+    python char_classifier.py eval --samples ./char_samples_test
+"""
+import argparse
+import threading
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+from config import CHAR_TEMPLATES_PATH, CHAR_MIN_SIMILARITY, CHAR_MIN_MARGIN
+
+GLYPH_SIZE = 32
+CLASSES = [chr(c) for c in range(ord("ก"), ord("ฮ") + 1)] + [str(d) for d in range(10)]
+IMAGE_EXTS = {".jpg", ".jpeg", ".png", ".bmp"}
+
+
+def glyph_feature(gray, size=GLYPH_SIZE):
+    """crop เทา 1 ตัวอักษร -> vector (size*size,) ที่ normalize แล้ว (ไม่มีหมึกเลย = vector ศูนย์)"""
+    _, ink = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)   # ตัวอักษรเข้มบนพื้นสว่าง
+    ys, xs = np.nonzero(ink)
+    if ys.size == 0:
+        return np.zeros(size * size, np.float32)
+    ink = ink[ys.min():ys.max() + 1, xs.min():xs.max() + 1]
+
+    # วางลงกลางกรอบสี่เหลี่ยมจัตุรัส (คงสัดส่วน ตัวผอมอย่าง "1" จะไม่ถูกยืด)
+    h, w = ink.shape
+    side = max(h, w)
+    square = np.zeros((side, side), np.uint8)
+    square[(side - h) // 2:(side - h) // 2 + h, (side - w) // 2:(side - w) // 2 + w] = ink
+    return cv2.resize(square, (size, size), interpolation=cv2.INTER_AREA).astype(np.float32).ravel()
+
+
+def normalize(features):
+    features = features - features.mean(axis=1, keepdims=True)
+    norms = np.linalg.norm(features, axis=1, keepdims=True)
+    return features / np.maximum(norms, 1e-6)
+
+
+class CharClassifier:
+    """template ของทุก class เก็บเรียงตาม class (ใช้ reduceat หาคะแนนสูงสุดต่อ class ได้ในครั้งเดียว)"""
+
+    def __init__(self, features, labels, classes=CLASSES):
+        order = np.argsort(labels, kind="stable")
+        self.templates = normalize(np.asarray(features, np.float32)[order])
+        self.labels = np.asarray(labels)[order]
+        self.class_ids, self._starts = np.unique(self.labels, return_index=True)
+        self.classes = list(classes)
+
+    @classmethod
+    def load(cls, path=CHAR_TEMPLATES_PATH):
+        data = np.load(path, allow_pickle=False)
+        return cls(data["features"], data["labels"], [str(c) for c in data["classes"]])
+
+    def save(self, path):
+        np.savez_compressed(
+            path,
+            features=self.templates,
+            labels=self.labels,
+            classes=np.array(self.classes),
+        )
+
+    def classify(self, grays):
+        """
+        list ของ crop เทา -> (ตัวอักษร, similarity, margin) ของทุกตัวในครั้งเดียว
+        margin = คะแนน class อันดับหนึ่ง - อันดับสอง
+        """
+        features = normalize(np.stack([glyph_feature(g) for g in grays]))
+        sims = features @ self.templates.T                                  # (B, N)
+        per_class = np.maximum.reduceat(sims, self._starts, axis=1)         # (B, C)
+        top2 = np.argpartition(-per_class, 1, axis=1)[:, :2] if per_class.shape[1] > 1 else None
+        rows = np.arange(len(grays))
+        best = per_class.argmax(axis=1)
+        best_score = per_class[rows, best]
+        if top2 is None:
+            margin = best_score
+        else:
+            second = np.where(top2[:, 0] == best, top2[:, 1], top2[:, 0])
+            margin = best_score - per_class[rows, second]
+        labels = [self.classes[self.class_ids[i]] for i in best]
+        return labels, best_score, margin
+
+    def read(self, grays, min_similarity=CHAR_MIN_SIMILARITY, min_margin=CHAR_MIN_MARGIN):
+        """
+        คืนค่า (ข้อความ, ความมั่นใจต่ำสุด) หรือ (None, ความมั่นใจต่ำสุด) ถ้ามีตัวใดไม่มั่นใจพอ
+        (ให้ผู้เรียก fallback ไป Tesseract)
+        """
+        if not grays:
+            return None, 0.0
+        labels, scores, margins = self.classify(grays)
+        confidence = float(scores.min())
+        if confidence < min_similarity or float(margins.min()) < min_margin:
+            return None, confidence
+        return "".join(labels), confidence
+
+
+_classifier = None
+_classifier_lock = threading.Lock()
+_classifier_missing = False
+
+
+def get_classifier():
+    """โหลด template ครั้งแรกที่ใช้ ถ้าไม่มีไฟล์คืนค่า None (run_ocr ใช้ Tesseract อย่างเดียวแบบเดิม)"""
+    global _classifier, _classifier_missing
+    if _classifier is not None or _classifier_missing:
+        return _classifier
+    with _classifier_lock:
+        if _classifier is None and not _classifier_missing:
+            if Path(CHAR_TEMPLATES_PATH).exists():
+                _classifier = CharClassifier.load(CHAR_TEMPLATES_PATH)
+                print(f"Char classifier: {len(_classifier.templates)} templates, {len(_classifier.class_ids)} classes")
+            else:
+                _classifier_missing = True
+                print(f"Char classifier disabled ({CHAR_TEMPLATES_PATH} not found)")
+    return _classifier
+
+
+# -----------------------------
+# สร้าง / ทดสอบ template
+# -----------------------------
+def load_samples(folder):
+    """โฟลเดอร์ย่อยชื่อตาม class -> (list ของภาพเทา, list ของ class id)"""
+    grays, labels = [], []
+    for sub in sorted(Path(folder).iterdir()):
+        if not sub.is_dir() or sub.name not in CLASSES:
+            continue
+        for path in sorted(sub.iterdir()):
+            if path.suffix.lower() in IMAGE_EXTS:
+                grays.append(cv2.imread(str(path), cv2.IMREAD_GRAYSCALE))
+                labels.append(CLASSES.index(sub.name))
+    return grays, labels
+
+
+def render_font(font_path, variants=6, seed=0):
+    """เรนเดอร์ทุก class จากฟอนต์ + ดัดแปลงเล็กน้อย (ขนาดเส้น / หมุน / เบลอ) ใช้เริ่มต้นก่อนมีภาพจริง"""
+    from PIL import Image, ImageDraw, ImageFont
+    rng = np.random.default_rng(seed)
+    font = ImageFont.truetype(str(font_path), 64)
+    grays, labels = [], []
+    for class_id, char in enumerate(CLASSES):
+        canvas = Image.new("L", (128, 128), 255)
+        ImageDraw.Draw(canvas).text((24, 16), char, font=font, fill=0)
+        base = np.asarray(canvas)
+        for v in range(variants):
+            img = base
+            if v:
+                m = cv2.getRotationMatrix2D((64, 64), rng.uniform(-6, 6), rng.uniform(0.9, 1.1))
+                img = cv2.warpAffine(img, m, (128, 128), borderValue=255)
+                kernel = np.ones((3, 3), np.uint8)
+                img = cv2.erode(img, kernel) if v % 3 == 1 else cv2.dilate(img, kernel) if v % 3 == 2 else img
+                img = cv2.GaussianBlur(img, (3, 3), 0)
+            grays.append(img)
+            labels.append(class_id)
+    return grays, labels
+
+
+def _build(args):
+    grays, labels = [], []
+    if args.samples:
+        g, l = load_samples(args.samples)
+        grays += g
+        labels += l
+    if args.font:
+        g, l = render_font(args.font)
+        grays += g
+        labels += l
+    if not grays:
+        raise SystemExit("Need --samples and/or --font")
+    features = np.stack([glyph_feature(g) for g in grays])
+    classifier = CharClassifier(features, labels)
+    classifier.save(args.out)
+    print(f"{len(grays)} templates, {len(classifier.class_ids)}/{len(CLASSES)} classes -> {args.out}")
+
+
+def _eval(args):
+    classifier = CharClassifier.load(args.templates)
+    grays, labels = load_samples(args.samples)
+    if not grays:
+        raise SystemExit(f"No samples in {args.samples}")
+    started = time.perf_counter()
+    predicted, scores, margins = classifier.classify(grays)
+    elapsed = time.perf_counter() - started
+    truth = [CLASSES[i] for i in labels]
+    confident = (scores >= CHAR_MIN_SIMILARITY) & (margins >= CHAR_MIN_MARGIN)
+    correct = np.array([p == t for p, t in zip(predicted, truth)])
+    print(f"{len(grays)} chars in {elapsed * 1000:.1f} ms ({elapsed / len(grays) * 1e6:.0f} us/char)")
+    print(f"accuracy {correct.mean():.2%}  confident {confident.mean():.2%}  "
+          f"accuracy when confident {correct[confident].mean() if confident.any() else 0:.2%}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Template classifier for single plate characters")
+    sub = parser.add_subparsers(dest="command", required=True)
+    build = sub.add_parser("build", help="build the template file")
+    build.add_argument("--samples", default=None, help="folder of <char>/*.png crops")
+    build.add_argument("--font", default=None, help="Thai TTF font to render templates from")
+    build.add_argument("--out", default=CHAR_TEMPLATES_PATH)
+    ev = sub.add_parser("eval", help="accuracy and speed on labelled crops")
+    ev.add_argument("--samples", required=True)
+    ev.add_argument("--templates", default=CHAR_TEMPLATES_PATH)
+    args = parser.parse_args()
+    if args.command == "build":
+        _build(args)
+    else:
+        _eval(args)
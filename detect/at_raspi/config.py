@@ -8,4 +8,158 @@ TESSERACT_PROVINCE_CONFIG = "--psm 6 -l tha"
 CHAR_CLASS_ID = 0
 PROVINCE_CLASS_ID = 1
 
-LOG_PATH = "/home/f11man/project-os/logs"
\ No newline at end of file
+LOG_PATH = "/home/f11man/project-os/logs"
+
+# Inference worker (main.py)
+INFERENCE_QUEUE_SIZE = 4     # จำนวนงาน /scan ที่รอคิวได้สูงสุด ก่อนตอบกลับว่า busy
+
+# Auto-scan pipeline (capture -> detect -> OCR)
+AUTO_SCAN = False            # True = เริ่ม pipeline อัตโนมัติตอน start service
+PIPELINE_QUEUE_SIZE = 2      # ขนาดคิวระหว่าง stage (เต็มแล้วทิ้งภาพเก่าสุด)
+PIPELINE_OCR_QUEUE_SIZE = 8  # คิวของ track ที่รอ OCR (เต็มแล้ว detect รอ ไม่ทิ้ง track)
+PIPELINE_RING_SLOTS = 8      # จำนวน slot ของ FrameRing (shared memory) ระหว่าง capture กับ detect
+PIPELINE_REPORT_SECONDS = 30 # พิมพ์ throughput ของแต่ละ stage ทุกกี่วินาที (0 = ปิด)
+PIPELINE_DRAIN_SECONDS = 30  # ตอน stop รอ OCR track ที่ค้างให้เสร็จนานสุดกี่วินาที
+PIPELINE_DEDUP_SECONDS = 10  # ป้ายเดิมซ้ำภายในเวลานี้จะไม่บันทึก Log ซ้ำ
+
+# OCR backend
+OCR_BACKEND = "auto"         # "auto" | "tesserocr" (C API, engine ค้างไว้) | "pytesseract" (fork ทุกครั้ง)
+OCR_POOL_SIZE = 2            # จำนวน engine ต่อ config (char / province อ่านพร้อมกันได้)
+TESSDATA_PATH = None         # โฟลเดอร์ tessdata (None = ใช้ค่า default ของ tesseract)
+
+# Province matcher
+PROVINCE_MIN_SCORE = 0.4     # คะแนนขั้นต่ำที่ยอมรับว่าเป็นจังหวัดนั้น (ต่ำกว่านี้ไม่บันทึก Log)
+PROVINCE_TOP_K = 3           # จำนวนจังหวัดที่ใกล้เคียงที่สุดที่ส่งกลับพร้อมคะแนน
+PROVINCE_CACHE_SIZE = 512    # LRU cache ของข้อความดิบจาก OCR
+
+# Record store (SQLite)
+RECORD_DB_PATH = LOG_PATH + "/records.db"
+RECORD_BATCH_SIZE = 50       # จำนวน record สูงสุดต่อ transaction
+RECORD_FLUSH_SECONDS = 0.5   # รอรวม batch นานสุดกี่วินาที
+LOG_EXPORT_TEXT = True       # เขียนไฟล์ record-LPR-of-*.log รายวันแบบเดิมด้วย
+SAVE_CROPS = False           # เก็บภาพป้ายที่อ่านได้ไว้อ้างอิงกับ record
+CROP_DIR = LOG_PATH + "/crops"
+
+# Plate tracker (pipeline)
+TRACK_IOU_THRESHOLD = 0.3    # IoU ขั้นต่ำที่ถือว่าเป็นป้ายเดิม
+TRACK_CENTROID_RATIO = 0.75  # ถ้า IoU ไม่ถึง ใช้ระยะ centroid / เส้นทแยงกรอบ ไม่เกินค่านี้
+TRACK_TIMEOUT_SECONDS = 1.0  # ป้ายหายไปนานเกินนี้ถือว่า track จบ (ส่ง OCR + บันทึก)
+TRACK_OCR_FRAMES = 3         # จำนวนภาพที่คมที่สุดต่อ track ที่จะ OCR แล้วโหวต
+TRACK_MIN_HITS = 2           # track ที่เห็นน้อยกว่านี้ถือว่าเป็น noise
+
+# Detector backend
+DETECT_BACKEND = "ultralytics"   # "ultralytics" (.pt) | "onnxruntime" (.onnx) | "openvino" (.xml)
+DETECT_INT8 = False              # onnxruntime: ใช้โมเดล INT8 ที่ quantize แล้ว
+DETECT_THREADS = 4               # จำนวน thread ของ backend (Pi 5 มี 4 core)
+DETECT_IMGSZ = 640
+DETECT_IOU = 0.7
+DETECT_CONF = 0.5                # confidence ขั้นต่ำของกรอบที่ส่งต่อให้ OCR (detect_plate)
+ONNX_MODEL_PATH = MODEL_PATH.replace(".pt", ".onnx")
+ONNX_INT8_MODEL_PATH = MODEL_PATH.replace(".pt", "-int8.onnx")
+OPENVINO_MODEL_PATH = MODEL_PATH.replace(".pt", "_openvino_model/seperate-v8s.xml")
+
+# Camera streams (cameralow.py)
+MAIN_SIZE = (1280, 720)          # ภาพเต็มสำหรับ crop ป้ายให้ OCR + MJPEG stream
+LORES_SIZE = (640, 360)          # ภาพเล็กสำหรับ YOLO (สัดส่วนเดียวกับ main)
+LORES_FORMAT = "RGB888"          # Pi 5 ใช้ RGB ได้ / Pi 4 ต้องเป็น "YUV420"
+USE_LORES_DETECTION = True       # False = detect บนภาพ main แบบเดิม
+
+# Events (/events: Server-Sent Events)
+EVENTS_QUEUE_SIZE = 32           # event ที่ค้างต่อหน้าจอ ถ้าเกินทิ้งอันเก่าสุด
+EVENTS_KEEPALIVE_SECONDS = 15    # ส่ง comment กันการเชื่อมต่อเงียบจนถูกตัด
+EVENTS_HEALTH_SECONDS = 5        # ส่งสถานะ pipeline ทุกกี่วินาที
+
+# Mock camera (mockcamera.py: benchmark / ทดสอบโดยไม่มี Picamera2)
+MOCK_CAMERA_SOURCE = None        # โฟลเดอร์ภาพ หรือไฟล์วิดีโอ
+MOCK_CAMERA_FPS = 0              # > 0 = เล่นภาพเข้า MJPEG stream เองตาม fps นี้
+MOCK_CAMERA_LOOP = True          # เล่นวนเมื่อภาพหมด
+MOCK_CAMERA_PRELOAD = False      # โฟลเดอร์: เตรียมภาพ + JPEG ไว้ใน memory (ไม่มีงาน encode ระหว่างเล่น เหมือน hardware encoder)
+
+# Batch scan (/scan_batch + batch_scan.py)
+BATCH_DETECT_SIZE = 4            # จำนวนภาพต่อการเรียก YOLO 1 ครั้ง
+BATCH_OCR_WORKERS = 2            # จำนวนภาพที่ OCR พร้อมกัน
+BATCH_MAX_FILES = 200            # จำนวนไฟล์สูงสุดต่อ request
+
+# Char classifier (char_classifier.py: อ่านตัวอักษรทีละตัวแทน Tesseract)
+CHAR_CLASSIFIER = True           # False = ใช้ Tesseract ทั้งบรรทัดแบบเดิม
+CHAR_TEMPLATES_PATH = MODEL_PATH.rsplit("/", 1)[0] + "/char_templates.npz"
+CHAR_MIN_SIMILARITY = 0.6        # cosine similarity ต่ำสุดของทุกตัว ไม่ถึงให้ใช้ Tesseract
+CHAR_MIN_MARGIN = 0.05           # ห่างจาก class อันดับสองอย่างน้อยเท่านี้
+
+# OCR cache (ocr_cache.py: ไม่ต้อง OCR crop ที่เกือบเหมือนเดิมซ้ำ)
+OCR_CACHE = True
+OCR_CACHE_MAX_ENTRIES = 4096
+OCR_CACHE_MAX_BYTES = 2 * 1024 * 1024   # memory โดยประมาณของ entry (ไม่รวม hash array คงที่ 64 B ต่อ slot)
+OCR_CACHE_TTL_SECONDS = 600
+OCR_CACHE_HASH_GRID = (32, 8)          # dHash แนวนอน + แนวตั้ง 32x8 = 512 bit
+OCR_CACHE_MAX_DISTANCE = 6              # bit ที่ต่างกันได้ (noise ~3 bit / ตัวอักษรต่าง 1 ตัว ~14 bit ขึ้นไป)
+
+# Motion gate (motion.py: ข้าม YOLO ของ auto-scan เมื่อฉากไม่เปลี่ยน)
+MOTION_GATE = True
+MOTION_SIZE = (64, 36)           # ขนาดภาพเทาที่ใช้เทียบ
+MOTION_ALPHA = 0.05              # ความเร็วที่พื้นหลังปรับตามฉาก (ต่อเฟรม)
+MOTION_PIXEL_THRESHOLD = 15      # ต่างจากพื้นหลังเกินกี่ระดับสีเทาถึงนับว่าเปลี่ยน
+MOTION_ON_RATIO = 0.01           # สัดส่วน pixel ที่เปลี่ยน เพื่อเริ่ม detect
+MOTION_OFF_RATIO = 0.004         # ต่ำกว่านี้นาน MOTION_HOLD_SECONDS จึงหยุด detect
+MOTION_HOLD_SECONDS = 1.0
+MOTION_REFRESH_SECONDS = 5.0     # บังคับ detect อย่างน้อยทุกกี่วินาทีแม้ฉากนิ่ง
+
+# Cameras (sources.py: หลายกล้องต่อ service เช่นช่องเข้า / ช่องออก ใช้โมเดลและ OCR pool ชุดเดียวกัน)
+# source: "cameralow" = กล้อง CSI หลักผ่าน cameralow.py (mockcamera แทนได้)
+#         "picamera2" = กล้อง CSI ตัวอื่น (camera_num) / "opencv" = uri เป็นเลข /dev/video, rtsp://..., ไฟล์วิดีโอ
+#         "folder" = uri เป็นโฟลเดอร์ภาพ (fps = ความเร็วที่เล่น)
+# กล้องตัวแรกคือกล้อง default ของ endpoint ที่ไม่ระบุ ?camera=
+CAMERAS = [
+    {"id": "cam0", "label": "กล้องหลัก", "source": "cameralow"},
+    # {"id": "exit", "label": "ช่องออก", "source": "opencv", "uri": "rtsp://192.168.1.20:554/stream1"},
+]
+CAMERA_STREAM_FPS = 15           # fps สูงสุดของ MJPEG ที่ encode เอง (source ที่ไม่มี hardware encoder)
+CAMERA_RECONNECT_SECONDS = 2.0   # กล้อง USB / RTSP หลุด รอเท่านี้แล้วเปิดใหม่
+
+# Record sync (sync.py: ส่ง record ขึ้นเครื่องกลาง aggregator.py / ไม่อยู่บน path ของการ scan)
+SYNC_URL = None                  # เช่น "http://192.168.1.10:8100" (None = ไม่ sync)
+SYNC_NODE_ID = None              # ชื่อของ Pi ตัวนี้ใน aggregator (None = hostname)
+SYNC_TOKEN = None                # ต้องตรงกับ AGGREGATOR_TOKEN ถ้าตั้งไว้
+SYNC_BATCH_SIZE = 200            # record สูงสุดต่อการ upload 1 ครั้ง (gzip JSON)
+SYNC_INTERVAL_SECONDS = 2.0      # ตรวจ record ใหม่ทุกกี่วินาที
+SYNC_TIMEOUT_SECONDS = 10.0
+SYNC_RETRY_SECONDS = 2.0         # upload ไม่สำเร็จ รอเริ่มต้นเท่านี้ แล้วเพิ่มเท่าตัวทุกครั้งที่ล้มเหลวซ้ำ
+SYNC_MAX_BACKOFF_SECONDS = 300.0
+
+# Aggregator (aggregator.py: เครื่องกลางรับ record จาก Pi หลายตัว)
+AGGREGATOR_DB_PATH = "./aggregator.db"
+AGGREGATOR_PORT = 8100
+AGGREGATOR_TOKEN = None          # ตั้งไว้ = ต้องส่ง Authorization: Bearer <token>
+AGGREGATOR_MAX_BODY_BYTES = 16 * 1024 * 1024   # ขนาดสูงสุดหลัง gunzip ต่อ request
+
+# Multi-plate (ocr.split_plates: แยกกรอบตัวอักษร/จังหวัดของหลายป้ายในเฟรมเดียว)
+PLATE_X_MARGIN = 0.3             # ตัวอักษรเลยขอบซ้าย/ขวาของกรอบจังหวัดได้กี่เท่าของความกว้างกรอบจังหวัด
+PLATE_Y_REACH = 2.5              # จุดกลางตัวอักษรอยู่เหนือขอบบนกรอบจังหวัดได้ไม่เกินกี่เท่าของความสูงตัวอักษร
+CHAR_GAP_RATIO = 1.2             # ตัวอักษรที่ไม่มีกรอบจังหวัด: ห่างกันได้ไม่เกินกี่เท่าของความสูงตัวอักษร
+
+# Performance governor (governor.py: ลดภาระเมื่อ Pi ร้อน / CPU เต็ม / latency เกิน แล้วค่อยคืนเมื่อปกติ)
+# level 0 = ค่าปกติ ยิ่ง level สูงยิ่งเบา (ขยับทีละ 1 level)
+# stream_fps None = ค่าเดิมของกล้อง / imgsz ไม่มีผลกับโมเดล export แบบ static shape (onnx / openvino)
+GOVERNOR_ENABLED = True
+GOVERNOR_LEVELS = [
+    {"imgsz": DETECT_IMGSZ, "conf": DETECT_CONF, "stream_fps": None, "ocr_workers": OCR_POOL_SIZE},
+    {"imgsz": 512, "conf": DETECT_CONF, "stream_fps": 10, "ocr_workers": OCR_POOL_SIZE},
+    {"imgsz": 416, "conf": 0.55, "stream_fps": 8, "ocr_workers": 1},
+    {"imgsz": 320, "conf": 0.6, "stream_fps": 5, "ocr_workers": 1},
+]
+GOVERNOR_INTERVAL_SECONDS = 5.0
+GOVERNOR_BUDGET_SECONDS = {"detect": 0.35, "ocr": 0.25}   # latency เฉลี่ยต่อครั้งในแต่ละรอบ (ocr = ต่อ crop)
+GOVERNOR_RECOVER_RATIO = 0.6     # latency ต้องต่ำกว่า budget x เท่านี้ถึงจะนับว่าว่างพอจะเพิ่มคุณภาพกลับ
+GOVERNOR_CPU_HIGH = 0.90         # สัดส่วน CPU ที่ใช้ (ทุก core) ที่ถือว่าเต็ม
+GOVERNOR_CPU_LOW = 0.70
+GOVERNOR_TEMP_HIGH = 75.0        # °C (Pi 5 เริ่ม throttle ที่ 80-85)
+GOVERNOR_TEMP_LOW = 68.0
+GOVERNOR_RECOVER_TICKS = 6       # ต้องปกติติดกันกี่รอบถึงจะขึ้น 1 level (กันสลับไปมา)
+GOVERNOR_THERMAL_PATH = "/sys/class/thermal/thermal_zone0/temp"   # ทดสอบ: ชี้ไปไฟล์ที่เขียนค่าเอง (มิลลิองศา)
+GOVERNOR_CPU_STAT_PATH = "/proc/stat"
+
+# Frame results (frame_results.py: ผล detect / OCR / ภาพวาดกรอบ ต่อเฟรม ใช้ร่วมกันทุก endpoint)
+RESULT_CACHE_FRAMES = 8          # จำนวนเฟรมที่เก็บผลไว้ (ทุกกล้องรวมกัน แต่ละเฟรมถือภาพ main ไว้ ~2.7 MB)
+RESULT_REUSE_SECONDS = 0.3       # ภาพสด: request ที่ตามมาภายในเวลานี้ใช้เฟรม (และผล) เดียวกับ request ก่อนหน้า
+OVERLAY_FPS = 5                  # fps ของ /video_feed?overlay=1 (วาดกรอบล่าสุดทับ JPEG ของกล้อง ไม่รัน YOLO เอง)
+OVERLAY_MAX_AGE_SECONDS = 2.0    # กรอบที่เก่ากว่านี้ไม่วาด (รถออกไปแล้ว)
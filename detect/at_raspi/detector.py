@@ -1,16 +1,136 @@
 # detector.py
-from ultralytics import YOLO
-from config import MODEL_PATH
-
-print("Loading YOLO model...")
-model = YOLO(MODEL_PATH)
-
-def detect(frame, conf=0.4):
-    return model.predict(
-        frame,
-        conf=conf,
-        iou=0.7,
-        imgsz=640,
-        verbose=False,
-        device="cpu"
-    )
+import threading
+import time
+
+import numpy as np
+
+from config import (
+    MODEL_PATH,
+    ONNX_MODEL_PATH,
+    ONNX_INT8_MODEL_PATH,
+    OPENVINO_MODEL_PATH,
+    DETECT_BACKEND,
+    DETECT_INT8,
+    DETECT_THREADS,
+    DETECT_IMGSZ,
+    DETECT_IOU,
+    DETECT_CONF,
+    MAIN_SIZE,
+    LORES_SIZE,
+    USE_LORES_DETECTION,
+)
+from detector_backends import create_backend, boxes_array
+from dualstream import scale_detections, frame_size
+from metrics import DETECT_SECONDS, DETECT_FRAME_SECONDS
+
+# ไฟล์โมเดลของแต่ละ backend (สร้างด้วย detect/export_model.py)
+MODEL_FILES = {
+    "ultralytics": MODEL_PATH,
+    "onnxruntime": ONNX_INT8_MODEL_PATH if DETECT_INT8 else ONNX_MODEL_PATH,
+    "openvino": OPENVINO_MODEL_PATH,
+}
+
+# โหลดโมเดลตอนใช้ครั้งแรก (import detector ไม่ต้องรอ PyTorch / โหลด weight)
+# main.py สั่ง load_model() ใน background ตอน startup ให้พร้อมก่อน scan แรก
+backend = None
+model_lock = threading.Lock()   # /scan worker กับ pipeline ใช้โมเดลเดียวกัน ห้าม predict พร้อมกัน
+_load_lock = threading.Lock()
+_status = {"state": "idle", "backend": DETECT_BACKEND, "load_seconds": None, "warmup_seconds": None, "error": None}
+# ค่าที่ governor ปรับได้ระหว่างทำงาน (อ่านทุกครั้งที่ detect)
+tuning = {"imgsz": DETECT_IMGSZ, "conf": DETECT_CONF}
+
+def set_tuning(**values):
+    """เช่น set_tuning(imgsz=416) มีผลกับ detect ครั้งถัดไป"""
+    unknown = set(values) - set(tuning)
+    if unknown:
+        raise ValueError(f"unknown detector setting(s): {sorted(unknown)}")
+    tuning.update(values)
+
+def get_backend():
+    """คืนค่า backend ที่โหลดแล้ว (thread แรกที่เรียกเป็นคนโหลด thread อื่นรอ)"""
+    global backend
+    if backend is not None:
+        return backend
+    with _load_lock:
+        if backend is None:
+            _status["state"] = "loading"
+            print(f"Loading YOLO model ({DETECT_BACKEND})...")
+            started = time.perf_counter()
+            try:
+                loaded = create_backend(DETECT_BACKEND, MODEL_FILES[DETECT_BACKEND], DETECT_THREADS)
+            except Exception as e:
+                _status.update(state="error", error=str(e))
+                raise
+            _status["load_seconds"] = round(time.perf_counter() - started, 3)
+            backend = loaded
+    return backend
+
+def load_model(warmup=True):
+    """
+    โหลดโมเดล + รัน inference ทิ้งบนภาพว่าง 1 ครั้ง (จอง memory / สร้าง graph ให้เสร็จก่อนงานจริง)
+    เรียกซ้ำได้ ทำจริงแค่ครั้งแรก
+    """
+    try:
+        get_backend()
+        if warmup and _status["warmup_seconds"] is None:
+            w, h = LORES_SIZE if USE_LORES_DETECTION else MAIN_SIZE
+            started = time.perf_counter()
+            detect(np.zeros((h, w, 3), np.uint8), warmup=True)
+            _status["warmup_seconds"] = round(time.perf_counter() - started, 3)
+    except Exception as e:
+        _status.update(state="error", error=str(e))
+        print(f"YOLO model failed to load: {e}")
+        return False
+    _status["state"] = "ready"
+    print(f"YOLO model ready (load {_status['load_seconds']} s, warm-up {_status['warmup_seconds']} s)")
+    return True
+
+def class_names():
+    """class_id -> ชื่อ (ว่างถ้ายังไม่ได้โหลดโมเดล)"""
+    return getattr(backend, "names", None) or {}
+
+def is_ready():
+    return _status["state"] == "ready"
+
+def model_status():
+    return dict(_status)
+
+def _predict(frames, conf, warmup=False):
+    """
+    เรียก backend 1 ครั้ง DETECT_SECONDS = เวลาต่อครั้ง, DETECT_FRAME_SECONDS = เวลาต่อภาพ (ที่ governor ใช้)
+    warm-up ไม่นับใน DETECT_FRAME_SECONDS (ครั้งแรกช้าเพราะจอง memory ไม่ใช่เพราะเครื่องรับไม่ไหว)
+    """
+    model = get_backend()
+    with model_lock:
+        started = time.perf_counter()
+        results = model.predict(frames, conf=conf, iou=DETECT_IOU, imgsz=tuning["imgsz"])
+        elapsed = time.perf_counter() - started
+    DETECT_SECONDS.observe(elapsed)
+    if not warmup and frames:
+        DETECT_FRAME_SECONDS.observe(elapsed / len(frames))
+    return results
+
+def detect(frame, conf=0.4, warmup=False):
+    """คืนค่า list ของผลลัพธ์ (results[0].boxes.data เป็น (N, 6) เหมือนกันทุก backend)"""
+    return _predict([frame], conf, warmup)
+
+def detect_batch(frames, conf=0.4):
+    """detect หลายภาพในการเรียก backend ครั้งเดียว (ภาพขนาดต่างกันได้ แต่ละภาพ letterbox เอง)"""
+    return _predict(list(frames), conf)
+
+def results_to_detections(results):
+    """list ของผลลัพธ์ -> list ของ detections (numpy) หรือ None สำหรับภาพที่ไม่เจออะไร"""
+    return [boxes_array(r) if len(r.boxes) else None for r in results]
+
+def detect_plate(frame, lores=None):
+    """
+    รัน YOLO แล้วคืนค่า detections (numpy) บนพิกัดของภาพ main หรือ None ถ้าไม่เจออะไร
+    ถ้ามีภาพ lores จะ detect บน lores แล้วแปลงพิกัดกลับไปที่ main
+    """
+    results = detect(lores if lores is not None else frame, conf=tuning["conf"])
+    if not (results and len(results) > 0 and len(results[0].boxes)):
+        return None
+    detections = boxes_array(results[0])
+    if lores is not None:
+        detections = scale_detections(detections, frame_size(lores), frame_size(frame))
+    return detections
@@ -0,0 +1,233 @@
+# detector_backends.py
+import ast
+
+import cv2
+import numpy as np
+
+
+# -----------------------------
+# Result shim (หน้าตาเหมือน ultralytics Results ในส่วนที่โค้ดเราใช้)
+# -----------------------------
+class Boxes:
+    def __init__(self, data):
+        self.data = data            # numpy (N, 6): x1, y1, x2, y2, conf, class_id
+
+    def __len__(self):
+        return len(self.data)
+
+
+class Result:
+    def __init__(self, orig_img, data, names):
+        self.orig_img = orig_img
+        self.boxes = Boxes(data)
+        self.names = names
+
+    def plot(self):
+        """วาดกรอบลงบนสำเนาของภาพ (channel order เดียวกับภาพที่ส่งเข้ามา เหมือน ultralytics)"""
+        return draw_detections(self.orig_img.copy(), self.boxes.data, self.names)
+
+
+def draw_detections(img, data, names):
+    """วาดกรอบ (N, 6) ลงบน img (แก้ img เลย) คืนค่า img"""
+    for x1, y1, x2, y2, conf, cls in data:
+        color = (0, 255, 0) if int(cls) == 0 else (255, 0, 255)
+        cv2.rectangle(img, (int(x1), int(y1)), (int(x2), int(y2)), color, 2)
+        label = f"{names.get(int(cls), int(cls))} {conf:.2f}"
+        cv2.putText(img, label, (int(x1), max(int(y1) - 4, 10)),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.5, color, 1)
+    return img
+
+
+def boxes_array(result):
+    """ดึง boxes.data เป็น numpy (N, 6) ได้ทั้งจาก ultralytics Results และ Result shim"""
+    data = result.boxes.data
+    if hasattr(data, "cpu"):
+        data = data.cpu().numpy()
+    return data
+
+
+# -----------------------------
+# Pre / Post processing (ต้องตรงกับ ultralytics)
+# -----------------------------
+def letterbox(img, size, color=(114, 114, 114)):
+    """ย่อภาพให้พอดี size x size โดยคงสัดส่วน แล้วเติมขอบ คืนค่า (ภาพ, gain, (pad_x, pad_y))"""
+    h, w = img.shape[:2]
+    gain = min(size / h, size / w)
+    nh, nw = round(h * gain), round(w * gain)
+    if (nh, nw) != (h, w):
+        img = cv2.resize(img, (nw, nh), interpolation=cv2.INTER_LINEAR)
+    pad_x, pad_y = (size - nw) / 2, (size - nh) / 2
+    top, bottom = round(pad_y - 0.1), round(pad_y + 0.1)
+    left, right = round(pad_x - 0.1), round(pad_x + 0.1)
+    img = cv2.copyMakeBorder(img, top, bottom, left, right, cv2.BORDER_CONSTANT, value=color)
+    return img, gain, (left, top)
+
+
+def preprocess(frames, size):
+    """list ของภาพ -> tensor (B, 3, size, size) float32 0-1 แบบเดียวกับ ultralytics (BGR -> RGB)"""
+    batch, metas = [], []
+    for frame in frames:
+        img, gain, pad = letterbox(frame, size)
+        batch.append(img[..., ::-1].transpose(2, 0, 1))
+        metas.append((gain, pad, frame.shape[:2]))
+    tensor = np.ascontiguousarray(np.stack(batch), dtype=np.float32) / 255.0
+    return tensor, metas
+
+
+def nms(boxes, scores, iou):
+    order = scores.argsort()[::-1]
+    keep = []
+    areas = (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])
+    while order.size:
+        i = order[0]
+        keep.append(i)
+        xx1 = np.maximum(boxes[i, 0], boxes[order[1:], 0])
+        yy1 = np.maximum(boxes[i, 1], boxes[order[1:], 1])
+        xx2 = np.minimum(boxes[i, 2], boxes[order[1:], 2])
+        yy2 = np.minimum(boxes[i, 3], boxes[order[1:], 3])
+        inter = np.clip(xx2 - xx1, 0, None) * np.clip(yy2 - yy1, 0, None)
+        ovr = inter / (areas[i] + areas[order[1:]] - inter + 1e-9)
+        order = order[1:][ovr <= iou]
+    return np.array(keep, dtype=np.int64)
+
+
+def postprocess(pred, meta, conf, iou, max_det=300):
+    """
+    output YOLOv8 หนึ่งภาพ (4 + nc, N) -> (M, 6) พิกัดบนภาพต้นฉบับ
+    NMS แยกตาม class แบบเดียวกับ ultralytics (offset กรอบตาม class_id)
+    """
+    pred = pred.T
+    scores_all = pred[:, 4:]
+    cls = scores_all.argmax(1)
+    scores = scores_all[np.arange(len(pred)), cls]
+    mask = scores > conf
+    if not mask.any():
+        return np.zeros((0, 6), dtype=np.float32)
+    pred, cls, scores = pred[mask], cls[mask], scores[mask]
+
+    cx, cy, w, h = pred[:, 0], pred[:, 1], pred[:, 2], pred[:, 3]
+    boxes = np.stack([cx - w / 2, cy - h / 2, cx + w / 2, cy + h / 2], axis=1)
+    keep = nms(boxes + cls[:, None] * 7680.0, scores, iou)[:max_det]
+    boxes, cls, scores = boxes[keep], cls[keep], scores[keep]
+
+    gain, (pad_x, pad_y), (h0, w0) = meta
+    boxes[:, [0, 2]] = ((boxes[:, [0, 2]] - pad_x) / gain).clip(0, w0)
+    boxes[:, [1, 3]] = ((boxes[:, [1, 3]] - pad_y) / gain).clip(0, h0)
+    return np.concatenate([boxes, scores[:, None], cls[:, None]], axis=1).astype(np.float32)
+
+
+def parse_names(meta_names):
+    """metadata 'names' ที่ ultralytics ฝังไว้ในไฟล์ export เป็น string ของ dict"""
+    try:
+        return {int(k): v for k, v in ast.literal_eval(meta_names).items()}
+    except (ValueError, SyntaxError, AttributeError):
+        return {}
+
+
+# -----------------------------
+# Backends
+# -----------------------------
+class UltralyticsBackend:
+    """โมเดล PyTorch (.pt) ผ่าน ultralytics แบบเดิม"""
+
+    name = "ultralytics"
+
+    def __init__(self, model_path, threads):
+        import torch
+        from ultralytics import YOLO
+        torch.set_num_threads(threads)
+        self.model = YOLO(model_path)
+        self.names = self.model.names
+
+    def predict(self, frames, conf, iou, imgsz):
+        return self.model.predict(frames, conf=conf, iou=iou, imgsz=imgsz, verbose=False, device="cpu")
+
+
+class _ExportedBackend:
+    """ส่วนที่ ONNX Runtime กับ OpenVINO ใช้ร่วมกัน: pre/post process แบบ ultralytics"""
+
+    names = {}
+    fixed_imgsz = None
+    batch_size = None       # None = batch แบบ dynamic / ตัวเลข = โมเดล export แบบ static batch
+
+    def predict(self, frames, conf, iou, imgsz):
+        if self.fixed_imgsz:
+            imgsz = self.fixed_imgsz        # โมเดล export แบบ static shape
+        tensor, metas = preprocess(frames, imgsz)
+        preds = self._run_batched(tensor)
+        return [Result(frame, postprocess(pred, meta, conf, iou), self.names)
+                for frame, pred, meta in zip(frames, preds, metas)]
+
+    def _run_batched(self, tensor):
+        b = self.batch_size
+        if b is None or b == len(tensor):
+            return self._run(tensor)
+        # static batch: แบ่งเป็นก้อนละ b ภาพ ก้อนสุดท้ายเติมภาพว่างให้ครบแล้วทิ้งผลส่วนเกิน
+        preds = []
+        for i in range(0, len(tensor), b):
+            chunk = tensor[i:i + b]
+            n = len(chunk)
+            if n < b:
+                chunk = np.concatenate([chunk, np.zeros((b - n,) + chunk.shape[1:], chunk.dtype)])
+            preds.append(self._run(chunk)[:n])
+        return np.concatenate(preds)
+
+
+class OnnxRuntimeBackend(_ExportedBackend):
+    name = "onnxruntime"
+
+    def __init__(self, model_path, threads):
+        import onnxruntime as ort
+        opts = ort.SessionOptions()
+        opts.intra_op_num_threads = threads
+        opts.inter_op_num_threads = 1
+        opts.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = ort.InferenceSession(model_path, opts, providers=["CPUExecutionProvider"])
+        inp = self.session.get_inputs()[0]
+        self.input_name = inp.name
+        self.input_dtype = np.float16 if "float16" in inp.type else np.float32
+        if isinstance(inp.shape[2], int):
+            self.fixed_imgsz = inp.shape[2]
+        self.batch_size = inp.shape[0] if isinstance(inp.shape[0], int) else None
+        self.names = parse_names(self.session.get_modelmeta().custom_metadata_map.get("names", ""))
+
+    def _run(self, tensor):
+        return self.session.run(None, {self.input_name: tensor.astype(self.input_dtype)})[0].astype(np.float32)
+
+
+class OpenVinoBackend(_ExportedBackend):
+    name = "openvino"
+
+    def __init__(self, model_path, threads):
+        import openvino as ov
+        core = ov.Core()
+        model = core.read_model(model_path)
+        shape = model.input(0).get_partial_shape()
+        if shape[2].is_static:
+            self.fixed_imgsz = shape[2].get_length()
+        self.batch_size = shape[0].get_length() if shape[0].is_static else None
+        self.compiled = core.compile_model(model, "CPU", {
+            "INFERENCE_NUM_THREADS": threads,
+            "PERFORMANCE_HINT": "LATENCY",
+        })
+        self.output = self.compiled.output(0)
+        if model.has_rt_info(["model_info", "labels"]):
+            # ultralytics เก็บชื่อ class ไว้เป็น string คั่นด้วยช่องว่าง
+            labels = model.get_rt_info(["model_info", "labels"]).astype(str).split()
+            self.names = dict(enumerate(labels))
+
+    def _run(self, tensor):
+        return self.compiled(tensor)[self.output]
+
+
+BACKENDS = {
+    "ultralytics": UltralyticsBackend,
+    "onnxruntime": OnnxRuntimeBackend,
+    "openvino": OpenVinoBackend,
+}
+
+
+def create_backend(name, model_path, threads):
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown detector backend: {name} (choose from {', '.join(BACKENDS)})")
+    return BACKENDS[name](model_path, threads)
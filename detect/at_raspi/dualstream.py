@@ -0,0 +1,67 @@
+# dualstream.py
+import math
+
+import cv2
+import numpy as np
+
+
+def lores_to_rgb(arr, size, out=None):
+    """
+    แปลงภาพ lores ให้อยู่ใน channel order เดียวกับ main ("RGB888" ของ Picamera2 = BGR ใน memory)
+    ถ้าเป็น YUV420 (I420) จะมีความสูง h*3/2 และอาจมี stride เกินความกว้างจริง
+    out = array ปลายทาง (เช่น slot ใน FrameRing) จะเขียนลงไปตรงๆ ไม่สร้าง array ใหม่
+    """
+    w, h = size
+    if arr.ndim == 2:
+        return cv2.cvtColor(compact_i420(arr, w, h), cv2.COLOR_YUV2BGR_I420, dst=out)
+    if out is None:
+        return arr[:h, :w, :3]
+    np.copyto(out, arr[:h, :w, :3])
+    return out
+
+
+def compact_i420(arr, w, h):
+    """
+    buffer YUV420 ของ Picamera2 (รูปร่าง (h*3/2, stride)) -> I420 ที่ไม่มี padding ขนาด (h*3/2, w)
+    แต่ละแถวของ Y ยาว stride ส่วน U / V แถวละ stride/2 เรียงต่อกัน (2 แถวของ U อยู่ในแถวเดียวของ array)
+    ตัด [:, :w] ตรงๆ จึงได้ Y ถูกแต่ U / V ผิด ถ้า stride > w (lores ที่กว้างไม่ลงตัว 64)
+    """
+    stride = arr.shape[1]
+    if stride == w:
+        return arr[:h * 3 // 2]
+    flat = arr.reshape(-1)
+    cw, ch, cstride = w // 2, h // 2, stride // 2
+    out = np.empty((h * 3 // 2, w), np.uint8)
+    planes = out.reshape(-1)
+    planes[:w * h].reshape(h, w)[:] = arr[:h, :w]
+    for i in range(2):                      # U แล้ว V
+        start = h * stride + i * ch * cstride
+        dst = w * h + i * ch * cw
+        planes[dst:dst + ch * cw].reshape(ch, cw)[:] = flat[start:start + ch * cstride].reshape(ch, cstride)[:, :cw]
+    return out
+
+
+def scale_detections(detections, src_size, dst_size):
+    """
+    แปลงพิกัดกรอบจากภาพ lores (src) ไปเป็นพิกัดบนภาพ main (dst)
+    ทั้งสอง stream มาจาก ScalerCrop เดียวกันของ ISP จึงต่างกันแค่อัตราส่วนต่อแกน
+    """
+    sw, sh = src_size
+    dw, dh = dst_size
+    scaled = detections.astype(np.float32, copy=True)
+    scaled[:, [0, 2]] *= dw / sw
+    scaled[:, [1, 3]] *= dh / sh
+    return scaled
+
+
+def crop_region(frame, box):
+    """crop กรอบ float จากภาพ (ปัดขอบออกด้านนอก: floor/ceil กันตัวอักษรโดนตัด)"""
+    h, w = frame.shape[:2]
+    x1, y1, x2, y2 = box[:4]
+    x1, y1 = max(int(math.floor(x1)), 0), max(int(math.floor(y1)), 0)
+    x2, y2 = min(int(math.ceil(x2)), w), min(int(math.ceil(y2)), h)
+    return frame[y1:y2, x1:x2]
+
+
+def frame_size(frame):
+    return frame.shape[1], frame.shape[0]
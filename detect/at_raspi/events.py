@@ -0,0 +1,77 @@
+# events.py
+import asyncio
+import json
+import time
+from datetime import datetime
+
+from config import EVENTS_QUEUE_SIZE, EVENTS_KEEPALIVE_SECONDS
+
+
+def sse_message(event, data):
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+# -----------------------------
+# Event Bus (Server-Sent Events)
+# -----------------------------
+class EventBus:
+    """
+    กระจาย event (ผลการอ่านป้าย, สถานะ Freeze, สถานะ pipeline) ให้ทุกหน้าจอที่เปิด /events
+    publish() เรียกจาก thread ไหนก็ได้ / ผู้ฟังแต่ละคนมีคิวจำกัด ถ้าเต็มจะทิ้ง event เก่าสุด
+    """
+
+    def __init__(self, queue_size=EVENTS_QUEUE_SIZE):
+        self._loop = None
+        self._subscribers = set()
+        self._queue_size = queue_size
+        self._state = {}            # event ล่าสุดของแต่ละประเภทที่เป็นสถานะ (ส่งให้คนที่เข้ามาใหม่)
+
+    def attach_loop(self, loop):
+        self._loop = loop
+
+    @property
+    def subscribers(self):
+        return len(self._subscribers)
+
+    def publish(self, event, data, sticky=False, key=None):
+        """
+        sticky=True: จำไว้เป็นสถานะปัจจุบัน ผู้ฟังที่เชื่อมต่อทีหลังจะได้รับทันที
+        key = แยกสถานะของ event ชนิดเดียวกัน (เช่น Freeze ของแต่ละกล้อง) ไม่ระบุ = ชื่อ event
+        """
+        data = dict(data, time=datetime.now().isoformat(timespec="seconds"))
+        message = sse_message(event, data)
+        if sticky:
+            self._state[key or event] = message
+        loop = self._loop
+        if loop is not None and self._subscribers:
+            loop.call_soon_threadsafe(self._deliver, message)
+
+    def _deliver(self, message):
+        for q in self._subscribers:
+            if q.full():
+                q.get_nowait()
+            q.put_nowait(message)
+
+    async def stream(self):
+        """async generator ของ text/event-stream สำหรับผู้ฟัง 1 คน"""
+        if self._loop is None:
+            self._loop = asyncio.get_running_loop()
+        q = asyncio.Queue(maxsize=self._queue_size)
+        self._subscribers.add(q)
+        try:
+            for message in list(self._state.values()):
+                yield message
+            last_sent = time.monotonic()
+            while True:
+                try:
+                    message = await asyncio.wait_for(q.get(), timeout=EVENTS_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    # comment line กัน proxy/browser ตัดการเชื่อมต่อที่เงียบนานเกินไป
+                    if time.monotonic() - last_sent >= EVENTS_KEEPALIVE_SECONDS:
+                        yield ": keep-alive\n\n"
+                        last_sent = time.monotonic()
+                    continue
+                yield message
+                last_sent = time.monotonic()
+        finally:
+            self._subscribers.discard(q)
@@ -0,0 +1,204 @@
+# frame_results.py
+"""
+ผล inference ต่อ 1 เฟรม ใช้ร่วมกันทุก endpoint (/scan, /debug_yolo, overlay stream)
+- key = (กล้อง, เลขเฟรมจาก FrameSource.next_frame) ภาพค้างใช้เลขเฟรมตอนกด Freeze
+  /scan กับ /debug_yolo บนภาพค้างเดียวกัน YOLO ครั้งเดียว กดซ้ำก็ได้ผลเดิมทันที
+- detections / OCR / JPEG ที่วาดกรอบ คำนวณตอนมีคนขอครั้งแรก (lazy) แล้วเก็บไว้กับเฟรม
+- latest(camera) = กรอบล่าสุดของกล้อง (จาก /scan, /debug_yolo, auto-scan) ให้ overlay วาดทับภาพสด
+"""
+import threading
+import time
+from collections import OrderedDict
+
+import cv2
+import numpy as np
+
+from config import RESULT_CACHE_FRAMES, OVERLAY_MAX_AGE_SECONDS
+from detector_backends import draw_detections
+from dualstream import scale_detections, frame_size
+
+_UNSET = object()
+
+
+class FrameResult:
+    """ผลของเฟรมเดียว ทำทีละอย่างใต้ lock: request ที่ขอพร้อมกันรอผลเดียวกัน ไม่ inference ซ้ำ"""
+
+    def __init__(self, cache, camera_id, seq, main, lores, live=True):
+        self.camera_id = camera_id
+        self.seq = seq
+        self.main = main
+        self.lores = lores
+        self.live = live                    # False = ภาพค้าง (Freeze)
+        self.created = time.monotonic()
+        self._cache = cache
+        self._lock = threading.Lock()
+        self._detections = _UNSET
+        self._plates = None
+        self._jpeg = None
+
+    def detections(self, detect_fn):
+        """detect_fn(main, lores) -> detections บนพิกัด main หรือ None (เรียกครั้งเดียวต่อเฟรม)"""
+        with self._lock:
+            if self._detections is _UNSET:
+                self._detections = detect_fn(self.main, self.lores)
+                self._cache.set_latest(self.camera_id, self._detections, frame_size(self.main))
+            return self._detections
+
+    def plates(self, detect_fn, ocr_fn):
+        """
+        (ocr_fn(main, detections), fresh) / ([], fresh) ถ้าไม่เจออะไร
+        fresh = True เฉพาะครั้งที่ OCR จริง (ผู้เรียกนับ / บันทึก Log ครั้งเดียวต่อเฟรม)
+        """
+        detections = self.detections(detect_fn)
+        with self._lock:
+            if self._plates is not None:
+                return self._plates, False
+            self._plates = ocr_fn(self.main, detections) if detections is not None else []
+            return self._plates, True
+
+    def annotated_jpeg(self, detect_fn, names):
+        """JPEG ของภาพที่ YOLO เห็นจริง (lores ถ้ามี) พร้อมกรอบ encode ครั้งเดียวต่อเฟรม"""
+        detections = self.detections(detect_fn)
+        with self._lock:
+            if self._jpeg is None:
+                frame = self.lores if self.lores is not None else self.main
+                img = frame.copy()
+                if detections is not None:
+                    if self.lores is not None:
+                        detections = scale_detections(detections, frame_size(self.main), frame_size(self.lores))
+                    draw_detections(img, detections, names)
+                _, buffer = cv2.imencode(".jpg", img)
+                self._jpeg = buffer.tobytes()
+            return self._jpeg
+
+
+class ResultCache:
+    """FrameResult ของเฟรมล่าสุด RESULT_CACHE_FRAMES เฟรม (LRU ทุกกล้องรวมกัน) + กรอบล่าสุดต่อกล้อง"""
+
+    def __init__(self, size=RESULT_CACHE_FRAMES):
+        self.size = size
+        self._entries = OrderedDict()       # (camera, seq) -> FrameResult
+        self._latest = {}                   # camera -> {"detections", "size", "time", "version"}
+        self._version = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def entry(self, camera_id, seq, main, lores, live=True):
+        """FrameResult ของเฟรมนี้ (สร้างใหม่ถ้ายังไม่มี)"""
+        key = (camera_id, seq)
+        with self._lock:
+            result = self._entries.get(key)
+            if result is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return result
+            self.misses += 1
+            result = self._entries[key] = FrameResult(self, camera_id, seq, main, lores, live)
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+            return result
+
+    def recent(self, camera_id, max_age):
+        """เฟรมสดล่าสุดของกล้องที่สร้างมาไม่เกิน max_age วินาที / None"""
+        now = time.monotonic()
+        with self._lock:
+            for (cid, _), result in reversed(self._entries.items()):
+                if cid == camera_id and result.live:
+                    return result if now - result.created <= max_age else None
+        return None
+
+    def set_latest(self, camera_id, detections, size):
+        """กรอบล่าสุดของกล้อง (พิกัดบนภาพขนาด size) detections = None คือไม่เจออะไร"""
+        with self._lock:
+            self._version += 1
+            self._latest[camera_id] = {"detections": detections, "size": size,
+                                       "time": time.monotonic(), "version": self._version}
+
+    def touch(self, camera_id):
+        """ฉากไม่เปลี่ยน (motion gate ข้าม YOLO): กรอบเดิมยังใช้ได้ ต่ออายุไว้"""
+        with self._lock:
+            latest = self._latest.get(camera_id)
+            if latest is not None:
+                latest["time"] = time.monotonic()
+
+    def latest(self, camera_id, max_age=OVERLAY_MAX_AGE_SECONDS):
+        """กรอบล่าสุดที่ยังไม่เก่าเกิน max_age / None"""
+        with self._lock:
+            latest = self._latest.get(camera_id)
+            if latest is None or time.monotonic() - latest["time"] > max_age:
+                return None
+            return dict(latest)
+
+    def stats(self):
+        with self._lock:
+            return {"frames": len(self._entries), "size": self.size, "hits": self.hits, "misses": self.misses}
+
+
+def render_overlay(jpeg, latest, names):
+    """
+    วาดกรอบล่าสุดทับ JPEG ของกล้อง (decode ครึ่งขนาดด้วย IMREAD_REDUCED ถูกกว่า decode เต็มแล้วย่อ)
+    latest = ผลจาก ResultCache.latest / None (ส่ง JPEG เดิมกลับไป)
+    """
+    if latest is None or latest["detections"] is None:
+        return jpeg
+    img = cv2.imdecode(np.frombuffer(jpeg, np.uint8), cv2.IMREAD_REDUCED_COLOR_2)
+    if img is None:
+        return jpeg
+    draw_detections(img, scale_detections(latest["detections"], latest["size"], frame_size(img)), names)
+    _, buffer = cv2.imencode(".jpg", img)
+    return buffer.tobytes()
+
+
+class OverlayRenderer:
+    """
+    thread เดียววาดกรอบให้ทุกกล้องที่มีผู้ชม overlay ที่ fps ของตัวเอง (ไม่รัน YOLO เอง)
+    fps ของ overlay จึงไม่ขึ้นกับความเร็วของ detect และ stream ปกติไม่ต้องรอ overlay
+    """
+
+    def __init__(self, cameras, cache, names_fn, fps):
+        self.cameras = cameras
+        self.cache = cache
+        self.names_fn = names_fn
+        self.fps = fps
+        self.rendered = 0
+        self._drawn = {}                    # camera -> (jpeg seq, boxes version) ที่วาดไปแล้ว
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name="overlay", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join(timeout=5)
+        self._thread = None
+
+    def _loop(self):
+        interval = 1.0 / self.fps
+        while not self._stop.wait(interval):
+            for camera_id, camera in self.cameras.items():
+                try:
+                    self.render(camera_id, camera)
+                except Exception as e:
+                    print(f"Overlay error ({camera_id}): {e}")
+
+    def render(self, camera_id, camera):
+        if not camera.overlay.viewers:
+            return
+        frame = camera.broadcaster.latest
+        if frame is None:
+            return
+        latest = self.cache.latest(camera_id)
+        stamp = (frame[0], latest["version"] if latest else None)
+        if self._drawn.get(camera_id) == stamp:
+            return                          # ภาพเดิม กรอบเดิม (เช่นตอน Freeze)
+        self._drawn[camera_id] = stamp
+        camera.overlay.publish(render_overlay(frame[1], latest, self.names_fn()))
+        self.rendered += 1
@@ -0,0 +1,161 @@
+# frame_ring.py
+import multiprocessing as mp
+from contextlib import contextmanager
+from multiprocessing import shared_memory
+
+import numpy as np
+
+# header ต่อ slot: [seq, leases]  (seq = 0 คือ slot ว่าง)
+_SEQ, _LEASES = 0, 1
+_HEADER_ALIGN = 64
+
+
+class FrameRing:
+    """
+    Ring buffer ของเฟรมใน multiprocessing.shared_memory
+    - กล้องเขียนภาพลง slot ครั้งเดียว (write / reserve) แล้วได้ sequence number
+    - process อื่น attach ด้วย spec แล้ว lease(seq) อ่านภาพเป็น numpy view ได้โดยไม่ copy
+    - slot ที่มีคน lease อยู่จะไม่ถูกเขียนทับ (writer ข้ามไปใช้ slot เก่าที่สุดที่ว่าง)
+
+    planes = {"main": ((720, 1280, 3), "uint8"), "lores": ((360, 640, 3), "uint8")}
+    แต่ละ slot เก็บทุก plane ของเฟรมเดียวกัน
+
+    ตอนนี้ main.py ใช้ ring ระหว่าง thread ใน process เดียวกัน (capture -> detect ส่งกันแค่ seq)
+    attach() เตรียมไว้สำหรับย้าย detect ไป process แยก (ทางข้าม process ทดสอบใน test_frame_ring.py)
+    """
+
+    def __init__(self, shm, slots, planes, lock, owner):
+        self._shm = shm
+        self.slots = slots
+        self.planes = {name: (tuple(shape), np.dtype(dtype)) for name, (shape, dtype) in planes.items()}
+        self._lock = lock
+        self._owner = owner
+
+        # layout: [header (slots + 1) x 2 int64][slot 0 planes][slot 1 planes]...
+        header_bytes = (slots + 1) * 2 * 8
+        offset = -(-header_bytes // _HEADER_ALIGN) * _HEADER_ALIGN
+        self._header = np.ndarray((slots + 1, 2), dtype=np.int64, buffer=shm.buf)
+        self._views = []
+        for _ in range(slots):
+            views = {}
+            for name, (shape, dtype) in self.planes.items():
+                views[name] = np.ndarray(shape, dtype=dtype, buffer=shm.buf, offset=offset)
+                offset += -(-views[name].nbytes // _HEADER_ALIGN) * _HEADER_ALIGN
+            self._views.append(views)
+
+    @staticmethod
+    def _size(slots, planes):
+        size = -(-(slots + 1) * 16 // _HEADER_ALIGN) * _HEADER_ALIGN
+        for shape, dtype in planes.values():
+            nbytes = int(np.prod(shape)) * np.dtype(dtype).itemsize
+            size += -(-nbytes // _HEADER_ALIGN) * _HEADER_ALIGN * slots
+        return size
+
+    @classmethod
+    def create(cls, slots, planes, name=None, ctx=None):
+        """ctx = multiprocessing context เดียวกับที่ใช้สร้าง worker process (เช่น get_context("spawn"))"""
+        shm = shared_memory.SharedMemory(name=name, create=True, size=cls._size(slots, planes))
+        ring = cls(shm, slots, planes, (ctx or mp).Lock(), owner=True)
+        ring._header[:] = 0
+        return ring
+
+    @classmethod
+    def attach(cls, spec):
+        """ใช้ใน process อื่น: FrameRing.attach(ring.spec)"""
+        shm = shared_memory.SharedMemory(name=spec["name"])
+        return cls(shm, spec["slots"], spec["planes"], spec["lock"], owner=False)
+
+    @property
+    def spec(self):
+        """ข้อมูลที่ส่งให้ process อื่นผ่าน Process(args=...) เพื่อ attach"""
+        return {
+            "name": self._shm.name,
+            "slots": self.slots,
+            "planes": {n: (shape, dtype.str) for n, (shape, dtype) in self.planes.items()},
+            "lock": self._lock,
+        }
+
+    # --- Writer ---
+    @contextmanager
+    def reserve(self):
+        """
+        จอง slot สำหรับเขียน คืนค่า dict ของ plane views ให้เขียนลงไปตรงๆ
+        เขียนเสร็จ (ออกจาก with) จึงได้ seq ใหม่ อ่านผ่าน last_seq ได้
+        ถ้าทุก slot ถูก lease อยู่จะ yield None (ให้ผู้เรียกทิ้งเฟรมนี้)
+        """
+        with self._lock:
+            slot = self._free_slot()
+            if slot is not None:
+                # ระหว่างเขียน: seq = 0 (ห้ามใครอ่าน) และ lease ไว้เอง (writer อื่นไม่เลือก slot นี้)
+                self._header[slot + 1] = (0, 1)
+        if slot is None:
+            yield None
+            return
+        written = False
+        try:
+            yield self._views[slot]
+            written = True
+        finally:
+            with self._lock:
+                if written:
+                    self._header[0, _SEQ] += 1
+                    self._header[slot + 1, _SEQ] = self._header[0, _SEQ]
+                self._header[slot + 1, _LEASES] = 0
+
+    def write(self, **planes):
+        """copy ภาพลง slot ครั้งเดียว คืนค่า seq (None ถ้าไม่มี slot ว่าง)"""
+        with self.reserve() as views:
+            if views is None:
+                return None
+            for name, arr in planes.items():
+                np.copyto(views[name], arr)
+        return self.last_seq
+
+    @property
+    def last_seq(self):
+        return int(self._header[0, _SEQ])
+
+    def _free_slot(self):
+        rows = self._header[1:]
+        free = np.flatnonzero(rows[:, _LEASES] == 0)
+        if free.size == 0:
+            return None
+        return int(free[np.argmin(rows[free, _SEQ])])
+
+    # --- Reader ---
+    @contextmanager
+    def lease(self, seq=None):
+        """
+        ยืมเฟรม seq (None = ล่าสุด) แบบ read-only ไม่ copy
+        yield (seq, views) หรือ (None, None) ถ้าเฟรมนั้นถูกเขียนทับไปแล้ว
+        """
+        with self._lock:
+            rows = self._header[1:]
+            if seq is None:
+                slot = int(np.argmax(rows[:, _SEQ]))
+                found = rows[slot, _SEQ] > 0
+            else:
+                match = np.flatnonzero(rows[:, _SEQ] == seq)
+                slot = int(match[0]) if match.size else -1
+                found = slot >= 0
+            if found:
+                rows[slot, _LEASES] += 1
+                seq = int(rows[slot, _SEQ])
+        if not found:
+            yield None, None
+            return
+        try:
+            views = {name: v.view() for name, v in self._views[slot].items()}
+            for v in views.values():
+                v.flags.writeable = False
+            yield seq, views
+        finally:
+            with self._lock:
+                self._header[slot + 1, _LEASES] -= 1
+
+    def close(self):
+        self._views = []
+        self._header = None
+        self._shm.close()
+        if self._owner:
+            self._shm.unlink()
@@ -0,0 +1,223 @@
+# governor.py
+"""
+ปรับภาระของ service ตามสภาพเครื่อง (Pi ในตู้กลางแดดร้อนจน throttle แล้ว latency พุ่ง)
+ทุก GOVERNOR_INTERVAL_SECONDS อ่าน
+- latency เฉลี่ยของแต่ละ stage ในรอบที่ผ่านมา (ผลต่างของ histogram ใน metrics.py: detect / ocr)
+- สัดส่วน CPU ที่ใช้ (/proc/stat) และอุณหภูมิ SoC (/sys/class/thermal)
+แล้วเลือก level ใน GOVERNOR_LEVELS: เกิน budget / ร้อน / CPU เต็ม = ลง 1 level ทันที
+ปกติติดกัน GOVERNOR_RECOVER_TICKS รอบ = ขึ้น 1 level
+ค่าของแต่ละ level (imgsz, conf, stream_fps, ocr_workers) ส่งให้ knob ที่ลงทะเบียนไว้ (main.py)
+
+ทดสอบโดยไม่ต้องทำให้เครื่องร้อนจริง: ชี้ thermal_path / cpu_stat_path ไปไฟล์ที่เขียนค่าเอง
+แล้วเรียก tick() ตรงๆ
+"""
+import threading
+import time
+from collections import deque
+
+from config import (
+    GOVERNOR_LEVELS, GOVERNOR_INTERVAL_SECONDS, GOVERNOR_BUDGET_SECONDS, GOVERNOR_RECOVER_RATIO,
+    GOVERNOR_CPU_HIGH, GOVERNOR_CPU_LOW, GOVERNOR_TEMP_HIGH, GOVERNOR_TEMP_LOW, GOVERNOR_RECOVER_TICKS,
+    GOVERNOR_THERMAL_PATH, GOVERNOR_CPU_STAT_PATH
+)
+from metrics import DETECT_FRAME_SECONDS, TESSERACT_SECONDS, GOVERNOR_CHANGES
+
+# stage -> histogram ที่ใช้วัด latency (ต่อภาพ / ต่อ crop ให้เทียบกับ budget ได้ตรงๆ แม้มี /scan_batch)
+STAGE_HISTOGRAMS = {"detect": DETECT_FRAME_SECONDS, "ocr": TESSERACT_SECONDS}
+
+
+def read_temperature(path=GOVERNOR_THERMAL_PATH):
+    """°C จากไฟล์ thermal zone (ค่าเป็นมิลลิองศา) / None ถ้าไม่มีไฟล์ (ไม่ใช่ Pi)"""
+    try:
+        with open(path) as f:
+            return int(f.read().strip()) / 1000.0
+    except (OSError, ValueError):
+        return None
+
+
+class CpuMeter:
+    """สัดส่วน CPU ที่ใช้ระหว่างการอ่าน 2 ครั้ง จากบรรทัด "cpu" ของ /proc/stat"""
+
+    def __init__(self, path=GOVERNOR_CPU_STAT_PATH):
+        self.path = path
+        self._last = self._read()
+
+    def _read(self):
+        try:
+            with open(self.path) as f:
+                fields = [int(v) for v in f.readline().split()[1:]]
+        except (OSError, ValueError):
+            return None
+        idle = fields[3] + (fields[4] if len(fields) > 4 else 0)     # idle + iowait
+        return sum(fields), idle
+
+    def sample(self):
+        """0.0-1.0 / None ถ้าอ่านไม่ได้หรือยังไม่มีช่วงให้เทียบ"""
+        current = self._read()
+        last, self._last = self._last, current
+        if current is None or last is None or current[0] <= last[0]:
+            return None
+        total = current[0] - last[0]
+        return round(1.0 - (current[1] - last[1]) / total, 3)
+
+
+class LatencyMeter:
+    """latency เฉลี่ยต่อครั้งของแต่ละ stage ตั้งแต่การอ่านครั้งก่อน (None = รอบนั้นไม่มีงาน)"""
+
+    def __init__(self, histograms=STAGE_HISTOGRAMS):
+        self.histograms = histograms
+        self._last = {stage: h.totals() for stage, h in histograms.items()}
+
+    def sample(self):
+        out = {}
+        for stage, histogram in self.histograms.items():
+            count, total = histogram.totals()
+            last_count, last_total = self._last[stage]
+            self._last[stage] = (count, total)
+            out[stage] = round((total - last_total) / (count - last_count), 4) if count > last_count else None
+        return out
+
+
+class Governor:
+    def __init__(self, levels=GOVERNOR_LEVELS, budgets=GOVERNOR_BUDGET_SECONDS, interval=GOVERNOR_INTERVAL_SECONDS,
+                 thermal_path=GOVERNOR_THERMAL_PATH, cpu_stat_path=GOVERNOR_CPU_STAT_PATH):
+        self.levels = levels
+        self.budgets = budgets
+        self.interval = interval
+        self.thermal_path = thermal_path
+        self.cpu = CpuMeter(cpu_stat_path)
+        self.latency = LatencyMeter()
+        self.level = 0
+        self.signals = {}
+        self.changes = 0
+        self.history = deque(maxlen=20)     # การเปลี่ยน level ล่าสุด
+        self._knobs = {}                    # ชื่อค่าใน level -> fn(value)
+        self._listeners = []
+        self._calm_ticks = 0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def settings(self):
+        return dict(self.levels[self.level])
+
+    def add_knob(self, name, apply_fn):
+        """apply_fn(value) ถูกเรียกเมื่อค่า name ของ level เปลี่ยน"""
+        self._knobs[name] = apply_fn
+
+    def on_change(self, fn):
+        """fn(change) หลังเปลี่ยน level (change = dict เดียวกับใน history)"""
+        self._listeners.append(fn)
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name="governor", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join(timeout=5)
+        self._thread = None
+
+    def _loop(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.tick()
+            except Exception as e:
+                print(f"Governor error: {e}")
+
+    # --- Decision ---
+    def read_signals(self):
+        return {
+            "latency": self.latency.sample(),
+            "cpu": self.cpu.sample(),
+            "temperature": read_temperature(self.thermal_path),
+        }
+
+    def _pressure(self, signals):
+        """เหตุผลที่ต้องลด (ว่าง = ไม่เกิน) และเครื่องว่างพอจะเพิ่มกลับหรือไม่"""
+        reasons = []
+        calm = True
+        for stage, seconds in signals["latency"].items():
+            budget = self.budgets.get(stage)
+            if seconds is None or budget is None:
+                continue
+            if seconds > budget:
+                reasons.append(f"{stage} {seconds * 1000:.0f} ms > {budget * 1000:.0f} ms")
+            calm = calm and seconds < budget * GOVERNOR_RECOVER_RATIO
+        temp = signals["temperature"]
+        if temp is not None:
+            if temp >= GOVERNOR_TEMP_HIGH:
+                reasons.append(f"temperature {temp:.1f} °C")
+            calm = calm and temp < GOVERNOR_TEMP_LOW
+        cpu = signals["cpu"]
+        if cpu is not None:
+            if cpu >= GOVERNOR_CPU_HIGH:
+                reasons.append(f"cpu {cpu:.0%}")
+            calm = calm and cpu < GOVERNOR_CPU_LOW
+        return reasons, calm
+
+    def tick(self, signals=None):
+        """อ่านค่า 1 รอบแล้วตัดสินใจ คืนค่า change (dict) ถ้าเปลี่ยน level / None"""
+        signals = signals or self.read_signals()
+        reasons, calm = self._pressure(signals)
+        change = None
+        with self._lock:
+            self.signals = signals
+            if reasons:
+                self._calm_ticks = 0
+                if self.level < len(self.levels) - 1:
+                    change = self._set_level(self.level + 1, "; ".join(reasons))
+            else:
+                self._calm_ticks = self._calm_ticks + 1 if calm else 0
+                if self.level > 0 and self._calm_ticks >= GOVERNOR_RECOVER_TICKS:
+                    self._calm_ticks = 0
+                    change = self._set_level(self.level - 1, f"normal for {GOVERNOR_RECOVER_TICKS} ticks")
+        # นอก lock: listener อ่าน stats() ได้
+        if change is not None:
+            for fn in self._listeners:
+                fn(change)
+        return change
+
+    def _set_level(self, level, reason):
+        old, new = self.levels[self.level], self.levels[level]
+        changed = {name: new[name] for name in new if new[name] != old.get(name)}
+        for name, value in changed.items():
+            apply_fn = self._knobs.get(name)
+            if apply_fn is None:
+                continue
+            try:
+                apply_fn(value)
+            except Exception as e:
+                print(f"Governor: failed to set {name}={value}: {e}")
+        change = {
+            "time": time.time(),
+            "from": self.level,
+            "to": level,
+            "direction": "down" if level > self.level else "up",
+            "reason": reason,
+            "changed": changed,
+        }
+        self.level = level
+        self.changes += 1
+        self.history.append(change)
+        GOVERNOR_CHANGES.labels(change["direction"]).inc()
+        print(f"Governor: level {change['from']} -> {level} ({reason}) {changed}")
+        return change
+
+    def stats(self):
+        with self._lock:
+            return {
+                "level": self.level,
+                "max_level": len(self.levels) - 1,
+                "settings": self.settings,
+                "signals": dict(self.signals),
+                "budgets": dict(self.budgets),
+                "changes": self.changes,
+                "history": list(self.history),
+            }
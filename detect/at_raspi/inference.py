@@ -0,0 +1,85 @@
+# inference.py
+import asyncio
+import queue
+import threading
+from concurrent.futures import Future
+
+from config import INFERENCE_QUEUE_SIZE
+
+
+class WorkerBusy(Exception):
+    """คิวของ Inference Worker เต็ม (ให้ endpoint ตอบกลับว่า busy)"""
+
+
+# -----------------------------
+# Inference Worker
+# -----------------------------
+class InferenceWorker:
+    """
+    ประตูหน้าแบบ async ที่มีคิวจำกัดของ /scan และ /debug_yolo (thread เดียวรันงานทีละงาน)
+    ไม่ใช่เจ้าของโมเดล: pipeline, /scan_batch และ stream.py เรียก detect_plate / detect_batch ตรงๆ
+    ตัวที่ทำให้ใช้โมเดลทีละงานจริงคือ detector.model_lock ส่วน Tesseract คือ EnginePool ใน ocr_backend
+    - endpoint แบบ async ส่งงานเข้ามาแล้ว await ผลลัพธ์ (event loop ไม่ถูกบล็อก)
+    - งานที่ใช้ key เดียวกันและยังไม่เสร็จ จะถูกรวมเป็น inference เดียว (coalescing)
+    - คิวมีขนาดจำกัด ถ้าเต็มจะ raise WorkerBusy
+    """
+
+    def __init__(self, max_queue=INFERENCE_QUEUE_SIZE):
+        self._jobs = queue.Queue(maxsize=max_queue)
+        self._pending = {}              # key -> Future ที่ยังไม่เสร็จ
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._loop, name="inference-worker", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self._thread is None:
+            return
+        self._jobs.put(None)
+        self._thread.join(timeout=5)
+        self._thread = None
+
+    def submit(self, key, fn, *args):
+        """ส่งงานเข้าคิว คืนค่า concurrent.futures.Future (key=None คือไม่ต้องรวมงาน)"""
+        with self._lock:
+            if key is not None and key in self._pending:
+                return self._pending[key]
+
+            fut = Future()
+            try:
+                self._jobs.put_nowait((key, fut, fn, args))
+            except queue.Full:
+                raise WorkerBusy("inference queue is full")
+
+            if key is not None:
+                self._pending[key] = fut
+            return fut
+
+    async def run(self, key, fn, *args):
+        # shield: client ตัดการเชื่อมต่อก็ไม่ยกเลิกงานที่ request อื่นรอผลอยู่
+        return await asyncio.shield(asyncio.wrap_future(self.submit(key, fn, *args)))
+
+    def queue_size(self):
+        return self._jobs.qsize()
+
+    def _loop(self):
+        while True:
+            job = self._jobs.get()
+            if job is None:
+                break
+
+            key, fut, fn, args = job
+            if fut.set_running_or_notify_cancel():
+                try:
+                    fut.set_result(fn(*args))
+                except Exception as e:
+                    fut.set_exception(e)
+
+            # ปลดงานออกจาก pending หลังเสร็จ request ถัดไปจะได้ inference ใหม่
+            with self._lock:
+                if self._pending.get(key) is fut:
+                    del self._pending[key]
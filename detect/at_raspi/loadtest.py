@@ -0,0 +1,523 @@
+# loadtest.py
+"""
+ยิงโหลดพร้อมกันเข้า service (main.py) เพื่อดูว่ารับผู้ชม /video_feed กับ /scan ได้กี่ตัวก่อน latency พัง
+server รันใน subprocess (แยก GIL / วัด thread กับ memory ของ server ได้ตรงๆ) ใช้ mockcamera เล่นภาพจากโฟลเดอร์
+ตาม --fps (เตรียมภาพ + JPEG ไว้ก่อน เหมือนกล้องจริงที่ได้ JPEG จาก hardware encoder)
+
+usage:
+    python loadtest.py ./samples --viewers 1,4,16 --scanners 2 --duration 20
+    python loadtest.py ./samples --viewers 8 --overlay-viewers 2 --togglers 1 --stub-detector 80 --stub-ocr 20
+    python loadtest.py ./samples --viewers 1,8,32 --stub-detector 80 --out load.json --baseline load-old.json
+
+--viewers / --overlay-viewers / --scanners / --togglers รับหลายค่าคั่นด้วย , = หลายรอบต่อกันบน server เดียว
+(รายการที่สั้นกว่าใช้ค่าสุดท้ายซ้ำ) แต่ละรอบยาว --duration วินาที
+--stub-detector MS = แทน YOLO ด้วยโมเดลปลอมที่ใช้เวลา MS ms และเจอป้าย 1 ป้ายกลางภาพ (ไม่ต้องมี torch / ไฟล์โมเดล)
+--stub-ocr MS      = แทน Tesseract ด้วย engine ปลอมที่ใช้เวลา MS ms ต่อ crop
+"""
+import argparse
+import json
+import os
+import platform
+import socket
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+
+BOUNDARY = b"--frame\r\n"
+
+
+# -----------------------------
+# Server (subprocess)
+# -----------------------------
+class StubBackend:
+    """detector backend ปลอม: รอ seconds แล้วคืนกรอบตัวอักษร 4 ตัว + จังหวัด 1 กรอบกลางภาพ"""
+
+    name = "stub"
+
+    def __init__(self, seconds):
+        from config import CHAR_CLASS_ID, PROVINCE_CLASS_ID
+        self.seconds = seconds
+        self.char_id = CHAR_CLASS_ID
+        self.province_id = PROVINCE_CLASS_ID
+        self.names = {CHAR_CLASS_ID: "char", PROVINCE_CLASS_ID: "province"}
+
+    def _boxes(self, frame):
+        h, w = frame.shape[:2]
+        cw, ch = w * 0.03, h * 0.08
+        x0, y0 = w * 0.44, h * 0.42
+        rows = [[x0 + i * cw * 1.1, y0, x0 + i * cw * 1.1 + cw, y0 + ch, 0.9, self.char_id] for i in range(4)]
+        rows.append([x0, y0 + ch * 1.1, x0 + cw * 4.4, y0 + ch * 1.6, 0.8, self.province_id])
+        return np.array(rows, np.float32)
+
+    def predict(self, frames, conf, iou, imgsz):
+        from detector_backends import Result
+        time.sleep(self.seconds)
+        return [Result(frame, self._boxes(frame), self.names) for frame in frames]
+
+
+class StubEngine:
+    """Tesseract ปลอม: รอ seconds แล้วคืนข้อความคงที่ตาม config (ตัวอักษร / จังหวัด)"""
+
+    def __init__(self, config, seconds):
+        from config import TESSERACT_PROVINCE_CONFIG
+        self.seconds = seconds
+        self.text = "กรุงเทพมหานคร" if config == TESSERACT_PROVINCE_CONFIG else "กข1234"
+
+    def image_to_string(self, gray):
+        time.sleep(self.seconds)
+        return self.text
+
+    def close(self):
+        pass
+
+
+def serve(args):
+    """รันใน subprocess: mockcamera + (stub) แล้ว uvicorn main.app"""
+    import mockcamera
+    mockcamera.install(args.source, fps=args.fps, loop=True, preload=True)
+
+    if args.stub_detector is not None:
+        import detector
+        detector.backend = StubBackend(args.stub_detector / 1000)
+    if args.stub_ocr is not None:
+        import ocr_backend
+        pool = ocr_backend.EnginePool(backend="pytesseract")
+        pool._engine_cls = lambda config: StubEngine(config, args.stub_ocr / 1000)
+        ocr_backend._pool = pool
+
+    import uvicorn
+    import main
+    uvicorn.run(main.app, host="127.0.0.1", port=args.port, log_level="warning")
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(args):
+    cmd = [sys.executable, str(Path(__file__).resolve()), args.source, "--serve", "--port", str(args.port),
+           "--fps", str(args.fps)]
+    if args.stub_detector is not None:
+        cmd += ["--stub-detector", str(args.stub_detector)]
+    if args.stub_ocr is not None:
+        cmd += ["--stub-ocr", str(args.stub_ocr)]
+    log = open(args.server_log, "w") if args.server_log else subprocess.DEVNULL
+    return subprocess.Popen(cmd, cwd=Path(__file__).parent, stdout=log, stderr=subprocess.STDOUT)
+
+
+def wait_ready(base, proc, timeout):
+    """รอ /ready (โมเดล + OCR พร้อม) คืนค่า True / False ถ้าหมดเวลา (ยิงต่อได้ แต่ /scan จะได้ 503)"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"server exited with code {proc.returncode} (see --server-log)")
+        try:
+            with urllib.request.urlopen(base + "/ready", timeout=2):
+                return True
+        except urllib.error.HTTPError:
+            pass                    # 503 = ยังโหลดอยู่
+        except OSError:
+            pass                    # ยังไม่ listen
+        time.sleep(0.5)
+    return False
+
+
+# -----------------------------
+# Clients
+# -----------------------------
+def mjpeg_viewer(host, port, path, stop, stats):
+    """
+    ผู้ชม 1 คน: อ่าน stream ด้วย socket ตรงๆ (timeout สั้นเพื่อหยุดได้ตอนภาพค้าง) นับ boundary = จำนวนภาพ
+    ไม่ decode JPEG (ผู้ชมจริงเป็น browser ไม่ใช่งานของ server)
+    """
+    started = time.perf_counter()
+    stats.update(frames=0, bytes=0, first_frame_s=None, max_gap_ms=0.0, error=None)
+    last_frame = None
+    try:
+        with socket.create_connection((host, port), timeout=5) as sock:
+            sock.sendall(f"GET {path} HTTP/1.1\r\nHost: {host}\r\nConnection: close\r\n\r\n".encode())
+            sock.settimeout(0.5)
+            buf = b""
+            status_checked = False
+            while not stop.is_set():
+                try:
+                    data = sock.recv(65536)
+                except socket.timeout:
+                    continue
+                if not data:
+                    stats["error"] = "closed by server"
+                    break
+                stats["bytes"] += len(data)
+                buf += data
+                if not status_checked and b"\r\n" in buf:
+                    status_line = buf.split(b"\r\n", 1)[0]
+                    if b" 200 " not in status_line:
+                        stats["error"] = status_line.decode(errors="replace")
+                        break
+                    status_checked = True
+                count = buf.count(BOUNDARY)
+                if count:
+                    now = time.perf_counter()
+                    if last_frame is None:
+                        stats["first_frame_s"] = round(now - started, 3)
+                    else:
+                        stats["max_gap_ms"] = max(stats["max_gap_ms"], (now - last_frame) * 1000)
+                    last_frame = now
+                    stats["frames"] += count
+                # เก็บท้าย buffer ไว้เผื่อ boundary ถูกตัดกลางระหว่าง recv
+                buf = buf[-(len(BOUNDARY) - 1):]
+    except OSError as e:
+        stats["error"] = f"{type(e).__name__}: {e}"
+    stats["seconds"] = time.perf_counter() - started
+
+
+def request(base, method, path, timeout):
+    """(status, latency วินาที, body dict / None) status 0 = เชื่อมต่อไม่ได้ / timeout"""
+    started = time.perf_counter()
+    req = urllib.request.Request(base + path, method=method)
+    try:
+        with urllib.request.urlopen(req, timeout=timeout) as response:
+            body = response.read()
+            status = response.status
+    except urllib.error.HTTPError as e:
+        body = e.read()
+        status = e.code
+    except OSError:
+        return 0, time.perf_counter() - started, None
+    elapsed = time.perf_counter() - started
+    try:
+        return status, elapsed, json.loads(body)
+    except ValueError:
+        return status, elapsed, None
+
+
+def scanner(base, camera_query, interval, timeout, stop, results):
+    """ยิง /scan ต่อเนื่อง (interval = พักระหว่าง request, 0 = ทันทีที่ได้ผล)"""
+    while not stop.is_set():
+        status, elapsed, body = request(base, "GET", "/scan" + camera_query, timeout)
+        if status == 200 and body and "error" not in body:
+            outcome = "ok"
+        elif status == 503 and body and body.get("error") == "busy":
+            outcome = "busy"        # คิวเต็ม (ตั้งใจปฏิเสธ ไม่ใช่ server พัง)
+        else:
+            outcome = "error"
+        results.append((outcome, elapsed, status))
+        if interval:
+            stop.wait(interval)
+
+
+def toggler(base, camera_query, interval, timeout, stop, results):
+    while not stop.wait(interval):
+        status, elapsed, _ = request(base, "POST", "/toggle_freeze" + camera_query, timeout)
+        results.append(("ok" if status == 200 else "error", elapsed, status))
+
+
+# -----------------------------
+# Server resources (/proc/<pid>)
+# -----------------------------
+def read_proc(pid):
+    """(threads, rss MB, cpu วินาทีสะสม) ของ process จาก /proc / None ถ้าอ่านไม่ได้ (ไม่ใช่ Linux / process จบแล้ว)"""
+    try:
+        status = Path(f"/proc/{pid}/status").read_text()
+        stat = Path(f"/proc/{pid}/stat").read_text()
+    except OSError:
+        return None
+    fields = dict(line.split(":", 1) for line in status.splitlines() if ":" in line)
+    threads = int(fields["Threads"])
+    rss_mb = int(fields["VmRSS"].split()[0]) / 1024
+    # field 14, 15 (utime, stime) นับหลังชื่อ process ที่อยู่ในวงเล็บ
+    ticks = stat.rsplit(")", 1)[1].split()
+    cpu = (int(ticks[11]) + int(ticks[12])) / os.sysconf("SC_CLK_TCK")
+    return threads, rss_mb, cpu
+
+
+class ProcSampler:
+    def __init__(self, pid, interval=0.5):
+        self.pid = pid
+        self.interval = interval
+        self.samples = []
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._loop, name="proc-sampler", daemon=True)
+
+    def __enter__(self):
+        self._sample()
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self._sample()
+
+    def _sample(self):
+        value = read_proc(self.pid)
+        if value is not None:
+            self.samples.append((time.perf_counter(), *value))
+
+    def _loop(self):
+        while not self._stop.wait(self.interval):
+            self._sample()
+
+    def summary(self):
+        if len(self.samples) < 2:
+            return {}
+        t0, threads0, rss0, cpu0 = self.samples[0]
+        t1, threads1, rss1, cpu1 = self.samples[-1]
+        return {
+            "threads_start": threads0,
+            "threads_max": max(s[1] for s in self.samples),
+            "threads_end": threads1,
+            "rss_mb_start": round(rss0, 1),
+            "rss_mb_max": round(max(s[2] for s in self.samples), 1),
+            "rss_mb_end": round(rss1, 1),
+            "cpu_percent": round((cpu1 - cpu0) / (t1 - t0) * 100, 1) if t1 > t0 else 0.0,
+        }
+
+
+# -----------------------------
+# Report
+# -----------------------------
+def latency_summary(samples):
+    if not samples:
+        return {"count": 0}
+    ms = np.asarray(samples) * 1000
+    p50, p95, p99 = np.percentile(ms, [50, 95, 99])
+    return {
+        "count": len(samples),
+        "mean_ms": round(float(ms.mean()), 2),
+        "p50_ms": round(float(p50), 2),
+        "p95_ms": round(float(p95), 2),
+        "p99_ms": round(float(p99), 2),
+        "max_ms": round(float(ms.max()), 2),
+    }
+
+
+def request_summary(results, seconds):
+    total = len(results)
+    counts = {outcome: sum(1 for r in results if r[0] == outcome) for outcome in ("ok", "busy", "error")}
+    statuses = {}
+    for _, _, status in results:
+        statuses[str(status)] = statuses.get(str(status), 0) + 1
+    return dict(
+        requests=total,
+        **counts,
+        error_rate=round(counts["error"] / total, 4) if total else 0.0,
+        busy_rate=round(counts["busy"] / total, 4) if total else 0.0,
+        ok_per_s=round(counts["ok"] / seconds, 2) if seconds else 0.0,
+        statuses=statuses,
+        latency=latency_summary([r[1] for r in results if r[0] == "ok"]),
+    )
+
+
+def viewer_summary(viewers):
+    if not viewers:
+        return {"count": 0}
+    fps = [v["frames"] / v["seconds"] for v in viewers if v["seconds"]]
+    return {
+        "count": len(viewers),
+        "fps_mean": round(float(np.mean(fps)), 2),
+        "fps_min": round(float(np.min(fps)), 2),
+        "fps_p50": round(float(np.percentile(fps, 50)), 2),
+        "frames": sum(v["frames"] for v in viewers),
+        "mbytes": round(sum(v["bytes"] for v in viewers) / 1e6, 1),
+        "max_gap_ms": round(max(v["max_gap_ms"] for v in viewers), 1),
+        "errors": sum(1 for v in viewers if v["error"]),
+        "error_samples": sorted({v["error"] for v in viewers if v["error"]})[:3],
+        "per_viewer": [
+            {"fps": round(v["frames"] / v["seconds"], 2), "first_frame_s": v["first_frame_s"],
+             "max_gap_ms": round(v["max_gap_ms"], 1), "error": v["error"]}
+            for v in viewers
+        ],
+    }
+
+
+# -----------------------------
+# Run
+# -----------------------------
+def run_stage(base, host, port, pid, mix, args):
+    """รัน 1 รอบตาม mix {"viewers", "overlay_viewers", "scanners", "togglers"} คืนค่า dict ผลของรอบนี้"""
+    camera_query = f"?camera={args.camera}" if args.camera else ""
+    camera_amp = f"&camera={args.camera}" if args.camera else ""
+    stop = threading.Event()
+    viewers = [dict() for _ in range(mix["viewers"] + mix["overlay_viewers"])]
+    scans, toggles = [], []
+    threads = []
+    for i, stats in enumerate(viewers):
+        path = "/video_feed" + camera_query if i < mix["viewers"] else "/video_feed?overlay=1" + camera_amp
+        threads.append(threading.Thread(target=mjpeg_viewer, args=(host, port, path, stop, stats)))
+    for _ in range(mix["scanners"]):
+        threads.append(threading.Thread(target=scanner, args=(base, camera_query, args.scan_interval, args.timeout, stop, scans)))
+    for _ in range(mix["togglers"]):
+        threads.append(threading.Thread(target=toggler, args=(base, camera_query, args.toggle_interval, args.timeout, stop, toggles)))
+
+    with ProcSampler(pid) as sampler:
+        started = time.perf_counter()
+        for t in threads:
+            t.start()
+        time.sleep(args.duration)
+        stop.set()
+        for t in threads:
+            t.join(args.timeout + 1)
+        elapsed = time.perf_counter() - started
+
+    # freeze ค้างอยู่ = รอบถัดไปไม่มีภาพ ปลดก่อน
+    status, _, cameras = request(base, "GET", "/cameras", args.timeout)
+    if status == 200 and cameras:
+        for camera in cameras:
+            if camera["frozen"] and (not args.camera or camera["id"] == args.camera):
+                request(base, "POST", f"/toggle_freeze?camera={camera['id']}", args.timeout)
+
+    viewer_stats = [v for i, v in enumerate(viewers) if i < mix["viewers"]]
+    overlay_stats = [v for i, v in enumerate(viewers) if i >= mix["viewers"]]
+    return {
+        "mix": mix,
+        "seconds": round(elapsed, 2),
+        "viewers": viewer_summary(viewer_stats),
+        "overlay_viewers": viewer_summary(overlay_stats),
+        "scans": request_summary(scans, elapsed),
+        "toggles": request_summary(toggles, elapsed),
+        "server": sampler.summary(),
+    }
+
+
+def parse_counts(text):
+    return [int(v) for v in str(text).split(",") if v.strip()]
+
+
+def stage_mixes(args):
+    lists = {name: parse_counts(getattr(args, name)) or [0]
+             for name in ("viewers", "overlay_viewers", "scanners", "togglers")}
+    stages = max(len(v) for v in lists.values())
+    return [{name: values[min(i, len(values) - 1)] for name, values in lists.items()} for i in range(stages)]
+
+
+def run(args):
+    args.port = args.port or free_port()
+    host = "127.0.0.1"
+    base = f"http://{host}:{args.port}"
+    proc = start_server(args)
+    try:
+        started = time.perf_counter()
+        ready = wait_ready(base, proc, args.ready_timeout)
+        print(f"server pid {proc.pid} on {base}: {'ready' if ready else 'NOT ready'} after "
+              f"{time.perf_counter() - started:.1f} s", file=sys.stderr)
+        idle = read_proc(proc.pid)
+        stages = []
+        for mix in stage_mixes(args):
+            print(f"stage {mix} for {args.duration} s...", file=sys.stderr)
+            stages.append(run_stage(base, host, args.port, proc.pid, mix, args))
+            print_stage(stages[-1])
+    finally:
+        proc.terminate()
+        try:
+            proc.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+    return {
+        "ready": ready,
+        "idle_server": dict(zip(("threads", "rss_mb"), idle[:2])) if idle else {},
+        "stages": stages,
+    }
+
+
+def print_stage(stage):
+    mix, v, o, s, t, srv = (stage[k] for k in ("mix", "viewers", "overlay_viewers", "scans", "toggles", "server"))
+    print(f"\n{mix['viewers']} viewers / {mix['overlay_viewers']} overlay / {mix['scanners']} scanners / "
+          f"{mix['togglers']} togglers  ({stage['seconds']} s)")
+    if v["count"]:
+        print(f"  viewers  fps mean {v['fps_mean']:6.2f}  min {v['fps_min']:6.2f}  max gap {v['max_gap_ms']:7.1f} ms  "
+              f"{v['mbytes']} MB  errors {v['errors']}")
+    if o["count"]:
+        print(f"  overlay  fps mean {o['fps_mean']:6.2f}  min {o['fps_min']:6.2f}  errors {o['errors']}")
+    if s["requests"]:
+        lat = s["latency"]
+        line = f"  scan     {s['requests']} req  ok {s['ok']}  busy {s['busy']}  error {s['error']} ({s['error_rate']:.1%})"
+        if lat["count"]:
+            line += f"  p50 {lat['p50_ms']:.1f}  p95 {lat['p95_ms']:.1f}  p99 {lat['p99_ms']:.1f} ms"
+        print(line)
+    if t["requests"]:
+        print(f"  freeze   {t['requests']} toggles  errors {t['error']}")
+    if srv:
+        print(f"  server   threads {srv['threads_start']} -> max {srv['threads_max']}  "
+              f"rss {srv['rss_mb_start']} -> max {srv['rss_mb_max']} MB  cpu {srv['cpu_percent']}%")
+
+
+def compare(report, baseline):
+    """ผลต่างต่อรอบเทียบกับ JSON ของเวอร์ชันก่อน (จับคู่ตามลำดับรอบ)"""
+    print(f"\nvs baseline {baseline.get('meta', {}).get('git')}:")
+    for new, old in zip(report["stages"], baseline["stages"]):
+        parts = [f"{new['mix']}"]
+        if new["viewers"]["count"] and old["viewers"].get("count"):
+            parts.append(f"viewer fps {new['viewers']['fps_mean'] - old['viewers']['fps_mean']:+.2f}")
+        new_lat, old_lat = new["scans"]["latency"], old["scans"]["latency"]
+        if new_lat["count"] and old_lat.get("count"):
+            parts.append(f"scan p50 {new_lat['p50_ms'] - old_lat['p50_ms']:+.1f} ms  p95 {new_lat['p95_ms'] - old_lat['p95_ms']:+.1f} ms")
+        parts.append(f"scan errors {new['scans']['error_rate'] - old['scans']['error_rate']:+.2%}")
+        if new["server"] and old["server"]:
+            parts.append(f"rss max {new['server']['rss_mb_max'] - old['server']['rss_mb_max']:+.1f} MB  "
+                         f"threads max {new['server']['threads_max'] - old['server']['threads_max']:+d}")
+        print("  " + "  |  ".join(parts))
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=Path(__file__).parent, text=True, stderr=subprocess.DEVNULL
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Concurrent HTTP load test of main.py against a replayed camera")
+    parser.add_argument("source", help="folder of images replayed as the camera")
+    parser.add_argument("--fps", type=float, default=15, help="camera replay rate")
+    parser.add_argument("--viewers", default="4", help="MJPEG viewers, comma list = one stage per value")
+    parser.add_argument("--overlay-viewers", default="0", help="/video_feed?overlay=1 viewers")
+    parser.add_argument("--scanners", default="1", help="clients calling /scan back to back")
+    parser.add_argument("--togglers", default="0", help="clients calling /toggle_freeze")
+    parser.add_argument("--scan-interval", type=float, default=0.0, help="pause between scans per client (s)")
+    parser.add_argument("--toggle-interval", type=float, default=2.0, help="pause between freeze toggles (s)")
+    parser.add_argument("--camera", default=None, help="camera id (default camera if omitted)")
+    parser.add_argument("--duration", type=float, default=15, help="seconds per stage")
+    parser.add_argument("--timeout", type=float, default=30, help="HTTP timeout per request (s)")
+    parser.add_argument("--ready-timeout", type=float, default=120, help="wait this long for /ready")
+    parser.add_argument("--stub-detector", type=float, default=None, metavar="MS", help="fake YOLO taking MS ms")
+    parser.add_argument("--stub-ocr", type=float, default=None, metavar="MS", help="fake Tesseract taking MS ms per crop")
+    parser.add_argument("--port", type=int, default=None, help="server port (default: a free port)")
+    parser.add_argument("--server-log", default=None, help="write server stdout/stderr here")
+    parser.add_argument("--out", default=None, help="write the JSON report here")
+    parser.add_argument("--baseline", default=None, help="previous JSON report to diff against")
+    parser.add_argument("--serve", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args)
+        sys.exit(0)
+
+    report = run(args)
+    report["meta"] = {
+        "time": datetime.now().isoformat(timespec="seconds"),
+        "git": git_revision(),
+        "source": args.source,
+        "fps": args.fps,
+        "duration_s": args.duration,
+        "stub_detector_ms": args.stub_detector,
+        "stub_ocr_ms": args.stub_ocr,
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+    }
+    if args.baseline:
+        compare(report, json.loads(Path(args.baseline).read_text(encoding="utf-8")))
+    if args.out:
+        Path(args.out).write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
@@ -1,29 +1,144 @@
 # main.py
-from fastapi import FastAPI
-from fastapi.responses import StreamingResponse, HTMLResponse, Response
+import time
+IMPORT_STARTED = time.perf_counter()   # วัดเวลา import ของ service (python -X importtime main.py ดูราย module)
+
+from fastapi import FastAPI, UploadFile, File
+from fastapi.responses import StreamingResponse, HTMLResponse, Response, JSONResponse, PlainTextResponse
 from fastapi.staticfiles import StaticFiles
 from pathlib import Path
 import uvicorn
-import cv2
 import os
+import json
+import asyncio
+import threading
 from datetime import datetime
-from config import LOG_PATH
-import cameralow
-from detector import detect
-from ocr import run_ocr
+from typing import List, Optional
+from config import (
+    LOG_PATH, AUTO_SCAN, PIPELINE_DEDUP_SECONDS, PIPELINE_RING_SLOTS, SAVE_CROPS, EVENTS_HEALTH_SECONDS,
+    TESSERACT_CHAR_CONFIG, TESSERACT_PROVINCE_CONFIG, PROVINCE_MIN_SCORE, BATCH_MAX_FILES, MOTION_GATE, CAMERAS,
+    SYNC_URL, GOVERNOR_ENABLED, RESULT_REUSE_SECONDS, OVERLAY_FPS
+)
+import detector
+from detector import detect_plate
+from dualstream import crop_region
+from ocr import submit_ocr, collect_ocr, ocr_plates, plate_bbox, split_plates
+from ocr_backend import get_pool
+from inference import InferenceWorker, WorkerBusy
+from pipeline import AutoScanPipeline
+from sources import build_cameras
+from record_store import RecordStore
+from sync import RecordSync
+from governor import Governor
+from tracker import PlateTracker, vote
+from frame_ring import FrameRing
+from motion import MotionGate
+from events import EventBus
+from frame_results import ResultCache, OverlayRenderer
+from batch_scan import scan_images, result_record
+import metrics
+from metrics import CAPTURE_SECONDS, SAVE_LOG_SECONDS, SCANS, READS
+
+IMPORT_SECONDS = round(time.perf_counter() - IMPORT_STARTED, 3)
+print(f"Service modules imported in {IMPORT_SECONDS} s")
 
 app = FastAPI()
+worker = InferenceWorker()
+events = EventBus()
 BASE_DIR = Path(__file__).resolve().parent
 
 LOG_DIR = Path(LOG_PATH)
 LOG_DIR.mkdir(parents=True, exist_ok=True) # สร้างโฟลเดอร์ถ้ายังไม่มี
+records = RecordStore()
+# ส่ง record ขึ้นเครื่องกลางจาก thread ของตัวเอง (อ่านจาก SQLite ที่ RecordStore เขียนไว้แล้ว)
+record_sync = RecordSync(SYNC_URL) if SYNC_URL else None
 
 if (BASE_DIR / "web").exists():
     app.mount("/static", StaticFiles(directory=BASE_DIR / "web"), name="static")
 
+# --- กล้อง: ทุกตัวใช้โมเดล / Inference Worker / OCR pool ชุดเดียวกัน ---
+# endpoint ที่ไม่ระบุ ?camera= ใช้กล้องตัวแรกใน CAMERAS (หน้าเว็บ / client เดิมใช้ได้เหมือนเดิม)
+cameras = build_cameras(CAMERAS)
+camera_labels = {spec["id"]: spec.get("label", spec["id"]) for spec in CAMERAS}
+DEFAULT_CAMERA = next(iter(cameras))
+
+def resolve_camera(camera_id):
+    """id ของกล้อง (None = กล้อง default) หรือ None ถ้าไม่มีกล้องนี้"""
+    camera_id = camera_id or DEFAULT_CAMERA
+    return camera_id if camera_id in cameras else None
+
+def unknown_camera(camera_id):
+    return JSONResponse({"error": "unknown_camera", "camera": camera_id, "cameras": list(cameras)}, status_code=404)
+
+# ผล detect / OCR / ภาพวาดกรอบ ต่อเฟรม (/scan, /debug_yolo, auto-scan ใช้ร่วมกัน)
+# overlay stream วาดกรอบล่าสุดทับ JPEG ของกล้องด้วย thread ของตัวเอง (ไม่รัน YOLO ต่อเฟรมของ stream)
+frame_results = ResultCache()
+overlay = OverlayRenderer(cameras, frame_results, detector.class_names, OVERLAY_FPS)
+
 @app.on_event("startup")
 def startup():
-    cameralow.init_camera()
+    for camera_id, camera in cameras.items():
+        camera.init_camera()
+        frame_rings[camera_id] = FrameRing.create(PIPELINE_RING_SLOTS, camera.ring_planes())
+    records.start()
+    if record_sync is not None:
+        record_sync.start()
+    if governor is not None:
+        governor.start()
+    overlay.start()
+    worker.start()
+    # โหลดโมเดล + Tesseract ใน background: /video_feed ใช้ได้ทันที /scan รอจน /ready
+    threading.Thread(target=warm_up, name="warmup", daemon=True).start()
+    if AUTO_SCAN:
+        pipeline.start()
+    for camera_id, camera in cameras.items():
+        publish_freeze(camera_id, camera.is_frozen)
+
+ocr_ready = threading.Event()
+
+def warm_up():
+    started = time.perf_counter()
+    detector.load_model(warmup=True)
+    # โหลด Tesseract engine ล่วงหน้า (scan แรกไม่ต้องรอโหลด traineddata)
+    try:
+        get_pool().warmup([TESSERACT_CHAR_CONFIG, TESSERACT_PROVINCE_CONFIG])
+        ocr_ready.set()
+    except Exception as e:
+        print(f"OCR warm-up failed: {e}")
+    print(f"Warm-up finished in {time.perf_counter() - started:.2f} s (ready: {is_ready()})")
+
+def is_ready():
+    return detector.is_ready() and ocr_ready.is_set()
+
+@app.get("/ready")
+def ready():
+    status = {
+        "ready": is_ready(),
+        "model": detector.model_status(),
+        "ocr": ocr_ready.is_set(),
+        "import_seconds": IMPORT_SECONDS,
+    }
+    return JSONResponse(status, status_code=200 if status["ready"] else 503)
+
+@app.on_event("startup")
+async def start_events():
+    events.attach_loop(asyncio.get_running_loop())
+    asyncio.create_task(publish_health())
+
+@app.on_event("shutdown")
+def shutdown():
+    overlay.stop()
+    pipeline.stop()
+    worker.stop()
+    get_pool().close()
+    records.stop()
+    if record_sync is not None:
+        record_sync.stop()
+    if governor is not None:
+        governor.stop()
+    for ring in frame_rings.values():
+        ring.close()
+    for camera in cameras.values():
+        camera.close_camera()
 
 @app.get("/")
 async def index():
@@ -33,91 +148,456 @@ async def index():
     except FileNotFoundError:
         return HTMLResponse("<h1>Error: index.html not found</h1>")
 
+@app.get("/cameras")
+def list_cameras():
+    return [
+        {
+            "id": camera_id,
+            "label": camera_labels[camera_id],
+            "source": getattr(camera, "kind", None) or "cameralow",
+            "frozen": camera.is_frozen,
+            "viewers": camera.broadcaster.viewers,
+            "default": camera_id == DEFAULT_CAMERA,
+        }
+        for camera_id, camera in cameras.items()
+    ]
+
 @app.get("/video_feed")
-async def video_feed():
+async def video_feed(camera: Optional[str] = None, overlay: bool = False):
+    """overlay=1: ภาพเดียวกันพร้อมกรอบล่าสุดจาก /scan / auto-scan (OVERLAY_FPS)"""
+    camera_id = resolve_camera(camera)
+    if camera_id is None:
+        return unknown_camera(camera)
+    source = cameras[camera_id]
     return StreamingResponse(
-        cameralow.generate_frames(),
+        (source.overlay if overlay else source.broadcaster).stream(),
         media_type="multipart/x-mixed-replace; boundary=frame"
     )
 
 @app.post("/toggle_freeze")
-async def toggle_freeze_api():
-    frozen_state = cameralow.toggle_freeze()
-    status_text = "frozen" if frozen_state else "streaming"
-    return {"status": status_text}
+def toggle_freeze_api(camera: Optional[str] = None):
+    # def ธรรมดา (FastAPI รันใน threadpool): Freeze รอภาพใหม่จากกล้องได้ถึง ~2 วินาที ไม่บล็อก event loop ของ stream / SSE
+    camera_id = resolve_camera(camera)
+    if camera_id is None:
+        return unknown_camera(camera)
+    frozen_state = cameras[camera_id].toggle_freeze()
+    return publish_freeze(camera_id, frozen_state)
+
+# --- Events: ทุกหน้าจอได้ผลลัพธ์/สถานะเดียวกันโดยไม่ต้อง poll หรือสั่ง inference เอง ---
+def publish_freeze(camera_id, frozen_state):
+    data = {"camera": camera_id, "status": "frozen" if frozen_state else "streaming"}
+    events.publish("freeze", data, sticky=True, key=f"freeze:{camera_id}")
+    return data
+
+def publish_result(data, source, camera_id=None, **extra):
+    events.publish("result", dict(data, source=source, camera=camera_id, valid=is_valid_read(data), **extra))
+
+def pipeline_snapshot():
+    snapshot = pipeline.snapshot()
+    for camera_id, info in snapshot["cameras"].items():
+        camera = cameras[camera_id]
+        info.update(frozen=camera.is_frozen, viewers=camera.broadcaster.viewers)
+        if camera_id in motion_gates:
+            info["motion"] = motion_gates[camera_id].stats()
+    return snapshot
+
+def health_snapshot():
+    return dict(pipeline_snapshot(), ready=is_ready(), inference_queue=worker.queue_size(),
+                viewers=sum(camera.broadcaster.viewers for camera in cameras.values()),
+                governor={"level": governor.level, **governor.settings} if governor is not None else None)
+
+async def publish_health():
+    while True:
+        if events.subscribers:
+            events.publish("pipeline", health_snapshot(), sticky=True)
+        await asyncio.sleep(EVENTS_HEALTH_SECONDS)
+
+@app.get("/events")
+async def event_stream():
+    return StreamingResponse(
+        events.stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+# --- งานที่รันบน Inference Worker (ห้ามเรียกตรงจาก event loop) ---
+def frame_request(kind, camera_id):
+    """
+    คืนค่า (key, frozen_frames) สำหรับรวม request ที่ใช้ภาพเดียวกัน (ของกล้องเดียวกัน)
+    ภาพค้างแยกตาม freeze_id / ภาพสดใช้ภาพถัดไปจากกล้องร่วมกัน
+    """
+    camera = cameras[camera_id]
+    if camera.is_frozen and camera.last_raw_frame is not None:
+        frozen_frames = (camera.frozen_seq, camera.last_raw_frame, camera.last_lores_frame)
+        return (kind, camera_id, "frozen", camera.freeze_id), frozen_frames
+    return (kind, camera_id, "live"), None
+
+def frame_entry(camera_id, frozen_frames=None):
+    """
+    FrameResult ของภาพค้าง หรือของภาพสด (Worker อ่านอย่างเดียว ไม่ต้อง copy) / None ถ้าไม่มีภาพ
+    ภาพสด: ถ้ามีเฟรมที่เพิ่งใช้ไม่เกิน RESULT_REUSE_SECONDS ใช้เฟรมนั้น (/scan แล้วกด Show YOLO Crop = ภาพเดียวกัน)
+    """
+    live = frozen_frames is None
+    if live:
+        entry = frame_results.recent(camera_id, RESULT_REUSE_SECONDS)
+        if entry is not None:
+            return entry
+        with CAPTURE_SECONDS.time():
+            frozen_frames = cameras[camera_id].next_frame()
+    seq, main_frame, lores = frozen_frames
+    if main_frame is None:
+        return None
+    return frame_results.entry(camera_id, seq, main_frame, lores, live)
+
+def debug_yolo_job(camera_id, frozen_frames):
+    entry = frame_entry(camera_id, frozen_frames)
+    if entry is None:
+        return b""
+    return entry.annotated_jpeg(detect_plate, detector.class_names())
 
 @app.get("/debug_yolo")
-async def debug_yolo():
-    if cameralow.is_frozen and cameralow.last_raw_frame is not None:
-        frame = cameralow.last_raw_frame.copy()
-    else:
-        frame = cameralow.capture_frame()
-    if frame is None: return Response(content=b"", media_type="image/jpeg")
-    results = detect(frame, conf=0.5)
-    annotated_frame = results[0].plot() if results else cv2.cvtColor(frame, cv2.COLOR_RGB2BGR)
-    _, buffer = cv2.imencode(".jpg", annotated_frame)
-    return Response(content=buffer.tobytes(), media_type="image/jpeg")
+async def debug_yolo(camera: Optional[str] = None):
+    camera_id = resolve_camera(camera)
+    if camera_id is None:
+        return unknown_camera(camera)
+    if not detector.is_ready():
+        return Response(content=b"", media_type="image/jpeg", status_code=503)
+    try:
+        key, frozen_frames = frame_request("debug", camera_id)
+        content = await worker.run(key, debug_yolo_job, camera_id, frozen_frames)
+    except WorkerBusy:
+        return Response(content=b"", media_type="image/jpeg", status_code=503)
+    return Response(content=content, media_type="image/jpeg")
 
 # --- ฟังก์ชันช่วยบันทึก Log ---
-def save_log(chars, province):
-    now = datetime.now()
-    date_str = now.strftime("%d-%m-%Y")
-    time_str = now.strftime("%H:%M")
-    
-    # เก็บโดย Path เต็ม โดยใช้ LOG_DIR ที่ประกาศไว้ข้างบน
-    filepath = LOG_DIR / f"record-LPR-of-{date_str}.log"
-    
-    header = f"Record of LPR for {date_str}\n"
-    
-    mode = 'a'
-    # เช็คว่ามีไฟล์นี้ใน Directory หรือไม่
-    if not filepath.exists():
-        mode = 'w'
-        next_num = 1
-    else:
-        # อ่านไฟล์จาก path ที่กำหนด
-        with filepath.open('r', encoding='utf-8') as f:
-            lines = f.readlines()
-            next_num = len(lines)
-            if next_num < 1: next_num = 1
-            
-    # เขียนไฟล์ลงใน path ที่กำหนด
-    with filepath.open(mode, encoding='utf-8') as f:
-        if mode == 'w':
-            f.write(header)
-        
-        log_line = f"{next_num}. {chars} - {province} - เวลา {time_str}\n"
-        f.write(log_line)
+def save_log(chars, province, confidence=None, province_score=None, crop=None, camera=None):
+    # เข้าคิว writer thread ของ RecordStore (ไม่อ่าน/เขียนไฟล์บน path ของการ scan)
+    with SAVE_LOG_SECONDS.time():
+        records.add(chars, province, confidence=confidence, province_score=province_score, crop=crop, camera=camera)
 
-@app.get("/scan")
-async def scan():
-    if cameralow.is_frozen and cameralow.last_raw_frame is not None:
-        frame = cameralow.last_raw_frame.copy()
-    else:
-        frame = cameralow.capture_frame()
+def log_read(frame, detections, data, camera_id):
+    crop = None
+    if SAVE_CROPS:
+        crop = crop_region(frame, plate_bbox(detections)).copy()
+    save_log(data["chars"], data["province"], data.get("confidence"), data.get("province_score"), crop, camera_id)
+
+@app.get("/records")
+def list_records(
+    plate: Optional[str] = None,
+    province: Optional[str] = None,
+    camera: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    limit: int = 100,
+):
+    return records.query(
+        plate=plate,
+        province=province,
+        camera=camera,
+        since=since.timestamp() if since else None,
+        until=until.timestamp() if until else None,
+        limit=max(1, min(limit, 1000)),
+    )
+
+def is_valid_read(data):
+    # กรองสิ่งที่บัคๆ ไม่บันทึกถ้าไม่พบข้อมูล หรือจังหวัดไม่มั่นใจพอ (ไม่ตรงกับรายชื่อจังหวัด)
+    c = data["chars"]
+    p = data["province"]
+    if data.get("province_score", 1.0) < PROVINCE_MIN_SCORE:
+        return False
+    return bool((c != "ไม่พบอักษร") and (p != "ไม่พบจังหวัด") and c and p)
+
+def count_read(data, source):
+    valid = is_valid_read(data)
+    SCANS.labels(source).inc()
+    READS.labels("valid" if valid else "invalid").inc()
+    return valid
 
-    if frame is None:
+def scan_job(camera_id, frozen_frames):
+    entry = frame_entry(camera_id, frozen_frames)
+
+    if entry is None:
         return {"error": "Could not capture frame"}
 
-    results = detect(frame, conf=0.5)
+    # detect / OCR ครั้งเดียวต่อเฟรม: scan ซ้ำบนภาพค้างเดิม (หรือหลัง /debug_yolo) ใช้ผลเดิม
+    # เฟรมเดียวอาจมีหลายป้าย: แยกป้ายแล้ว OCR ทุกป้ายพร้อมกันบน engine pool
+    results, fresh = entry.plates(detect_plate, ocr_plates)
     
-    if results and len(results) > 0 and results[0].boxes:
-        detections = results[0].boxes.data.cpu().numpy()
-        data = run_ocr(frame, detections) # ได้ผลลัพธ์เป็น dict {chars, province}
-        
-        # ตรวจสอบความถูกต้องก่อนบันทึก Log
-        c = data["chars"]
-        p = data["province"]
-        
-        # กรองสิ่งที่บัคๆ ไม่บันทึกถ้าไม่พบข้อมูล
-        is_valid = (c != "ไม่พบอักษร") and (p != "ไม่พบจังหวัด") and c and p
-        
-        if is_valid:
-            save_log(c, p)
-            
-        return data # ส่งค่ากลับไป Frontend (ให้ Frontend ตัดสินใจเรื่องการแสดงผลเองอีกที หรือจะใช้ข้อมูลนี้ก็ได้)
+    if results:
+        plates = []
+        for index, (plate_detections, data) in enumerate(results):
+            # ตรวจสอบความถูกต้องก่อนบันทึก Log (แยกทีละป้าย)
+            # request ที่ถูกรวมกัน / scan ซ้ำบนเฟรมเดิม ได้ผลเดียวกัน และบันทึก Log แค่ครั้งเดียว
+            if fresh and count_read(data, "scan"):
+                log_read(entry.main, plate_detections, data, camera_id)
+            publish_result(data, "scan", camera_id, plate=index, plate_count=len(results))
+            plates.append(data)
+
+        # field บนสุด = ป้ายแรก (ใหญ่สุด) ให้ client เดิมใช้ได้เหมือนเดิม / ทุกป้ายอยู่ใน "plates"
+        return dict(plates[0], plates=plates)
     else:
-        return {"chars": "ไม่พบอักษร", "province": "ไม่พบจังหวัด"}
+        data = {"chars": "ไม่พบอักษร", "province": "ไม่พบจังหวัด"}
+        if fresh:
+            count_read(data, "scan")
+        publish_result(data, "scan", camera_id)
+        return dict(data, plates=[])
+
+@app.get("/scan")
+async def scan(camera: Optional[str] = None):
+    camera_id = resolve_camera(camera)
+    if camera_id is None:
+        return unknown_camera(camera)
+    if not is_ready():
+        model = detector.model_status()
+        error = "model_error" if model["state"] == "error" else "loading"
+        return JSONResponse({"error": error, "model": model["state"]}, status_code=503)
+    try:
+        key, frozen_frames = frame_request("scan", camera_id)
+        return await worker.run(key, scan_job, camera_id, frozen_frames)
+    except WorkerBusy:
+        return JSONResponse({"error": "busy", "queue_size": worker.queue_size()}, status_code=503)
+
+# --- Batch Scan (ภาพที่เก็บไว้จากกล้องอื่น) ---
+# YOLO ทีละ batch + OCR หลายภาพพร้อมกัน ส่งผลกลับเป็น NDJSON ทีละบรรทัดทันทีที่ภาพนั้นเสร็จ
+# ใช้ model_lock ร่วมกับ /scan (ทีละ batch) รับได้ครั้งละ 1 request
+batch_lock = threading.Lock()
+
+def batch_lines(items, log):
+    with batch_lock:
+        for index, name, detections, data in scan_images(items):
+            record = result_record(index, name, detections, data)
+            if "error" not in record:
+                # นับ / บันทึกทีละป้าย (ไม่เจอป้ายเลย = นับเป็น 1 ครั้งที่อ่านไม่ได้)
+                plates = record["plates"] or [record]
+                for plate in plates:
+                    plate["valid"] = count_read(plate, "batch")
+                    if log and plate["valid"]:
+                        save_log(plate["chars"], plate["province"], plate.get("confidence"), plate.get("province_score"))
+                record["valid"] = plates[0]["valid"]
+            yield json.dumps(record, ensure_ascii=False) + "\n"
+
+@app.post("/scan_batch")
+async def scan_batch(files: List[UploadFile] = File(...), log: bool = False):
+    if not is_ready():
+        return JSONResponse({"error": "loading"}, status_code=503)
+    if len(files) > BATCH_MAX_FILES:
+        return JSONResponse({"error": "too_many_files", "max": BATCH_MAX_FILES}, status_code=413)
+    if batch_lock.locked():
+        return JSONResponse({"error": "busy"}, status_code=503)
+    # อ่านไฟล์ให้ครบก่อนเริ่มส่ง response (UploadFile ถูกปิดเมื่อ request handler จบ)
+    items = [(f.filename, await f.read()) for f in files]
+    return StreamingResponse(batch_lines(items, log), media_type="application/x-ndjson")
+
+# --- Auto Scan Pipeline (อ่านป้ายต่อเนื่องโดยไม่ต้องกดปุ่ม) ---
+# ป้ายเดียวกันอยู่ในหลายสิบเฟรมติดกัน: tracker รวมเป็น track เดียว
+# แล้ว OCR เฉพาะภาพที่คมที่สุดไม่กี่ภาพตอน track จบ ได้ record เดียวต่อคัน
+# ภาพจากกล้องเขียนลง FrameRing (shared memory) ครั้งเดียว stage ถัดไปส่งต่อกันแค่เลข seq
+# ทุกกล้องมี FrameRing / tracker / motion gate ของตัวเอง แต่ใช้ detect thread เดียวกัน (round-robin)
+frame_rings = {}
+trackers = {camera_id: PlateTracker() for camera_id in cameras}
+# ฉากไม่เปลี่ยน = ผลของ YOLO ก็ไม่เปลี่ยน: ข้าม detect แล้วใช้กรอบป้ายชุดล่าสุดกับ tracker แทน
+motion_gates = {camera_id: MotionGate() for camera_id in cameras} if MOTION_GATE else {}
+last_plates = {camera_id: [] for camera_id in cameras}
+last_auto_read = {camera_id: {"plate": None, "time": 0.0} for camera_id in cameras}
+
+def pipeline_capture(camera_id):
+    with CAPTURE_SECONDS.time():
+        return cameras[camera_id].capture_into(frame_rings[camera_id])
+
+def pipeline_detect(camera_id, seq):
+    with frame_rings[camera_id].lease(seq) as (seq, views):
+        if views is None:
+            return []   # เฟรมถูกเขียนทับไปแล้ว (detect ตามไม่ทัน)
+        frame = views["main"]
+        lores = views.get("lores")
+        gate = motion_gates.get(camera_id)
+        if gate is None or gate.check(lores if lores is not None else frame):
+            detections = detect_plate(frame, lores)
+            last_plates[camera_id] = split_plates(detections) if detections is not None else []
+            frame_results.set_latest(camera_id, detections, (frame.shape[1], frame.shape[0]))
+        else:
+            frame_results.touch(camera_id)
+        # tracker copy เฉพาะ crop ป้ายออกไป ก่อนคืน slot ให้กล้อง
+        return [(camera_id, track) for track in trackers[camera_id].update(frame, last_plates[camera_id])]
+
+def pipeline_ocr(job):
+    _, track = job
+    # ส่ง crop ของทุก sample เข้า engine pool ก่อนค่อยรอผล (อ่านพร้อมกัน ไม่ใช่ทีละ sample)
+    jobs = [submit_ocr(crop, dets) for _, crop, dets in track.samples]
+    readings = [collect_ocr(job) for job in jobs]
+    data = vote(readings)
+    data["track_id"] = track.id
+    return data
+
+def pipeline_result(job, data):
+    camera_id, track = job
+    if not count_read(data, "auto"):
+        return
+    # track หลุดแล้วกลับมาใหม่ (รถคันเดิม) ไม่ต้องบันทึกซ้ำ (นับแยกต่อกล้อง: ช่องเข้า/ช่องออกเป็นคนละ record)
+    last = last_auto_read[camera_id]
+    plate = (data["chars"], data["province"])
+    now = time.monotonic()
+    if plate == last["plate"] and now - last["time"] < PIPELINE_DEDUP_SECONDS:
+        return
+    last["plate"] = plate
+    last["time"] = now
+    crop = track.samples[0][1] if SAVE_CROPS else None
+    save_log(data["chars"], data["province"], data["confidence"], data["province_score"], crop, camera_id)
+    publish_result(data, "auto", camera_id)
+
+def pipeline_flush():
+    """track ที่ยังเปิดอยู่ตอน stop (รถยังอยู่หน้ากล้อง) ส่งไป OCR แทนที่จะหายไปเฉยๆ"""
+    return [(camera_id, track) for camera_id, tracker in trackers.items() for track in tracker.flush()]
+
+pipeline = AutoScanPipeline(
+    camera_ids=list(cameras),
+    capture_fn=pipeline_capture,
+    detect_fn=pipeline_detect,
+    ocr_fn=pipeline_ocr,
+    on_result=pipeline_result,
+    paused_fn=lambda camera_id: cameras[camera_id].is_frozen,
+    flush_fn=pipeline_flush,
+)
+
+@app.get("/pipeline")
+async def pipeline_status():
+    return pipeline_snapshot()
+
+@app.post("/pipeline/start")
+def pipeline_start():
+    pipeline.start()
+    events.publish("pipeline", health_snapshot(), sticky=True)
+    return pipeline_snapshot()
+
+@app.post("/pipeline/stop")
+def pipeline_stop():
+    pipeline.stop()
+    events.publish("pipeline", health_snapshot(), sticky=True)
+    return pipeline_snapshot()
+
+# --- OCR cache ---
+def ocr_cache_stats():
+    cache = get_pool().cache
+    return cache.stats() if cache is not None else {}
+
+@app.get("/ocr_cache")
+def ocr_cache_status():
+    return ocr_cache_stats()
+
+# --- Record sync (Pi -> aggregator) ---
+def sync_stats():
+    return record_sync.stats() if record_sync is not None else {}
+
+@app.get("/sync")
+def sync_status():
+    return sync_stats() or {"enabled": False}
+
+# --- Performance governor: ลด imgsz / fps ของ stream / OCR พร้อมกัน เมื่อร้อน / CPU เต็ม / latency เกิน budget ---
+def set_stream_fps(fps):
+    for camera in cameras.values():
+        camera.set_stream_fps(fps)
+
+def publish_governor(change):
+    events.publish("governor", dict(change, settings=governor.settings), sticky=True)
+    events.publish("pipeline", health_snapshot(), sticky=True)
+
+governor = Governor() if GOVERNOR_ENABLED else None
+if governor is not None:
+    governor.add_knob("imgsz", lambda value: detector.set_tuning(imgsz=value))
+    governor.add_knob("conf", lambda value: detector.set_tuning(conf=value))
+    governor.add_knob("stream_fps", set_stream_fps)
+    governor.add_knob("ocr_workers", lambda value: get_pool().set_concurrency(value))
+    governor.on_change(publish_governor)
+
+def governor_stats():
+    return governor.stats() if governor is not None else {}
+
+@app.get("/governor")
+def governor_status():
+    return governor_stats() or {"enabled": False}
+
+# --- Prometheus metrics ---
+# ค่าที่มีอยู่แล้วในสถานะของ service อ่านตอน scrape (ไม่เพิ่มงานบน path ของภาพ)
+def _per_camera(fn):
+    return lambda: {(camera_id,): fn(camera) for camera_id, camera in cameras.items()}
+
+def _per_client(field):
+    def values():
+        out = {}
+        for camera_id, camera in cameras.items():
+            for client_id, c in camera.broadcaster.stats()["clients"].items():
+                out[(camera_id, client_id)] = c[field]
+        return out
+    return values
+
+metrics.collect("lpr_stream_viewers", "Connected MJPEG viewers",
+                _per_camera(lambda c: c.broadcaster.viewers), labelnames=["camera"])
+metrics.collect("lpr_frozen", "1 while the live view is frozen", _per_camera(lambda c: int(c.is_frozen)), labelnames=["camera"])
+metrics.collect("lpr_mjpeg_frames_published_total", "JPEG frames received from the camera encoder",
+                _per_camera(lambda c: c.broadcaster.stats()["seq"]), kind="counter", labelnames=["camera"])
+metrics.collect("lpr_mjpeg_frames_written_total", "MJPEG frames written to all viewers",
+                _per_camera(lambda c: c.broadcaster.stats()["sent_total"]), kind="counter", labelnames=["camera"])
+metrics.collect("lpr_mjpeg_frames_dropped_total", "MJPEG frames skipped for slow viewers",
+                _per_camera(lambda c: c.broadcaster.stats()["skipped_total"]), kind="counter", labelnames=["camera"])
+metrics.collect("lpr_mjpeg_client_frames_written", "MJPEG frames written per connected viewer",
+                _per_client("sent"), labelnames=["camera", "client"])
+metrics.collect("lpr_mjpeg_client_frames_dropped", "MJPEG frames skipped per connected viewer",
+                _per_client("skipped"), labelnames=["camera", "client"])
+metrics.collect("lpr_inference_queue", "Jobs waiting for the inference worker", worker.queue_size)
+metrics.collect("lpr_pipeline_dropped_total", "Frames/tracks dropped between pipeline stages",
+                lambda: {(name,): s.get("dropped", 0) for name, s in pipeline.snapshot()["stages"].items()},
+                kind="counter", labelnames=["stage"])
+metrics.collect("lpr_pipeline_camera_frames_total", "Auto-scan frames per camera taken by the detector or dropped while it was busy",
+                lambda: {(cid, outcome): c.get(outcome, 0) for cid, c in pipeline.snapshot()["cameras"].items()
+                         for outcome in ("detected", "dropped")},
+                kind="counter", labelnames=["camera", "outcome"])
+
+metrics.collect("lpr_ocr_cache_events_total", "OCR cache counters (hits, near_hits, misses, evictions, expired)",
+                lambda: {(k,): v for k, v in ocr_cache_stats().items() if k not in ("entries", "bytes", "hit_rate")},
+                kind="counter", labelnames=["event"])
+metrics.collect("lpr_ocr_cache_entries", "Entries in the OCR cache", lambda: ocr_cache_stats().get("entries", 0))
+metrics.collect("lpr_ocr_cache_bytes", "Approximate memory used by the OCR cache", lambda: ocr_cache_stats().get("bytes", 0))
+metrics.collect("lpr_ready", "1 once the model and OCR engines are warmed up", lambda: int(is_ready()))
+metrics.collect("lpr_import_seconds", "Time spent importing the service modules", lambda: IMPORT_SECONDS)
+metrics.collect("lpr_model_load_seconds", "Detector model load / warm-up time",
+                lambda: {(phase,): detector.model_status()[f"{phase}_seconds"] or 0.0 for phase in ("load", "warmup")},
+                labelnames=["phase"])
+
+metrics.collect("lpr_motion_gate_frames_total", "Auto-scan frames by motion gate decision (skip = YOLO not run)",
+                lambda: {(cid, k): gate.counts[k] for cid, gate in motion_gates.items() for k in ("detect", "skip", "forced")},
+                kind="counter", labelnames=["camera", "decision"])
+metrics.collect("lpr_motion_score", "Fraction of pixels that differ from the background",
+                lambda: {(cid,): gate.score for cid, gate in motion_gates.items()}, labelnames=["camera"])
+
+metrics.collect("lpr_sync_pending_records", "Local records not yet acknowledged by the aggregator",
+                lambda: sync_stats().get("pending", 0))
+metrics.collect("lpr_sync_uploaded_records_total", "Records accepted by the aggregator (duplicates excluded)",
+                lambda: sync_stats().get("uploaded", 0), kind="counter")
+metrics.collect("lpr_sync_failures_total", "Failed upload attempts", lambda: sync_stats().get("failures", 0), kind="counter")
+metrics.collect("lpr_sync_bytes_total", "Compressed bytes uploaded", lambda: sync_stats().get("bytes_sent", 0), kind="counter")
+
+metrics.collect("lpr_frame_results_total", "Per-frame result lookups (hit = detect/OCR/JPEG reused from the same frame)",
+                lambda: {(k,): frame_results.stats()[k] for k in ("hits", "misses")}, kind="counter", labelnames=["result"])
+metrics.collect("lpr_overlay_frames_total", "Overlay frames rendered for /video_feed?overlay=1",
+                lambda: overlay.rendered, kind="counter")
+metrics.collect("lpr_overlay_viewers", "Connected overlay viewers",
+                _per_camera(lambda c: c.overlay.viewers), labelnames=["camera"])
+
+def _governor_signal(name):
+    # ไม่มีค่า (ไม่มี governor / ไม่ใช่ Pi) = ไม่ส่ง sample
+    value = governor_stats().get("signals", {}).get(name)
+    return {} if value is None else value
+
+metrics.collect("lpr_governor_level", "Performance governor level (0 = full quality)", lambda: governor_stats().get("level", 0))
+metrics.collect("lpr_governor_setting", "Value currently applied by the governor",
+                lambda: {(k,): v for k, v in governor_stats().get("settings", {}).items() if v is not None},
+                labelnames=["setting"])
+metrics.collect("lpr_cpu_utilization", "CPU busy fraction over the last governor interval", lambda: _governor_signal("cpu"))
+metrics.collect("lpr_soc_temperature_celsius", "SoC temperature read by the governor", lambda: _governor_signal("temperature"))
+
+@app.get("/metrics")
+def metrics_endpoint():
+    return PlainTextResponse(metrics.REGISTRY.render(), media_type=metrics.CONTENT_TYPE)
 
 if __name__ == "__main__":
-    uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
+    uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -0,0 +1,235 @@
+# metrics.py
+"""
+Prometheus metrics (text exposition format 0.0.4) โดยไม่ต้องใช้ prometheus_client
+- hot path: observe()/inc() แค่ bisect + บวกเลขใต้ lock ของ metric นั้น (ระดับไมโครวินาที)
+- ค่าที่อ่านได้จากสถานะอยู่แล้ว (ผู้ชม, Freeze, MJPEG ต่อ client) ใช้ collector เรียกตอน scrape เท่านั้น
+"""
+import bisect
+import threading
+import time
+
+# วินาที: ครอบคลุมตั้งแต่ copy ภาพ (~ms) จนถึง YOLO บน CPU (~s)
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _format_labels(names, values, extra=""):
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Timer:
+    __slots__ = ("_child", "_start")
+
+    def __init__(self, child):
+        self._child = child
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self._child.observe(time.perf_counter() - self._start)
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children = {}
+        self._lock = threading.Lock()
+        if not self.labelnames:
+            self._default = self._children[()] = self._new_child()
+
+    def labels(self, *values):
+        key = tuple(str(v) for v in values)
+        child = self._children.get(key)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child())
+        return child
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for key, child in list(self._children.items()):
+            lines.extend(child.render(self.name, self.labelnames, key))
+        return lines
+
+
+class _CounterChild:
+    __slots__ = ("value", "_lock")
+
+    def __init__(self):
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1):
+        with self._lock:
+            self.value += amount
+
+    def render(self, name, labelnames, key):
+        return [f"{name}{_format_labels(labelnames, key)} {_format_value(self.value)}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def inc(self, amount=1):
+        self._default.inc(amount)
+
+
+class _HistogramChild:
+    __slots__ = ("buckets", "counts", "sum", "_lock")
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)      # ช่องสุดท้าย = +Inf
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[i] += 1
+            self.sum += value
+
+    def time(self):
+        return _Timer(self)
+
+    def render(self, name, labelnames, key):
+        with self._lock:
+            counts = list(self.counts)
+            total = self.sum
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float("inf"),), counts):
+            cumulative += count
+            le = f'le="{_format_value(bound)}"'
+            lines.append(f"{name}_bucket{_format_labels(labelnames, key, le)} {cumulative}")
+        lines.append(f"{name}_sum{_format_labels(labelnames, key)} {total!r}")
+        lines.append(f"{name}_count{_format_labels(labelnames, key)} {cumulative}")
+        return lines
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(float(b) for b in buckets)
+        super().__init__(name, documentation, labelnames)
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value):
+        self._default.observe(value)
+
+    def time(self):
+        """with HISTOGRAM.time(): ... จับเวลาช่วงนั้นเป็นวินาที"""
+        return _Timer(self._default)
+
+    def totals(self):
+        """(จำนวนครั้ง, ผลรวม) ของทุก label รวมกัน (ผลต่างระหว่าง 2 ครั้ง = ค่าเฉลี่ยของช่วงนั้น)"""
+        count, total = 0, 0.0
+        for child in list(self._children.values()):
+            with child._lock:
+                count += sum(child.counts)
+                total += child.sum
+        return count, total
+
+
+class Collected:
+    """
+    metric ที่อ่านค่าตอน scrape จาก fn()
+    fn คืนค่าตัวเลข (ไม่มี label) หรือ dict {(label values...): ค่า}
+    """
+
+    def __init__(self, name, documentation, kind, fn, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.kind = kind
+        self.fn = fn
+        self.labelnames = tuple(labelnames)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        try:
+            value = self.fn()
+        except Exception as e:
+            print(f"metrics: {self.name} collector failed: {e}")
+            return []
+        items = value.items() if isinstance(value, dict) else [((), value)]
+        for key, v in items:
+            lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(v)}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            self._metrics.append(metric)
+        return metric
+
+    def render(self):
+        lines = []
+        for metric in list(self._metrics):
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def counter(name, documentation, labelnames=()):
+    return REGISTRY.register(Counter(name, documentation, labelnames))
+
+
+def histogram(name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+    return REGISTRY.register(Histogram(name, documentation, labelnames, buckets))
+
+
+def collect(name, documentation, fn, kind="gauge", labelnames=()):
+    return REGISTRY.register(Collected(name, documentation, kind, fn, labelnames))
+
+
+# -----------------------------
+# Metrics ของ service (ทุก module import จากที่นี่)
+# -----------------------------
+CAPTURE_SECONDS = histogram("lpr_capture_seconds", "Time to grab a frame from the camera")
+DETECT_SECONDS = histogram("lpr_detect_seconds", "YOLO inference time per call, one frame or one batch (excluding lock wait)")
+DETECT_FRAME_SECONDS = histogram("lpr_detect_frame_seconds", "YOLO inference time per frame (batch time / batch size, excluding warm-up)")
+CROP_SECONDS = histogram("lpr_ocr_crop_seconds", "Crop + grayscale time per OCR region", ["kind"])
+TESSERACT_SECONDS = histogram("lpr_tesseract_seconds", "Tesseract call time per crop", ["kind"])
+CLASSIFIER_SECONDS = histogram("lpr_char_classifier_seconds", "Per-plate character classifier time (all chars, one batch)")
+FIX_PROVINCE_SECONDS = histogram("lpr_fix_province_seconds", "Province fuzzy-match time")
+SAVE_LOG_SECONDS = histogram("lpr_save_log_seconds", "Time to hand a record to the record store")
+
+SCANS = counter("lpr_scans_total", "Plate reads attempted", ["source"])
+READS = counter("lpr_reads_total", "Plate reads by validity", ["result"])
+CHAR_READS = counter("lpr_char_reads_total", "Character lines read, by method", ["method"])
+GOVERNOR_CHANGES = counter("lpr_governor_changes_total", "Performance governor level changes", ["direction"])
@@ -0,0 +1,66 @@
+# mockcamera.py
+"""
+กล้องจำลองแทน cameralow (ไม่ต้องมี Picamera2) เล่นภาพจากโฟลเดอร์หรือไฟล์วิดีโอ
+มีฟังก์ชัน/ตัวแปรชื่อเดียวกับ cameralow ทุกตัว ใช้ install() ก่อน import main:
+
+    import mockcamera
+    mockcamera.install("./samples", fps=10)
+    import main
+"""
+import sys
+
+from config import MOCK_CAMERA_SOURCE, MOCK_CAMERA_FPS, MOCK_CAMERA_LOOP, MOCK_CAMERA_PRELOAD
+from sources import open_file_source
+
+# -----------------------------
+# Global State (เหมือน cameralow)
+# -----------------------------
+# ImageFolderSource / OpenCVSource ของ sources.py สร้างตอน init_camera
+# ตัวแปรของ camera (is_frozen, broadcaster, current_name, ...) อ่านผ่าน module ได้เหมือน cameralow
+camera = None
+
+
+def __getattr__(name):
+    if camera is None:
+        raise AttributeError(f"mockcamera.{name}: call init_camera() first")
+    return getattr(camera, name)
+
+
+# -----------------------------
+# Camera Logic (interface เดียวกับ cameralow)
+# -----------------------------
+def init_camera(path=None, fps=None, loop=None, preload=None):
+    """
+    path = โฟลเดอร์ภาพ หรือไฟล์วิดีโอ (None = MOCK_CAMERA_SOURCE)
+    fps > 0 = เล่นภาพเข้า MJPEG stream ด้วย thread แยก / 0 = ภาพเปลี่ยนเฉพาะตอน capture
+    preload = โฟลเดอร์: เตรียมภาพ + JPEG ไว้ใน memory ก่อน (ไม่มีงาน decode / encode ระหว่างเล่น)
+    """
+    global camera
+    if camera is not None:
+        return
+    path = path or MOCK_CAMERA_SOURCE
+    if path is None:
+        raise ValueError("mockcamera needs a source (MOCK_CAMERA_SOURCE or init_camera(path))")
+    fps = MOCK_CAMERA_FPS if fps is None else fps
+    loop = MOCK_CAMERA_LOOP if loop is None else loop
+    preload = MOCK_CAMERA_PRELOAD if preload is None else preload
+
+    print(f"Initializing Mock Camera ({path})...")
+    camera = open_file_source(path, fps, loop, preload)
+    camera.init_camera()
+
+
+def close_camera():
+    global camera
+    if camera is not None:
+        camera.close_camera()
+        camera = None
+
+
+def install(path=None, fps=None, loop=None, preload=None):
+    """แทนที่ module cameralow ด้วย mockcamera (ต้องเรียกก่อน import main) แล้วเปิด source"""
+    module = sys.modules[__name__]
+    sys.modules["cameralow"] = module
+    if path is not None:
+        init_camera(path, fps, loop, preload)
+    return module
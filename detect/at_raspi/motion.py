@@ -0,0 +1,96 @@
+# motion.py
+import threading
+import time
+
+import cv2
+import numpy as np
+
+from config import (
+    MOTION_SIZE, MOTION_ALPHA, MOTION_PIXEL_THRESHOLD, MOTION_ON_RATIO, MOTION_OFF_RATIO,
+    MOTION_HOLD_SECONDS, MOTION_REFRESH_SECONDS
+)
+
+
+# -----------------------------
+# Motion Gate
+# -----------------------------
+class MotionGate:
+    """
+    ตัดสินว่าเฟรมนี้ควรรัน YOLO หรือไม่ (ฉากนิ่ง / ไม่มีรถ = ข้าม)
+    - ย่อภาพเหลือ 64x36 สีเทา เทียบกับพื้นหลังแบบ running average
+    - score = สัดส่วน pixel ที่ต่างจากพื้นหลังเกิน MOTION_PIXEL_THRESHOLD
+    - hysteresis: เริ่ม detect เมื่อ score >= ON_RATIO แล้ว detect ต่อจนกว่า score จะต่ำกว่า OFF_RATIO
+      นานเกิน HOLD_SECONDS (รถที่ขยับช้าๆ ไม่ทำให้ gate เปิดๆ ปิดๆ)
+    - บังคับ detect ทุก REFRESH_SECONDS แม้ฉากนิ่ง (เผื่อรถจอดนิ่งอยู่แล้วตั้งแต่เริ่ม)
+    """
+
+    def __init__(self, size=MOTION_SIZE, alpha=MOTION_ALPHA, pixel_threshold=MOTION_PIXEL_THRESHOLD,
+                 on_ratio=MOTION_ON_RATIO, off_ratio=MOTION_OFF_RATIO,
+                 hold_seconds=MOTION_HOLD_SECONDS, refresh_seconds=MOTION_REFRESH_SECONDS):
+        self.size = size
+        self.alpha = alpha
+        self.pixel_threshold = pixel_threshold
+        self.on_ratio = on_ratio
+        self.off_ratio = off_ratio
+        self.hold_seconds = hold_seconds
+        self.refresh_seconds = refresh_seconds
+
+        self._background = None
+        self._active = False
+        self._last_motion = 0.0
+        self._last_detect = 0.0
+        self._lock = threading.Lock()
+        self.score = 0.0
+        self.counts = {"detect": 0, "skip": 0, "forced": 0}
+
+    def _small_gray(self, frame):
+        # ย่อก่อนแปลงสี (แปลงสีแค่ 64x36 pixel)
+        small = cv2.resize(frame, self.size, interpolation=cv2.INTER_AREA)
+        if small.ndim == 3:
+            small = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+        return small.astype(np.float32)
+
+    def check(self, frame, now=None):
+        """True = ควรรัน detect กับเฟรมนี้"""
+        now = time.monotonic() if now is None else now
+        gray = self._small_gray(frame)
+        with self._lock:
+            if self._background is None:
+                self._background = gray
+                self.score = 1.0
+            else:
+                diff = cv2.absdiff(gray, self._background)
+                self.score = float(np.count_nonzero(diff > self.pixel_threshold)) / diff.size
+                cv2.accumulateWeighted(gray, self._background, self.alpha)
+
+            if self.score >= (self.off_ratio if self._active else self.on_ratio):
+                self._active = True
+                self._last_motion = now
+            elif self._active and now - self._last_motion > self.hold_seconds:
+                self._active = False
+
+            if self._active:
+                decision = "detect"
+            elif now - self._last_detect >= self.refresh_seconds:
+                decision = "forced"
+            else:
+                decision = "skip"
+            self.counts[decision] += 1
+            if decision != "skip":
+                self._last_detect = now
+        return decision != "skip"
+
+    def reset(self):
+        with self._lock:
+            self._background = None
+            self._active = False
+
+    def stats(self):
+        with self._lock:
+            total = sum(self.counts.values())
+            return dict(
+                self.counts,
+                active=self._active,
+                score=round(self.score, 4),
+                skip_ratio=round(self.counts["skip"] / total, 4) if total else 0.0,
+            )
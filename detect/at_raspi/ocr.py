@@ -1,76 +1,234 @@
 import cv2
-import pytesseract
 import re
-from PIL import Image
+import numpy as np
 from config import (
     CHAR_CLASS_ID,
     PROVINCE_CLASS_ID,
     TESSERACT_CHAR_CONFIG,
-    TESSERACT_PROVINCE_CONFIG
+    TESSERACT_PROVINCE_CONFIG,
+    PROVINCE_MIN_SCORE,
+    CHAR_CLASSIFIER,
+    PLATE_X_MARGIN,
+    PLATE_Y_REACH,
+    CHAR_GAP_RATIO
 )
-import difflib
-# รายชื่อจังหวัดในประเทศไทย สำหรับการตรวจสอบและแก้ไขข้อความ
-THAI_PROVINCES = [
-    "กรุงเทพมหานคร", "กระบี่", "กาญจนบุรี", "กาฬสินธุ์", "กำแพงเพชร", "ขอนแก่น", "จันทบุรี", "ฉะเชิงเทรา", "ชลบุรี", "ชัยนาท",
-    "ชัยภูมิ", "ชุมพร", "เชียงราย", "เชียงใหม่", "ตรัง", "ตราด", "ตาก", "นครนายก", "นครปฐม", "นครพนม", "นครราชสีมา",
-    "นครศรีธรรมราช", "นครสวรรค์", "นนทบุรี", "นราธิวาส", "น่าน", "บึงกาฬ", "บุรีรัมย์", "ปทุมธานี", "ประจวบคีรีขันธ์",
-    "ปราจีนบุรี", "ปัตตานี", "พระนครศรีอยุธยา", "พะเยา", "พังงา", "พัทลุง", "พิจิตร", "พิษณุโลก", "เพชรบุรี", "เพชรบูรณ์",
-    "แพร่", "ภูเก็ต", "มหาสารคาม", "มุกดาหาร", "แม่ฮ่องสอน", "ยโสธร", "ยะลา", "ร้อยเอ็ด", "ระนอง", "ระยอง", "ราชบุรี",
-    "ลพบุรี", "ลำปาง", "ลำพูน", "เลย", "ศรีสะเกษ", "สกลนคร", "สงขลา", "สตูล", "สมุทรปราการ", "สมุทรสงคราม", "สมุทรสาคร",
-    "สระแก้ว", "สระบุรี", "สิงห์บุรี", "สุโขทัย", "สุพรรณบุรี", "สุราษฎร์ธานี", "สุรินทร์", "หนองคาย", "หนองบัวลำภู",
-    "อ่างทอง", "อำนาจเจริญ", "อุดรธานี", "อุตรดิตถ์", "อุทัยธานี", "อุบลราชธานี"
-]
+from ocr_backend import get_pool
+from dualstream import crop_region
+from province_matcher import THAI_PROVINCES, match_province
+from char_classifier import get_classifier
+from metrics import CROP_SECONDS, FIX_PROVINCE_SECONDS, CLASSIFIER_SECONDS, CHAR_READS
 
 def fix_province(ocr_text):
     if not ocr_text: return ""
-    clean_text = ocr_text.replace(" ", "").replace(".", "").replace("-", "")
-    matches = difflib.get_close_matches(clean_text, THAI_PROVINCES, n=1, cutoff=0.4)
-    return matches[0] if matches else ocr_text
+    with FIX_PROVINCE_SECONDS.time():
+        matches = match_province(ocr_text)
+    if matches and matches[0][1] >= PROVINCE_MIN_SCORE:
+        return matches[0][0]
+    return ocr_text
 
-def run_ocr(frame, detections):
+def plate_bbox(detections):
+    """กรอบรวมของทุก box ในป้าย (x1, y1, x2, y2) ใช้ crop ภาพป้ายเก็บไว้อ้างอิง"""
+    boxes = detections[:, :4]
+    return boxes[:, 0].min(), boxes[:, 1].min(), boxes[:, 2].max(), boxes[:, 3].max()
+
+def _anchor_chars(chars, provinces):
+    """
+    จับตัวอักษรเข้ากับกรอบจังหวัด (ป้ายไทย: แถวตัวอักษรอยู่เหนือชื่อจังหวัด)
+    คืนค่า index ของกรอบจังหวัดของตัวอักษรแต่ละตัว (-1 = ไม่เข้ากับจังหวัดไหน)
+    """
+    cx = (chars[:, 0] + chars[:, 2]) / 2
+    cy = (chars[:, 1] + chars[:, 3]) / 2
+    ch = np.maximum(chars[:, 3] - chars[:, 1], 1.0)[:, None]
+    pw = np.maximum(provinces[:, 2] - provinces[:, 0], 1.0)[None, :]
+    pcx = ((provinces[:, 0] + provinces[:, 2]) / 2)[None, :]
+
+    # (ตัวอักษร, จังหวัด): อยู่ในแนวเดียวกันแนวนอน และอยู่เหนือกรอบจังหวัดไม่ไกลเกิน
+    inside_x = ((cx[:, None] >= provinces[None, :, 0] - PLATE_X_MARGIN * pw) &
+                (cx[:, None] <= provinces[None, :, 2] + PLATE_X_MARGIN * pw))
+    dy = provinces[None, :, 1] - cy[:, None]           # > 0 = ตัวอักษรอยู่เหนือขอบบนของจังหวัด
+    above = (dy > -0.5 * ch) & (dy < PLATE_Y_REACH * ch)
+    cost = np.where(inside_x & above, np.abs(cx[:, None] - pcx) / pw + np.abs(dy) / ch, np.inf)
+
+    best = cost.argmin(axis=1)
+    return np.where(np.isfinite(cost[np.arange(len(chars)), best]), best, -1)
+
+def _cluster_chars(chars):
+    """
+    ตัวอักษรที่ไม่มีกรอบจังหวัด: แถวเดียวกัน + ห่างกันไม่เกิน CHAR_GAP_RATIO x ความสูง = ป้ายเดียวกัน
+    (connected components จาก adjacency matrix) คืนค่าเลขกลุ่ม 0..k-1
+    """
+    h = np.maximum(chars[:, 3] - chars[:, 1], 1.0)
+    cy = (chars[:, 1] + chars[:, 3]) / 2
+    hmax = np.maximum(h[:, None], h[None, :])
+    same_row = np.abs(cy[:, None] - cy[None, :]) < 0.5 * hmax
+    gap = np.maximum(chars[None, :, 0] - chars[:, None, 2], chars[:, None, 0] - chars[None, :, 2])
+    reach = (same_row & (gap < CHAR_GAP_RATIO * hmax)).astype(np.int32)
+
+    # transitive closure: ยกกำลังสองไปเรื่อยๆ จนไม่เปลี่ยน (log2(N) รอบ)
+    while True:
+        grown = (reach @ reach > 0).astype(np.int32)
+        if np.array_equal(grown, reach):
+            break
+        reach = grown
+    _, groups = np.unique(reach.argmax(axis=1), return_inverse=True)
+    return groups
+
+def split_plates(detections):
+    """
+    แยก detections (N, 6) ของทั้งเฟรมออกเป็นรายป้าย [detections ของแต่ละป้าย]
+    - กรอบจังหวัดแต่ละกรอบเป็นหลักของป้ายหนึ่ง ตัวอักษรเข้ากับจังหวัดที่อยู่ใต้ตัวเองและใกล้ที่สุด
+    - ตัวอักษรที่ไม่มีจังหวัด (จังหวัดหลุดกรอบ / detect ไม่เจอ) จัดกลุ่มตามแถวและระยะห่าง
+    เรียงป้ายจากกรอบใหญ่ไปเล็ก (ป้ายแรก = รถที่ใกล้กล้องที่สุด)
+    """
+    if not len(detections):
+        return []
+    class_ids = detections[:, 5].astype(int)
+    chars = detections[class_ids == CHAR_CLASS_ID]
+    provinces = detections[class_ids == PROVINCE_CLASS_ID]
+
+    labels = np.full(len(chars), -1)
+    if len(chars) and len(provinces):
+        labels = _anchor_chars(chars, provinces)
+    free = np.flatnonzero(labels < 0)
+    if free.size:
+        labels[free] = len(provinces) + _cluster_chars(chars[free])
+
+    plates = []
+    count = max(len(provinces), labels.max() + 1 if len(labels) else 0)
+    for p in range(count):
+        members = chars[labels == p]
+        if p < len(provinces):
+            members = np.vstack([members, provinces[p:p + 1]])
+        if len(members):
+            plates.append(members)
+
+    def area(plate):
+        x1, y1, x2, y2 = plate_bbox(plate)
+        return (x2 - x1) * (y2 - y1)
+    plates.sort(key=area, reverse=True)
+    return plates
+
+def classify_chars(frame, boxes):
+    """
+    อ่านตัวอักษรจากกรอบของ YOLO ทีละตัว (เรียงซ้ายไปขวามาแล้ว) ด้วย char classifier
+    คืนค่าข้อความ หรือ None ถ้าไม่มี template / มีตัวที่ไม่มั่นใจ (ให้ใช้ Tesseract แทน)
+    """
+    classifier = get_classifier() if CHAR_CLASSIFIER else None
+    if classifier is None:
+        return None
+    with CLASSIFIER_SECONDS.time():
+        grays = []
+        for box in boxes:
+            crop = crop_region(frame, box)
+            if crop.size == 0:
+                return None
+            grays.append(cv2.cvtColor(crop, cv2.COLOR_RGB2GRAY))
+        text, _ = classifier.read(grays)
+    return text
+
+def submit_ocr(frame, detections):
+    """
+    เริ่ม OCR ของป้ายหนึ่ง (detections ของป้ายเดียว) ส่ง crop เข้า engine pool แล้วคืนค่าทันที
+    ผลลัพธ์อ่านด้วย collect_ocr() (ส่งหลายป้ายก่อนแล้วค่อยรอ = ทุกป้ายอ่านพร้อมกันบน pool)
+    """
     char_boxes = []
     province_box = None
+    province_conf = -1.0
 
+    # เก็บพิกัดเป็น float (อาจแปลงมาจากภาพ lores) แล้วค่อยปัดออกด้านนอกตอน crop
     for det in detections:
-        x1, y1, x2, y2, conf, class_id = det.astype(int)
+        x1, y1, x2, y2 = det[:4]
+        class_id = int(det[5])
         if class_id == CHAR_CLASS_ID:
             char_boxes.append(((x1, y1, x2, y2), x1))
-        elif class_id == PROVINCE_CLASS_ID:
+        elif class_id == PROVINCE_CLASS_ID and det[4] > province_conf:
+            # ป้ายเดียวมีกรอบจังหวัดซ้ำ: ใช้กรอบที่มั่นใจที่สุด
             province_box = (x1, y1, x2, y2)
+            province_conf = det[4]
 
     plate_chars = ""
-    plate_province = ""
+
+    # ส่ง crop จังหวัดเข้า engine pool ก่อน ระหว่างรอก็อ่านตัวอักษรไปพร้อมกัน
+    pool = get_pool()
+    char_job = None
+    province_job = None
+
+    if province_box:
+        with CROP_SECONDS.labels("province").time():
+            crop = crop_region(frame, province_box)
+            gray = cv2.cvtColor(crop, cv2.COLOR_RGB2GRAY)
+        province_job = pool.submit(gray, TESSERACT_PROVINCE_CONFIG, "province")
 
     if char_boxes:
         char_boxes.sort(key=lambda x: x[1])
-        xs = [b[0][0] for b in char_boxes]
-        ys = [b[0][1] for b in char_boxes]
-        xe = [b[0][2] for b in char_boxes]
-        ye = [b[0][3] for b in char_boxes]
-
-        crop = frame[min(ys):max(ye), min(xs):max(xe)]
-        gray = cv2.cvtColor(crop, cv2.COLOR_RGB2GRAY)
-        txt = pytesseract.image_to_string(
-            Image.fromarray(gray),
-            config=TESSERACT_CHAR_CONFIG
-        )
+        # อ่านทีละตัวจากกรอบของ YOLO ก่อน (เร็วกว่ามาก) ไม่มั่นใจค่อยใช้ Tesseract ทั้งบรรทัด
+        plate_chars = classify_chars(frame, [b[0] for b in char_boxes]) or ""
+        if plate_chars:
+            CHAR_READS.labels("classifier").inc()
+        else:
+            xs = [b[0][0] for b in char_boxes]
+            ys = [b[0][1] for b in char_boxes]
+            xe = [b[0][2] for b in char_boxes]
+            ye = [b[0][3] for b in char_boxes]
+
+            with CROP_SECONDS.labels("char").time():
+                crop = crop_region(frame, (min(xs), min(ys), max(xe), max(ye)))
+                gray = cv2.cvtColor(crop, cv2.COLOR_RGB2GRAY)
+            char_job = pool.submit(gray, TESSERACT_CHAR_CONFIG, "char")
+            CHAR_READS.labels("tesseract").inc()
+
+    return detections, plate_chars, char_job, province_job
+
+def collect_ocr(job):
+    """รอผลของ submit_ocr() คืนค่า dict {chars, province, ...}"""
+    detections, plate_chars, char_job, province_job = job
+    plate_province = ""
+    province_candidates = ()
+
+    if char_job:
+        txt = char_job.result()
         
         # 2. แก้ไข Logic กรองตัวอักษร: เอาเฉพาะ ก-ฮ และ 0-9
         # Regex [^0-9ก-ฮ] หมายถึง อะไรที่ไม่ใช่เลขและไทย ให้แทนที่ด้วยค่าว่าง
         plate_chars = re.sub(r'[^0-9ก-ฮ]', '', txt.strip())
 
-    if province_box:
-        x1, y1, x2, y2 = province_box
-        crop = frame[y1:y2, x1:x2]
-        gray = cv2.cvtColor(crop, cv2.COLOR_RGB2GRAY)
-        txt = pytesseract.image_to_string(
-            Image.fromarray(gray),
-            config=TESSERACT_PROVINCE_CONFIG
-        )
+    if province_job:
+        txt = province_job.result()
         plate_province = txt.strip()
-        plate_province = fix_province(plate_province)
+        if plate_province:
+            # match ครั้งเดียว ใช้ทั้งเลือกจังหวัดและเป็น candidates (FIX_PROVINCE_SECONDS = เวลา match จริง)
+            with FIX_PROVINCE_SECONDS.time():
+                province_candidates = match_province(plate_province)
+            if province_candidates and province_candidates[0][1] >= PROVINCE_MIN_SCORE:
+                plate_province = province_candidates[0][0]
+
+    # คะแนนของจังหวัดที่เลือก (0 = ไม่ตรงกับจังหวัดไหนเลย ใช้ข้อความดิบจาก OCR)
+    province_score = 0.0
+    if province_candidates and province_candidates[0][0] == plate_province:
+        province_score = province_candidates[0][1]
 
     return {
         "chars": plate_chars or "ไม่พบอักษร",
-        "province": plate_province or "ไม่พบจังหวัด"
-    }
\ No newline at end of file
+        "province": plate_province or "ไม่พบจังหวัด",
+        "confidence": round(float(detections[:, 4].mean()), 3) if len(detections) else 0.0,
+        "province_score": province_score,
+        "province_candidates": [{"province": n, "score": sc} for n, sc in province_candidates],
+    }
+
+def run_ocr(frame, detections):
+    """OCR ป้ายเดียว (detections ของป้ายนั้น)"""
+    return collect_ocr(submit_ocr(frame, detections))
+
+def ocr_plates(frame, detections):
+    """
+    OCR ทุกป้ายในเฟรม: แยกป้ายด้วย split_plates แล้วส่งทุกป้ายเข้า engine pool ก่อนค่อยรอผล
+    คืนค่า [(detections ของป้าย, dict ผลลัพธ์ + "box")] เรียงตาม split_plates (ป้ายใหญ่สุดก่อน)
+    """
+    plates = split_plates(detections)
+    jobs = [submit_ocr(frame, plate) for plate in plates]
+    results = []
+    for plate, job in zip(plates, jobs):
+        data = collect_ocr(job)
+        data["box"] = [round(float(v), 1) for v in plate_bbox(plate)]
+        results.append((plate, data))
+    return results
@@ -0,0 +1,198 @@
+# ocr_backend.py
+import queue
+import shlex
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from PIL import Image
+from config import OCR_BACKEND, OCR_POOL_SIZE, TESSDATA_PATH, OCR_CACHE
+from ocr_cache import OCRCache
+from metrics import TESSERACT_SECONDS
+
+try:
+    import tesserocr
+except ImportError:
+    tesserocr = None
+
+
+def parse_tesseract_config(config):
+    """แปลง config แบบ command line ("--psm 6 -l tha -c key=val") เป็น dict"""
+    opts = {"lang": "eng", "psm": None, "oem": None, "vars": {}}
+    args = shlex.split(config)
+    i = 0
+    while i < len(args):
+        arg = args[i]
+        value = args[i + 1] if i + 1 < len(args) else None
+        if arg == "-l":
+            opts["lang"] = value
+            i += 1
+        elif arg == "--psm":
+            opts["psm"] = int(value)
+            i += 1
+        elif arg == "--oem":
+            opts["oem"] = int(value)
+            i += 1
+        elif arg == "-c" and value and "=" in value:
+            key, val = value.split("=", 1)
+            opts["vars"][key] = val
+            i += 1
+        i += 1
+    return opts
+
+
+# -----------------------------
+# Engines
+# -----------------------------
+class TesserocrEngine:
+    """Tesseract C API (ผ่าน tesserocr) โหลด traineddata ครั้งเดียวแล้วใช้ซ้ำ"""
+
+    def __init__(self, config):
+        opts = parse_tesseract_config(config)
+        kwargs = {"lang": opts["lang"], "init": True}
+        if TESSDATA_PATH:
+            kwargs["path"] = TESSDATA_PATH
+        if opts["oem"] is not None:
+            kwargs["oem"] = opts["oem"]
+        self.api = tesserocr.PyTessBaseAPI(**kwargs)
+        if opts["psm"] is not None:
+            self.api.SetPageSegMode(opts["psm"])
+        for key, val in opts["vars"].items():
+            self.api.SetVariable(key, val)
+
+    def image_to_string(self, gray):
+        self.api.SetImage(Image.fromarray(gray))
+        return self.api.GetUTF8Text()
+
+    def close(self):
+        self.api.End()
+
+
+class PytesseractEngine:
+    """fallback เดิม: fork tesseract ใหม่ทุกครั้งที่เรียก"""
+
+    def __init__(self, config):
+        import pytesseract
+        self._pytesseract = pytesseract
+        self.config = config
+
+    def image_to_string(self, gray):
+        return self._pytesseract.image_to_string(Image.fromarray(gray), config=self.config)
+
+    def close(self):
+        pass
+
+
+def resolve_backend(name=OCR_BACKEND):
+    if name == "auto":
+        return "tesserocr" if tesserocr is not None else "pytesseract"
+    if name == "tesserocr" and tesserocr is None:
+        print("OCR Warning: tesserocr not installed, falling back to pytesseract")
+        return "pytesseract"
+    return name
+
+
+# -----------------------------
+# Engine Pool
+# -----------------------------
+class EnginePool:
+    """
+    pool ของ engine ที่ init ไว้แล้ว แยกตาม config (char / province)
+    งานแต่ละ crop ยืม engine ไปใช้บน thread pool จึงอ่านหลาย crop พร้อมกันได้
+    """
+
+    def __init__(self, backend=OCR_BACKEND, size=OCR_POOL_SIZE, cache=OCR_CACHE):
+        self.backend = resolve_backend(backend)
+        self.cache = OCRCache() if cache else None
+        self.size = size
+        self._engine_cls = TesserocrEngine if self.backend == "tesserocr" else PytesseractEngine
+        self._idle = {}                 # config -> Queue ของ engine ที่ว่าง
+        self._created = {}              # config -> จำนวน engine ที่สร้างแล้ว
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=size, thread_name_prefix="ocr")
+        # จำนวน Tesseract ที่รันพร้อมกันจริง (governor ลดได้ตอนเครื่องร้อน ไม่เกิน size)
+        self.concurrency = size
+        self._active = 0
+        self._slots = threading.Condition()
+        print(f"OCR backend: {self.backend} (pool size {size})")
+
+    def warmup(self, configs):
+        """สร้าง engine ล่วงหน้าให้ครบ pool จะได้ไม่เสียเวลาโหลดตอน scan แรก"""
+        for config in configs:
+            engines = [self._acquire(config) for _ in range(self.size)]
+            for engine in engines:
+                self._release(config, engine)
+
+    def image_to_string(self, gray, config, kind="ocr"):
+        """kind = ชื่องานใน metrics (char / province) เพราะ config ของสองงานอาจเหมือนกัน"""
+        with self._slots:
+            self._slots.wait_for(lambda: self._active < self.concurrency)
+            self._active += 1
+        try:
+            engine = self._acquire(config)
+            try:
+                with TESSERACT_SECONDS.labels(kind).time():
+                    return engine.image_to_string(gray)
+            finally:
+                self._release(config, engine)
+        finally:
+            with self._slots:
+                self._active -= 1
+                self._slots.notify()
+
+    def set_concurrency(self, n):
+        """จำกัดจำนวน crop ที่อ่านพร้อมกัน (1..size) งานที่เกินรอคิวใน thread pool"""
+        with self._slots:
+            self.concurrency = max(1, min(int(n), self.size))
+            self._slots.notify_all()
+
+    def submit(self, gray, config, kind="ocr"):
+        """ถ้า crop นี้ (หรือที่หน้าตาเกือบเหมือนกัน) เคยอ่านแล้ว คืนค่า Future ที่เสร็จแล้วทันที"""
+        if self.cache is None:
+            return self._executor.submit(self.image_to_string, gray, config, kind)
+        key = self.cache.key((kind, config), gray)
+        text = self.cache.get(key)
+        if text is not None:
+            future = Future()
+            future.set_result(text)
+            return future
+        future = self._executor.submit(self.image_to_string, gray, config, kind)
+        future.add_done_callback(lambda f: f.exception() is None and self.cache.put(key, f.result()))
+        return future
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+        with self._lock:
+            for idle in self._idle.values():
+                while not idle.empty():
+                    idle.get_nowait().close()
+
+    def _acquire(self, config):
+        with self._lock:
+            idle = self._idle.setdefault(config, queue.Queue())
+            if idle.empty() and self._created.get(config, 0) < self.size:
+                self._created[config] = self._created.get(config, 0) + 1
+                create = True
+            else:
+                create = False
+        if not create:
+            return idle.get()
+        try:
+            return self._engine_cls(config)
+        except Exception:
+            with self._lock:
+                self._created[config] -= 1
+            raise
+
+    def _release(self, config, engine):
+        self._idle[config].put(engine)
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = EnginePool()
+        return _pool
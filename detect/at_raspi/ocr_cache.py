@@ -0,0 +1,164 @@
+# ocr_cache.py
+"""
+cache ผล Tesseract โดยใช้ dHash ของ crop เทาเป็น key
+ภาพค้าง (Freeze) หรือรถจอดที่ไม้กั้นได้ crop เกือบเหมือนเดิมทุกครั้ง ถ้า hash ต่างกันไม่เกิน
+OCR_CACHE_MAX_DISTANCE bit (และสัดส่วนภาพใกล้กัน) ใช้ข้อความเดิมได้เลยไม่ต้องเรียก Tesseract ซ้ำ
+"""
+import math
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+import cv2
+import numpy as np
+
+from config import (
+    OCR_CACHE_MAX_ENTRIES, OCR_CACHE_MAX_BYTES, OCR_CACHE_TTL_SECONDS, OCR_CACHE_MAX_DISTANCE, OCR_CACHE_HASH_GRID
+)
+
+POPCOUNT = np.array([bin(i).count("1") for i in range(256)], np.uint8)
+GRADIENT_MARGIN = 4           # ความต่างที่น้อยกว่านี้ (พื้นเรียบ + noise ของ sensor) ถือว่าไม่เปลี่ยน
+ASPECT_TOLERANCE = 0.15       # |log(สัดส่วนกว้าง/สูง)| ต่างกันไม่เกินนี้ถึงจะถือว่าเป็น crop เดียวกัน
+ENTRY_OVERHEAD = 200          # byte โดยประมาณของ dict/OrderedDict/tuple ต่อ entry
+
+
+def dhash(gray, grid=OCR_CACHE_HASH_GRID):
+    """
+    difference hash ของบรรทัดข้อความ: ย่อเป็นตาราง (w+1) x (h+1) แล้วเทียบ pixel ติดกันทั้งแนวนอนและแนวตั้ง
+    - ตารางกว้างกว่าสูง (เช่น 32x8) ตัวอักษรต่างกันแค่ตัวเดียวก็ทำให้ hash ต่างกันหลาย bit
+    - normalize ความสว่าง/contrast ก่อน และไม่นับความต่างเล็กๆ (แสงเปลี่ยน / noise ได้ hash เดิม)
+    คืนค่า bytes ขนาด 2*w*h/8
+    """
+    w, h = grid
+    small = cv2.resize(gray, (w + 1, h + 1), interpolation=cv2.INTER_AREA)
+    small = cv2.normalize(small, None, 0, 255, cv2.NORM_MINMAX).astype(np.int16)
+    horizontal = small[:-1, 1:] - small[:-1, :-1] > GRADIENT_MARGIN
+    vertical = small[1:, :-1] - small[:-1, :-1] > GRADIENT_MARGIN
+    return np.packbits(np.concatenate([horizontal.ravel(), vertical.ravel()])).tobytes()
+
+
+class CacheEntry:
+    __slots__ = ("namespace", "hash", "text", "created", "size")
+
+    def __init__(self, namespace, hash_bytes, text, created):
+        self.namespace = namespace
+        self.hash = hash_bytes
+        self.text = text
+        self.created = created
+        self.size = sys.getsizeof(text) + len(hash_bytes) + ENTRY_OVERHEAD
+
+
+class OCRCache:
+    """
+    LRU + TTL จำกัดทั้งจำนวน entry และขนาด memory โดยประมาณ
+    hash ทุกตัวเก็บใน numpy array เดียว หา entry ที่ใกล้ที่สุดด้วย XOR + popcount ทีละ array
+    """
+
+    def __init__(self, max_entries=OCR_CACHE_MAX_ENTRIES, max_bytes=OCR_CACHE_MAX_BYTES,
+                 ttl=OCR_CACHE_TTL_SECONDS, max_distance=OCR_CACHE_MAX_DISTANCE, grid=OCR_CACHE_HASH_GRID):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.max_distance = max_distance
+        self.grid = grid
+        self._lock = threading.Lock()
+        self._hashes = np.zeros((max_entries, 2 * grid[0] * grid[1] // 8), np.uint8)
+        self._aspects = np.zeros(max_entries, np.float32)
+        self._namespaces = np.full(max_entries, -1, np.int32)
+        self._namespace_ids = {}
+        self._entries = OrderedDict()           # slot -> CacheEntry (ท้ายสุด = ใช้ล่าสุด)
+        self._exact = {}                        # (namespace id, hash) -> slot
+        self._free = list(range(max_entries - 1, -1, -1))
+        self.bytes = 0
+        self.hits = 0
+        self.near_hits = 0                      # hit ที่ hash ไม่ตรงเป๊ะ (อยู่ในระยะ Hamming ที่ยอมรับ)
+        self.misses = 0
+        self.evictions = 0
+        self.expired = 0
+
+    def key(self, namespace, gray):
+        """key ของ crop นี้ (namespace แยก char / province ออกจากกัน)"""
+        h, w = gray.shape[:2]
+        with self._lock:
+            ns = self._namespace_ids.setdefault(namespace, len(self._namespace_ids))
+        return ns, dhash(gray, self.grid), math.log(max(w, 1) / max(h, 1))
+
+    def get(self, key):
+        """ข้อความที่ cache ไว้ของ crop ที่ใกล้เคียง หรือ None"""
+        ns, hash_bytes, aspect = key
+        now = time.monotonic()
+        with self._lock:
+            slot = self._exact.get((ns, hash_bytes))
+            exact = slot is not None
+            if not exact:
+                slot = self._nearest(ns, hash_bytes, aspect)
+            if slot is None:
+                self.misses += 1
+                return None
+            entry = self._entries[slot]
+            if now - entry.created > self.ttl:
+                self._remove(slot)
+                self.expired += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(slot)
+            self.hits += 1
+            self.near_hits += not exact
+            return entry.text
+
+    def put(self, key, text):
+        ns, hash_bytes, aspect = key
+        entry = CacheEntry(ns, hash_bytes, text, time.monotonic())
+        with self._lock:
+            old = self._exact.get((ns, hash_bytes))
+            if old is not None:
+                self._remove(old)
+            while self._entries and (not self._free or self.bytes + entry.size > self.max_bytes):
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+            slot = self._free.pop()
+            self._hashes[slot] = np.frombuffer(hash_bytes, np.uint8)
+            self._aspects[slot] = aspect
+            self._namespaces[slot] = ns
+            self._entries[slot] = entry
+            self._exact[(ns, hash_bytes)] = slot
+            self.bytes += entry.size
+
+    def _nearest(self, ns, hash_bytes, aspect):
+        slots = np.flatnonzero(self._namespaces == ns)
+        if slots.size == 0:
+            return None
+        query = np.frombuffer(hash_bytes, np.uint8)
+        distance = POPCOUNT[self._hashes[slots] ^ query].sum(axis=1, dtype=np.int32)
+        distance[np.abs(self._aspects[slots] - aspect) > ASPECT_TOLERANCE] = self.max_distance + 1
+        best = int(distance.argmin())
+        if distance[best] > self.max_distance:
+            return None
+        return int(slots[best])
+
+    def _remove(self, slot):
+        entry = self._entries.pop(slot)
+        del self._exact[(entry.namespace, entry.hash)]
+        self._namespaces[slot] = -1
+        self._free.append(slot)
+        self.bytes -= entry.size
+
+    def clear(self):
+        with self._lock:
+            for slot in list(self._entries):
+                self._remove(slot)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self.bytes,
+                "hits": self.hits,
+                "near_hits": self.near_hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "expired": self.expired,
+            }
@@ -0,0 +1,333 @@
+# pipeline.py
+import time
+import threading
+from collections import deque
+
+from config import PIPELINE_QUEUE_SIZE, PIPELINE_OCR_QUEUE_SIZE, PIPELINE_REPORT_SECONDS, PIPELINE_DRAIN_SECONDS
+
+
+# -----------------------------
+# Bounded Queue (drop oldest)
+# -----------------------------
+class DropOldestQueue:
+    """คิวขนาดจำกัด ถ้าเต็มจะทิ้งภาพที่เก่าที่สุด (stage หลังจะได้ภาพล่าสุดเสมอ)"""
+
+    def __init__(self, maxsize=PIPELINE_QUEUE_SIZE):
+        self._items = deque()
+        self._maxsize = maxsize
+        self._cond = threading.Condition()
+        self._closed = False
+        self.dropped = 0
+
+    def put(self, item):
+        with self._cond:
+            if len(self._items) >= self._maxsize:
+                self._items.popleft()
+                self.dropped += 1
+            self._items.append(item)
+            self._cond.notify()
+
+    def get(self, timeout=0.5):
+        """คืนค่า item หรือ None ถ้าหมดเวลา/คิวถูกปิด"""
+        with self._cond:
+            if not self._items and not self._closed:
+                self._cond.wait(timeout)
+            if not self._items:
+                return None
+            return self._items.popleft()
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    @property
+    def closed(self):
+        return self._closed
+
+    def __len__(self):
+        return len(self._items)
+
+
+class BlockingQueue(DropOldestQueue):
+    """
+    คิวขนาดจำกัดที่ไม่ทิ้งของ: เต็มแล้ว put รอจนมีที่ว่าง (ใช้กับ track ที่รอ OCR: 1 item = รถ 1 คัน)
+    detect ที่รอตรงนี้ทำให้คิวภาพก่อนหน้าทิ้งภาพเก่าแทน ภาพหายได้ แต่ record ไม่หาย
+    """
+
+    def __init__(self, maxsize=PIPELINE_OCR_QUEUE_SIZE):
+        super().__init__(maxsize)
+        self.waits = 0                      # จำนวนครั้งที่ put ต้องรอ (OCR ตามไม่ทัน)
+
+    def put(self, item):
+        with self._cond:
+            if len(self._items) >= self._maxsize:
+                self.waits += 1
+                self._cond.wait_for(lambda: len(self._items) < self._maxsize or self._closed)
+            self._items.append(item)
+            self._cond.notify_all()
+
+    def get(self, timeout=0.5):
+        with self._cond:
+            if not self._items and not self._closed:
+                self._cond.wait(timeout)
+            if not self._items:
+                return None
+            item = self._items.popleft()
+            self._cond.notify_all()         # ปลุก put ที่รอที่ว่าง
+            return item
+
+
+# -----------------------------
+# Fair Scheduler (หลายกล้อง detector เดียว)
+# -----------------------------
+class FairScheduler:
+    """
+    คิวแยกต่อกล้อง (ขนาดจำกัด ทิ้งภาพเก่าสุด) + get() แบบ round-robin
+    กล้องที่ส่งภาพเร็วกว่า (เช่น ช่องเข้าที่รถเยอะ) จึงแย่ง detector จากกล้องอื่นไม่ได้:
+    ทุกกล้องที่มีภาพรออยู่ได้ detect 1 ภาพต่อรอบ
+    """
+
+    def __init__(self, keys, maxsize=PIPELINE_QUEUE_SIZE):
+        self._queues = {key: deque() for key in keys}
+        self._order = list(self._queues)
+        self._next = 0
+        self._maxsize = maxsize
+        self._cond = threading.Condition()
+        self._closed = False
+        self.dropped = {key: 0 for key in keys}
+        self.served = {key: 0 for key in keys}
+
+    def put(self, key, item):
+        with self._cond:
+            q = self._queues[key]
+            if len(q) >= self._maxsize:
+                q.popleft()
+                self.dropped[key] += 1
+            q.append(item)
+            self._cond.notify()
+
+    def _pop(self):
+        for i in range(len(self._order)):
+            key = self._order[(self._next + i) % len(self._order)]
+            if self._queues[key]:
+                self._next = (self._next + i + 1) % len(self._order)
+                self.served[key] += 1
+                return key, self._queues[key].popleft()
+        return None
+
+    def get(self, timeout=0.5):
+        """คืนค่า (key, item) ของกล้องถัดไปที่มีภาพรอ หรือ None ถ้าหมดเวลา/ถูกปิด"""
+        with self._cond:
+            found = self._pop()
+            if found is None and not self._closed:
+                self._cond.wait(timeout)
+                found = self._pop()
+            return found
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    def lengths(self):
+        with self._cond:
+            return {key: len(q) for key, q in self._queues.items()}
+
+    def __len__(self):
+        with self._cond:
+            return sum(len(q) for q in self._queues.values())
+
+
+# -----------------------------
+# Stage Statistics
+# -----------------------------
+class StageStats:
+    def __init__(self, name):
+        self.name = name
+        self.processed = 0
+        self.busy_seconds = 0.0
+        self._done_times = deque(maxlen=30)   # เวลาที่งานเสร็จล่าสุด ใช้คำนวณ fps
+        self._lock = threading.Lock()
+
+    def record(self, started, finished):
+        with self._lock:
+            self.processed += 1
+            self.busy_seconds += finished - started
+            self._done_times.append(finished)
+
+    def snapshot(self):
+        with self._lock:
+            times = list(self._done_times)
+            processed = self.processed
+            busy = self.busy_seconds
+        fps = 0.0
+        if len(times) >= 2 and times[-1] > times[0]:
+            fps = (len(times) - 1) / (times[-1] - times[0])
+        return {
+            "processed": processed,
+            "fps": round(fps, 2),
+            "avg_ms": round(busy / processed * 1000, 1) if processed else 0.0,
+        }
+
+
+# -----------------------------
+# Auto Scan Pipeline
+# -----------------------------
+class AutoScanPipeline:
+    """
+    capture -> detect -> OCR แต่ละ stage เป็น thread ของตัวเอง ทั้ง 3 stage จึงทำงานซ้อนกันได้บนหลาย core ของ Pi
+    - capture: thread ต่อกล้อง ส่งภาพเข้า FairScheduler (คิวแยกต่อกล้อง)
+    - detect: thread เดียว (โมเดลชุดเดียว) หยิบภาพจากแต่ละกล้องแบบ round-robin
+    - OCR: คิวเดียว (BlockingQueue: เต็มแล้ว detect รอ ห้ามเปลี่ยนเป็นแบบทิ้งของ 1 track = รถ 1 คัน) ใช้ OCR pool ร่วมกันทุกกล้อง
+
+    camera_ids                   -> id ของกล้องที่ต้อง capture
+    capture_fn(camera_id)        -> frame หรือ None
+    detect_fn(camera_id, frame)  -> list ของงานที่ต้อง OCR (เช่น track ที่จบแล้ว) ว่างได้
+    ocr_fn(job)                  -> dict ผลลัพธ์ {chars, province}
+    on_result(job, data)         -> ส่งผลลัพธ์ออก (เช่น save_log)
+    paused_fn(camera_id)         -> True = หยุด capture กล้องนั้นชั่วคราว (เช่นตอน Freeze)
+    flush_fn()                   -> งานที่ยังค้าง (เช่น track ที่ยังไม่จบ) ตอน stop จะ OCR ให้ครบก่อนหยุด
+    """
+
+    def __init__(self, camera_ids, capture_fn, detect_fn, ocr_fn, on_result, paused_fn=None, flush_fn=None,
+                 queue_size=PIPELINE_QUEUE_SIZE, ocr_queue_size=PIPELINE_OCR_QUEUE_SIZE):
+        self.camera_ids = list(camera_ids)
+        self.capture_fn = capture_fn
+        self.detect_fn = detect_fn
+        self.ocr_fn = ocr_fn
+        self.on_result = on_result
+        self.paused_fn = paused_fn or (lambda camera_id: False)
+        self.flush_fn = flush_fn
+        self.queue_size = queue_size
+        self.ocr_queue_size = ocr_queue_size
+
+        self.stats = {name: StageStats(name) for name in ("capture", "detect", "ocr")}
+        self.camera_stats = {cid: StageStats(cid) for cid in self.camera_ids}   # capture ต่อกล้อง
+        self._running = False
+        self._threads = []
+        self._detect_q = None
+        self._ocr_q = None
+        self._ocr_thread = None
+
+    @property
+    def running(self):
+        return self._running
+
+    def start(self):
+        if self._running:
+            return
+        self._running = True
+        self._detect_q = FairScheduler(self.camera_ids, self.queue_size)
+        self._ocr_q = BlockingQueue(self.ocr_queue_size)
+        self._threads = [
+            threading.Thread(target=self._capture_loop, args=(cid,), name=f"pipeline-capture-{cid}", daemon=True)
+            for cid in self.camera_ids
+        ] + [
+            threading.Thread(target=self._detect_loop, name="pipeline-detect", daemon=True),
+        ]
+        self._ocr_thread = threading.Thread(target=self._ocr_loop, name="pipeline-ocr", daemon=True)
+        for t in self._threads + [self._ocr_thread]:
+            t.start()
+        print("Auto-scan pipeline started")
+
+    def stop(self):
+        """หยุด capture / detect ก่อน แล้ว OCR งานที่ค้างในคิว + flush_fn() ให้ครบ ค่อยหยุด OCR"""
+        if not self._running:
+            return
+        self._running = False
+        self._detect_q.close()
+        for t in self._threads:
+            t.join(timeout=5)
+        flushed = 0
+        if self.flush_fn is not None:
+            try:
+                for job in self.flush_fn():
+                    self._ocr_q.put(job)
+                    flushed += 1
+            except Exception as e:
+                print(f"Pipeline flush error: {e}")
+        self._ocr_q.close()
+        self._ocr_thread.join(timeout=PIPELINE_DRAIN_SECONDS)
+        self._threads = []
+        self._ocr_thread = None
+        print(f"Auto-scan pipeline stopped ({flushed} open track(s) flushed)")
+
+    def snapshot(self):
+        stages = {name: s.snapshot() for name, s in self.stats.items()}
+        cameras = {cid: {"capture": s.snapshot()} for cid, s in self.camera_stats.items()}
+        if self._detect_q is not None:
+            stages["detect"]["queue"] = len(self._detect_q)
+            stages["detect"]["dropped"] = sum(self._detect_q.dropped.values())
+            stages["ocr"]["queue"] = len(self._ocr_q)
+            stages["ocr"]["dropped"] = self._ocr_q.dropped
+            stages["ocr"]["waits"] = self._ocr_q.waits
+            for cid, length in self._detect_q.lengths().items():
+                cameras[cid].update(queue=length, dropped=self._detect_q.dropped[cid],
+                                    detected=self._detect_q.served[cid])
+        return {"running": self._running, "stages": stages, "cameras": cameras}
+
+    # --- Stages ---
+    def _capture_loop(self, camera_id):
+        last_report = time.monotonic()
+        report = camera_id == self.camera_ids[0]     # พิมพ์สรุปจาก thread เดียว
+        while self._running:
+            if self.paused_fn(camera_id):
+                time.sleep(0.1)
+                continue
+
+            t0 = time.monotonic()
+            frame = self.capture_fn(camera_id)
+            if frame is None:
+                time.sleep(0.05)
+                continue
+            t1 = time.monotonic()
+            self.stats["capture"].record(t0, t1)
+            self.camera_stats[camera_id].record(t0, t1)
+            self._detect_q.put(camera_id, frame)
+
+            if report and PIPELINE_REPORT_SECONDS and t0 - last_report >= PIPELINE_REPORT_SECONDS:
+                last_report = t0
+                self._report()
+
+    def _detect_loop(self):
+        while self._running:
+            item = self._detect_q.get()
+            if item is None:
+                continue
+            camera_id, frame = item
+            t0 = time.monotonic()
+            try:
+                jobs = self.detect_fn(camera_id, frame)
+            except Exception as e:
+                print(f"Pipeline detect error: {e}")
+                continue
+            self.stats["detect"].record(t0, time.monotonic())
+            for job in jobs:
+                self._ocr_q.put(job)
+
+    def _ocr_loop(self):
+        # ทำงานต่อหลัง stop จนคิวว่าง (track ที่จบแล้วต้องได้ record)
+        while True:
+            job = self._ocr_q.get()
+            if job is None:
+                if self._ocr_q.closed:
+                    break
+                continue
+            t0 = time.monotonic()
+            try:
+                data = self.ocr_fn(job)
+            except Exception as e:
+                print(f"Pipeline OCR error: {e}")
+                continue
+            self.stats["ocr"].record(t0, time.monotonic())
+            try:
+                self.on_result(job, data)
+            except Exception as e:
+                print(f"Pipeline result error: {e}")
+
+    def _report(self):
+        parts = []
+        for name, s in self.snapshot()["stages"].items():
+            parts.append(f"{name} {s['fps']:.1f} fps / {s['avg_ms']:.0f} ms")
+        print("Pipeline: " + " | ".join(parts))
@@ -0,0 +1,123 @@
+# province_matcher.py
+from collections import defaultdict
+from functools import lru_cache
+
+from config import PROVINCE_CACHE_SIZE, PROVINCE_TOP_K
+
+# รายชื่อจังหวัดในประเทศไทย สำหรับการตรวจสอบและแก้ไขข้อความ
+THAI_PROVINCES = [
+    "กรุงเทพมหานคร", "กระบี่", "กาญจนบุรี", "กาฬสินธุ์", "กำแพงเพชร", "ขอนแก่น", "จันทบุรี", "ฉะเชิงเทรา", "ชลบุรี", "ชัยนาท",
+    "ชัยภูมิ", "ชุมพร", "เชียงราย", "เชียงใหม่", "ตรัง", "ตราด", "ตาก", "นครนายก", "นครปฐม", "นครพนม", "นครราชสีมา",
+    "นครศรีธรรมราช", "นครสวรรค์", "นนทบุรี", "นราธิวาส", "น่าน", "บึงกาฬ", "บุรีรัมย์", "ปทุมธานี", "ประจวบคีรีขันธ์",
+    "ปราจีนบุรี", "ปัตตานี", "พระนครศรีอยุธยา", "พะเยา", "พังงา", "พัทลุง", "พิจิตร", "พิษณุโลก", "เพชรบุรี", "เพชรบูรณ์",
+    "แพร่", "ภูเก็ต", "มหาสารคาม", "มุกดาหาร", "แม่ฮ่องสอน", "ยโสธร", "ยะลา", "ร้อยเอ็ด", "ระนอง", "ระยอง", "ราชบุรี",
+    "ลพบุรี", "ลำปาง", "ลำพูน", "เลย", "ศรีสะเกษ", "สกลนคร", "สงขลา", "สตูล", "สมุทรปราการ", "สมุทรสงคราม", "สมุทรสาคร",
+    "สระแก้ว", "สระบุรี", "สิงห์บุรี", "สุโขทัย", "สุพรรณบุรี", "สุราษฎร์ธานี", "สุรินทร์", "หนองคาย", "หนองบัวลำภู",
+    "อ่างทอง", "อำนาจเจริญ", "อุดรธานี", "อุตรดิตถ์", "อุทัยธานี", "อุบลราชธานี"
+]
+
+# กลุ่มตัวอักษรที่ Tesseract อ่านสลับกันบ่อย (แทนกันได้ในราคาถูกกว่าปกติ)
+THAI_CONFUSIONS = [
+    "คดตฅ", "บปษ", "ขชซฃ", "ผฝพฟ", "รธว", "ทห", "ถภ", "มฆ", "ฎฏ", "ศส", "นม", "อฮ", "ลส", "ญฌ", "ฐรฮ",
+]
+# สระบน/ล่าง วรรณยุกต์ ตัวเล็กๆ ที่ OCR มักตกหล่นหรืออ่านเกินมา
+THAI_MARKS = set("่้๊๋็์ัิีึืุูํ")
+
+CONFUSION_COST = 0.4
+MARK_COST = 0.3
+
+_confusable = set()
+for group in THAI_CONFUSIONS:
+    for a in group:
+        for b in group:
+            if a != b:
+                _confusable.add((a, b))
+
+
+def normalize(text):
+    text = text.replace(" ", "").replace(".", "").replace("-", "").strip()
+    # OCR มักอ่าน "แ" เป็น "เ" สองตัว
+    return text.replace("เเ", "แ")
+
+
+def weighted_distance(a, b):
+    """Levenshtein distance ที่ให้น้ำหนักตามความผิดพลาดแบบ OCR ภาษาไทย"""
+    prev = [0.0]
+    for ch in b:
+        prev.append(prev[-1] + (MARK_COST if ch in THAI_MARKS else 1.0))
+
+    for ca in a:
+        del_a = MARK_COST if ca in THAI_MARKS else 1.0
+        cur = [prev[0] + del_a]
+        for j, cb in enumerate(b, 1):
+            if ca == cb:
+                sub = 0.0
+            elif (ca, cb) in _confusable or (ca in THAI_MARKS and cb in THAI_MARKS):
+                sub = CONFUSION_COST
+            else:
+                sub = 1.0
+            ins_b = MARK_COST if cb in THAI_MARKS else 1.0
+            cur.append(min(prev[j] + del_a, cur[j - 1] + ins_b, prev[j - 1] + sub))
+        prev = cur
+    return prev[-1]
+
+
+def similarity(a, b):
+    if not a and not b:
+        return 1.0
+    return max(0.0, 1.0 - weighted_distance(a, b) / max(len(a), len(b)))
+
+
+def ngrams(text, n):
+    padded = f"^{text}$"
+    return {padded[i:i + n] for i in range(len(padded) - n + 1)}
+
+
+# -----------------------------
+# Province Index
+# -----------------------------
+class ProvinceMatcher:
+    """
+    index แบบ character n-gram สร้างครั้งเดียวตอน import
+    ใช้ n-gram คัดผู้สมัครไม่กี่ชื่อ แล้วค่อยให้คะแนนละเอียดด้วย weighted_distance
+    """
+
+    def __init__(self, names, n=2, candidates=12):
+        self.names = list(names)
+        self.n = n
+        self.candidates = candidates
+        self._grams = [ngrams(name, n) for name in self.names]
+        self._index = defaultdict(list)     # n-gram -> [index ของชื่อจังหวัด]
+        for i, grams in enumerate(self._grams):
+            for g in grams:
+                self._index[g].append(i)
+
+    def shortlist(self, text):
+        grams = ngrams(text, self.n)
+        shared = defaultdict(int)
+        for g in grams:
+            for i in self._index.get(g, ()):
+                shared[i] += 1
+        if not shared:
+            return range(len(self.names))
+        # Dice coefficient ของ n-gram
+        dice = {i: 2 * c / (len(grams) + len(self._grams[i])) for i, c in shared.items()}
+        return sorted(dice, key=dice.get, reverse=True)[:self.candidates]
+
+    def match(self, text, k=PROVINCE_TOP_K):
+        """คืนค่า [(ชื่อจังหวัด, คะแนน 0-1), ...] เรียงจากคะแนนมากไปน้อย"""
+        text = normalize(text)
+        if not text:
+            return []
+        scored = [(self.names[i], similarity(text, self.names[i])) for i in self.shortlist(text)]
+        scored.sort(key=lambda x: x[1], reverse=True)
+        return [(name, round(score, 3)) for name, score in scored[:k]]
+
+
+matcher = ProvinceMatcher(THAI_PROVINCES)
+
+
+@lru_cache(maxsize=PROVINCE_CACHE_SIZE)
+def match_province(ocr_text, k=PROVINCE_TOP_K):
+    """match แบบมี cache (OCR ข้อความเดิมซ้ำบ่อยเมื่อรถจอดนิ่ง) คืนค่าเป็น tuple"""
+    return tuple(matcher.match(ocr_text, k))
@@ -0,0 +1,218 @@
+# record_store.py
+import queue
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+import cv2
+from config import (
+    RECORD_DB_PATH,
+    RECORD_BATCH_SIZE,
+    RECORD_FLUSH_SECONDS,
+    LOG_PATH,
+    LOG_EXPORT_TEXT,
+    CROP_DIR,
+)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS records (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    ts REAL NOT NULL,
+    plate TEXT NOT NULL,
+    province TEXT NOT NULL,
+    confidence REAL,
+    province_score REAL,
+    crop_path TEXT,
+    camera TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_records_ts ON records (ts);
+CREATE INDEX IF NOT EXISTS idx_records_plate_ts ON records (plate, ts);
+CREATE INDEX IF NOT EXISTS idx_records_province_ts ON records (province, ts);
+"""
+
+# คอลัมน์ที่เพิ่มทีหลัง: ฐานข้อมูลเดิมได้ ALTER TABLE ตอนเปิด
+MIGRATIONS = {
+    "camera": "ALTER TABLE records ADD COLUMN camera TEXT",
+}
+INDEXES = """
+CREATE INDEX IF NOT EXISTS idx_records_camera_ts ON records (camera, ts);
+"""
+
+
+def connect(path):
+    conn = sqlite3.connect(str(path), timeout=10, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.row_factory = sqlite3.Row
+    return conn
+
+
+# -----------------------------
+# Record Store
+# -----------------------------
+class RecordStore:
+    """
+    เก็บผลการอ่านป้ายลง SQLite (WAL) ผ่าน writer thread เดียว
+    - add() แค่เข้าคิว ไม่บล็อกงาน scan
+    - writer รวมหลาย record เป็น transaction เดียว (batch)
+    - ถ้าเปิด LOG_EXPORT_TEXT จะเขียนไฟล์ record-LPR-of-*.log แบบเดิมด้วย
+    """
+
+    def __init__(self, path=RECORD_DB_PATH, export_dir=LOG_PATH if LOG_EXPORT_TEXT else None):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.export_dir = Path(export_dir) if export_dir else None
+        self._queue = queue.Queue()
+        self._thread = None
+        self._day_counts = {}       # วันที่ -> เลขลำดับล่าสุดในไฟล์ export
+
+        conn = connect(self.path)
+        conn.executescript(SCHEMA)
+        columns = {row["name"] for row in conn.execute("PRAGMA table_info(records)")}
+        for column, sql in MIGRATIONS.items():
+            if column not in columns:
+                conn.execute(sql)
+        conn.executescript(INDEXES)
+        conn.close()
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._writer_loop, name="record-writer", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self._thread is None:
+            return
+        self._queue.put(None)
+        self._thread.join(timeout=10)
+        self._thread = None
+
+    def add(self, plate, province, confidence=None, province_score=None, crop=None, ts=None, camera=None):
+        """เข้าคิวบันทึก record (crop = ภาพป้าย numpy RGB ถ้าต้องการเก็บไว้ด้วย / camera = id ของกล้องที่อ่านได้)"""
+        self._queue.put({
+            "ts": ts if ts is not None else time.time(),
+            "plate": plate,
+            "province": province,
+            "confidence": confidence,
+            "province_score": province_score,
+            "crop": crop,
+            "camera": camera,
+        })
+
+    def query(self, plate=None, province=None, since=None, until=None, limit=100, camera=None):
+        """ค้นหา record (since/until เป็น unix timestamp) เรียงจากใหม่ไปเก่า"""
+        where, args = [], []
+        if plate:
+            where.append("plate = ?")
+            args.append(plate)
+        if province:
+            where.append("province = ?")
+            args.append(province)
+        if camera:
+            where.append("camera = ?")
+            args.append(camera)
+        if since is not None:
+            where.append("ts >= ?")
+            args.append(since)
+        if until is not None:
+            where.append("ts < ?")
+            args.append(until)
+
+        sql = "SELECT id, ts, plate, province, confidence, province_score, crop_path, camera FROM records"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY ts DESC LIMIT ?"
+        args.append(limit)
+
+        # WAL: อ่านพร้อมกับ writer ได้ เปิด connection แยกต่อ query
+        conn = connect(self.path)
+        try:
+            rows = conn.execute(sql, args).fetchall()
+        finally:
+            conn.close()
+
+        records = []
+        for row in rows:
+            rec = dict(row)
+            rec["time"] = datetime.fromtimestamp(rec["ts"]).isoformat(timespec="seconds")
+            records.append(rec)
+        return records
+
+    # --- Writer Thread ---
+    def _writer_loop(self):
+        conn = connect(self.path)
+        running = True
+        while running:
+            item = self._queue.get()
+            if item is None:
+                break
+            batch = [item]
+
+            # รวม record ที่เข้ามาใกล้ๆ กันเป็น transaction เดียว
+            deadline = time.monotonic() + RECORD_FLUSH_SECONDS
+            while len(batch) < RECORD_BATCH_SIZE:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is None:
+                    running = False
+                    break
+                batch.append(item)
+
+            try:
+                self._write_batch(conn, batch)
+            except Exception as e:
+                print(f"Record store error: {e}")
+        conn.close()
+
+    def _write_batch(self, conn, batch):
+        for rec in batch:
+            rec["crop_path"] = self._save_crop(rec) if rec["crop"] is not None else None
+
+        with conn:
+            conn.executemany(
+                "INSERT INTO records (ts, plate, province, confidence, province_score, crop_path, camera) "
+                "VALUES (:ts, :plate, :province, :confidence, :province_score, :crop_path, :camera)",
+                batch,
+            )
+
+        if self.export_dir is not None:
+            self._export_text(conn, batch)
+
+    def _save_crop(self, rec):
+        crop_dir = Path(CROP_DIR)
+        crop_dir.mkdir(parents=True, exist_ok=True)
+        path = crop_dir / f"{rec['ts']:.3f}-{rec['plate']}.jpg"
+        cv2.imwrite(str(path), cv2.cvtColor(rec["crop"], cv2.COLOR_RGB2BGR))
+        return str(path)
+
+    def _export_text(self, conn, batch):
+        """เขียน Log รายวันแบบเดิม (เลขลำดับนับจากฐานข้อมูล ไม่ต้องอ่านทั้งไฟล์)"""
+        self.export_dir.mkdir(parents=True, exist_ok=True)
+        for rec in batch:
+            now = datetime.fromtimestamp(rec["ts"])
+            date_str = now.strftime("%d-%m-%Y")
+            time_str = now.strftime("%H:%M")
+            filepath = self.export_dir / f"record-LPR-of-{date_str}.log"
+
+            if date_str not in self._day_counts:
+                day_start = datetime(now.year, now.month, now.day).timestamp()
+                (count,) = conn.execute(
+                    "SELECT COUNT(*) FROM records WHERE ts >= ? AND ts < ?",
+                    (day_start, rec["ts"]),
+                ).fetchone()
+                self._day_counts = {date_str: count}
+            self._day_counts[date_str] += 1
+
+            new_file = not filepath.exists()
+            with filepath.open("a", encoding="utf-8") as f:
+                if new_file:
+                    f.write(f"Record of LPR for {date_str}\n")
+                f.write(f"{self._day_counts[date_str]}. {rec['plate']} - {rec['province']} - เวลา {time_str}\n")
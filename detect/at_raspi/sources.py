@@ -0,0 +1,538 @@
+# sources.py
+"""
+แหล่งภาพ (FrameSource) ทุกชนิดมี interface เดียวกับ cameralow:
+    init_camera() / close_camera() / capture_frame() / capture_frames() / ring_planes() / capture_into(ring)
+    toggle_freeze() / broadcaster / is_frozen / last_raw_frame / last_lores_frame / freeze_id
+
+- Picamera2Source   กล้อง CSI (Picamera2) ใช้ MJPEG encoder ของ hardware ส่งภาพเข้า stream
+- OpenCVSource      V4L2 (/dev/videoN หรือเลข index) / RTSP / ไฟล์วิดีโอ ผ่าน cv2.VideoCapture
+- ImageFolderSource ภาพในโฟลเดอร์ เล่นวนตาม fps (ทดสอบ / กล้องที่ส่งภาพเป็นไฟล์)
+
+กล้องที่ service เปิดมาจาก CAMERAS ใน config.py (build_cameras)
+"""
+import io
+import threading
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+from config import (
+    MAIN_SIZE, LORES_SIZE, LORES_FORMAT, USE_LORES_DETECTION, CAMERAS, CAMERA_STREAM_FPS, CAMERA_RECONNECT_SECONDS
+)
+from dualstream import lores_to_rgb
+from broadcaster import MJPEGBroadcaster
+
+IMAGE_EXTS = {".jpg", ".jpeg", ".png", ".bmp"}
+
+
+# -----------------------------
+# Frame Source (base)
+# -----------------------------
+class FrameSource:
+    """สถานะ Freeze + MJPEG broadcaster ของกล้อง 1 ตัว (subclass ทำแค่การเปิดกล้อง/อ่านภาพ)"""
+
+    kind = None
+
+    def __init__(self):
+        self.broadcaster = MJPEGBroadcaster()
+        self.latest_jpeg = None
+        self.is_frozen = False        # สถานะ Freeze
+        self.last_raw_frame = None    # เก็บภาพ Raw ตอน Freeze ไว้ทำ OCR
+        self.last_lores_frame = None  # ภาพ lores คู่กับ last_raw_frame (ไว้ detect)
+        self.freeze_id = 0            # เพิ่มทุกครั้งที่ Freeze ใช้แยกว่าเป็นภาพค้างภาพไหน
+        self.current_name = None      # ชื่อไฟล์ / เลขเฟรมของภาพล่าสุด (source ที่อ่านจากไฟล์)
+        self.stream_fps = None        # None = ค่าเดิมของ source (governor ลดได้)
+        self.overlay = MJPEGBroadcaster()   # /video_feed?overlay=1 (main.py วาดกรอบทับ JPEG ของ broadcaster)
+        self.frame_seq = 0            # เลขเฟรมของ next_frame() (key ของผล inference ต่อเฟรม)
+        self.frozen_seq = None        # เลขเฟรมของภาพค้าง
+        self._seq_lock = threading.Lock()
+        self._freeze_lock = threading.Lock()
+
+    # --- subclass ---
+    def init_camera(self):
+        raise NotImplementedError
+
+    def close_camera(self):
+        pass
+
+    def capture_frames(self):
+        """(main, lores) จากเฟรมเดียวกัน / (None, None) ถ้าไม่มีภาพ"""
+        raise NotImplementedError
+
+    def set_stream_fps(self, fps):
+        """fps สูงสุดของ MJPEG stream (None = ค่าเดิม) มีผลทันทีไม่ต้องเปิดกล้องใหม่"""
+        self.stream_fps = fps
+
+    # --- ใช้ร่วมกันทุกชนิด ---
+    def capture_frame(self):
+        return self.capture_frames()[0]
+
+    def next_frame(self):
+        """(seq, main, lores) ภาพใหม่พร้อมเลขเฟรมที่ไม่ซ้ำกันในกล้องนี้ / (None, None, None) ถ้าไม่มีภาพ"""
+        main, lores = self.capture_frames()
+        if main is None:
+            return None, None, None
+        with self._seq_lock:
+            self.frame_seq += 1
+            return self.frame_seq, main, lores
+
+    @property
+    def stream_wanted(self):
+        """มีคนดู stream (ปกติหรือ overlay) source ที่ encode JPEG เองใช้ตัดสินว่าต้อง encode ไหม"""
+        return bool(self.broadcaster.viewers or self.overlay.viewers)
+
+    def ring_planes(self):
+        """รูปแบบ plane ของ FrameRing ที่ capture_into เขียนลงไป"""
+        planes = {"main": ((MAIN_SIZE[1], MAIN_SIZE[0], 3), "uint8")}
+        if USE_LORES_DETECTION:
+            planes["lores"] = ((LORES_SIZE[1], LORES_SIZE[0], 3), "uint8")
+        return planes
+
+    def capture_into(self, ring):
+        """เขียนเฟรมถัดไปลง FrameRing คืนค่า seq หรือ None"""
+        main, lores = self.capture_frames()
+        if main is None:
+            return None
+        with ring.reserve() as views:
+            if views is None:
+                return None
+            np.copyto(views["main"], main)
+            if "lores" in views:
+                np.copyto(views["lores"], lores)
+        return ring.last_seq
+
+    def publish_jpeg(self, jpeg):
+        # ถ้า Freeze อยู่ ไม่ต้องอัปเดตภาพใหม่เข้าสู่ระบบ Stream
+        if self.is_frozen:
+            return
+        self.latest_jpeg = jpeg
+        self.broadcaster.publish(jpeg)
+
+    def toggle_freeze(self):
+        """
+        สลับสถานะ Freeze/Unfreeze และเก็บภาพ Raw ไว้
+        /toggle_freeze รันใน threadpool: lock ทั้งการสลับ กด 2 ครั้งพร้อมกันจะได้สถานะกับภาพที่ตรงกันเสมอ
+        """
+        with self._freeze_lock:
+            if self.is_frozen:
+                self.is_frozen = False
+                self.frozen_seq = None
+                self.last_raw_frame = None
+                self.last_lores_frame = None
+                return False
+            # จังหวะที่กด Freeze ให้ถ่ายภาพ Raw เก็บไว้เลย เพื่อความคมชัดสูงสุดตอน Scan
+            # ถ่ายก่อนตั้ง is_frozen (ไม่มีภาพ = ไม่ Freeze ไม่ใช่ Freeze ค้างโดยไม่มีภาพ)
+            seq, main, lores = self.next_frame()
+            if main is None:
+                return False
+            self.frozen_seq, self.last_raw_frame, self.last_lores_frame = seq, main, lores
+            self.freeze_id += 1
+            self.is_frozen = True
+            return True
+
+
+def _to_main(frame):
+    """ย่อ/ขยายให้เท่า MAIN_SIZE เหมือนกล้องจริง (FrameRing / crop ใช้ขนาดเดียวกันทุกกล้อง)"""
+    if (frame.shape[1], frame.shape[0]) != MAIN_SIZE:
+        frame = cv2.resize(frame, MAIN_SIZE, interpolation=cv2.INTER_AREA)
+    return frame
+
+
+def _lores_of(main):
+    if not USE_LORES_DETECTION:
+        return None
+    return cv2.resize(main, LORES_SIZE, interpolation=cv2.INTER_AREA)
+
+
+# -----------------------------
+# Picamera2 (CSI)
+# -----------------------------
+class _JpegOutput(io.BufferedIOBase):
+    """ปลายทางของ MJPEGEncoder: ส่ง JPEG ทุกเฟรมเข้า broadcaster ของ source"""
+
+    def __init__(self, source):
+        super().__init__()
+        self.source = source
+
+    def write(self, buf):
+        self.source.publish_jpeg(bytes(buf))
+        return len(buf)
+
+
+class Picamera2Source(FrameSource):
+    """กล้อง CSI: main เต็มความละเอียดสำหรับ crop / lores สำหรับ YOLO / MJPEG จาก hardware encoder"""
+
+    kind = "picamera2"
+
+    def __init__(self, camera_num=0):
+        super().__init__()
+        self.camera_num = camera_num
+        self.picam2 = None
+        self._frame_limits = None     # FrameDurationLimits เดิมของ video configuration
+
+    def init_camera(self):
+        if self.picam2 is not None:
+            return
+        from picamera2 import Picamera2
+        from picamera2.encoders import MJPEGEncoder
+        from picamera2.outputs import FileOutput
+
+        print(f"Initializing Camera {self.camera_num}...")
+        self.picam2 = Picamera2(self.camera_num)
+
+        # Config: RGB888 เพื่อให้ capture_frame ได้สีที่ถูกต้องสำหรับ AI
+        # lores: ภาพเล็กสำหรับ YOLO (main เต็มความละเอียดใช้แค่ crop ป้ายให้ Tesseract)
+        lores = {"size": LORES_SIZE, "format": LORES_FORMAT} if USE_LORES_DETECTION else None
+        config = self.picam2.create_video_configuration(
+            main={"size": MAIN_SIZE, "format": "RGB888"},
+            lores=lores
+        )
+        self.picam2.configure(config)
+        self._frame_limits = config["controls"].get("FrameDurationLimits")
+
+        # Start MJPEG Stream (Low CPU)
+        self.picam2.start_recording(MJPEGEncoder(), FileOutput(_JpegOutput(self)))
+
+        try:
+            self.picam2.set_controls({"AfMode": 2})
+        except Exception as e:
+            print(f"AF Warning: {e}")
+
+        print("Camera Started (High Performance + OCR Ready)")
+
+    def set_stream_fps(self, fps):
+        """
+        hardware encoder encode ทุกเฟรมของ sensor จึงลด fps ที่ sensor เลย (capture ของ pipeline ช้าลงด้วย
+        ซึ่งคือสิ่งที่ต้องการตอนเครื่องร้อน) None = คืนค่าเดิมของ video configuration
+        """
+        super().set_stream_fps(fps)
+        if self.picam2 is None:
+            return
+        limits = self._frame_limits if fps is None else (int(1e6 / fps),) * 2
+        if limits is None:
+            return
+        try:
+            self.picam2.set_controls({"FrameDurationLimits": limits})
+        except Exception as e:
+            print(f"FrameRate Warning: {e}")
+
+    def close_camera(self):
+        if self.picam2 is None:
+            return
+        self.picam2.stop_recording()
+        self.picam2.close()
+        self.picam2 = None
+
+    def capture_frames(self):
+        """ดึงภาพ main กับ lores จาก request เดียวกัน (เฟรมเดียวกันแน่นอน)"""
+        if not self.picam2:
+            return None, None
+        if not USE_LORES_DETECTION:
+            return self.picam2.capture_array(), None
+        (main, lores), _ = self.picam2.capture_arrays(["main", "lores"])
+        return main, lores_to_rgb(lores, LORES_SIZE)
+
+    def capture_into(self, ring):
+        """เขียนเฟรมจาก buffer ของกล้องลง FrameRing ครั้งเดียว ไม่ผ่าน array ชั่วคราว"""
+        if not self.picam2:
+            return None
+        from picamera2 import MappedArray
+
+        request = self.picam2.capture_request()
+        try:
+            with ring.reserve() as views:
+                if views is None:
+                    return None
+                with MappedArray(request, "main") as m:
+                    h, w = views["main"].shape[:2]
+                    np.copyto(views["main"], m.array[:h, :w, :3])
+                if "lores" in views:
+                    with MappedArray(request, "lores") as m:
+                        lores_to_rgb(m.array, LORES_SIZE, out=views["lores"])
+        finally:
+            request.release()
+        return ring.last_seq
+
+
+# -----------------------------
+# Readers (อ่านทีละภาพ คืนค่า (name, frame BGR) / (None, None) เมื่อหมด)
+# -----------------------------
+class ImageFolderReader:
+    """
+    ภาพในโฟลเดอร์เรียงตามชื่อไฟล์
+    preload=True: decode + ย่อเป็น MAIN_SIZE + encode JPEG ทุกภาพครั้งเดียวตอนเปิด (load test)
+    ระหว่างเล่นไม่ต้องอ่านไฟล์ / encode ใหม่ เหมือนกล้องจริงที่ได้ JPEG จาก hardware encoder
+    """
+
+    live = False
+    jpeg = None         # JPEG ของภาพล่าสุดที่ read() (เฉพาะ preload)
+
+    def __init__(self, folder, loop=True, preload=False):
+        self.paths = sorted(p for p in Path(folder).iterdir() if p.suffix.lower() in IMAGE_EXTS)
+        if not self.paths:
+            raise FileNotFoundError(f"No images in {folder}")
+        self.loop = loop
+        self.fps = 0.0
+        self._index = 0
+        self._preloaded = None
+        if preload:
+            self._preloaded = []
+            for path in self.paths:
+                frame = _to_main(cv2.imread(str(path)))
+                self._preloaded.append((frame, cv2.imencode(".jpg", frame)[1].tobytes()))
+
+    def __len__(self):
+        return len(self.paths)
+
+    def read(self):
+        if self._index >= len(self.paths):
+            if not self.loop:
+                return None, None
+            self._index = 0
+        path = self.paths[self._index]
+        self._index += 1
+        if self._preloaded is not None:
+            frame, self.jpeg = self._preloaded[self._index - 1]
+            return path.name, frame
+        return path.name, cv2.imread(str(path))
+
+    def close(self):
+        pass
+
+
+def _is_live_uri(uri):
+    """เลข index / /dev/videoN / URL (rtsp://, http://) = กล้องสด ที่เหลือถือว่าเป็นไฟล์วิดีโอ"""
+    return isinstance(uri, int) or str(uri).isdigit() or str(uri).startswith("/dev/") or "://" in str(uri)
+
+
+class VideoCaptureReader:
+    """
+    cv2.VideoCapture: ไฟล์วิดีโอ (ชื่อเฟรม = เลขเฟรม เล่นวนได้) หรือกล้องสด V4L2 / RTSP
+    กล้องสดอ่านไม่ได้ (สายหลุด / stream ขาด) จะเปิดใหม่ทุก CAMERA_RECONNECT_SECONDS
+    """
+
+    def __init__(self, uri, loop=True):
+        self.uri = int(uri) if str(uri).isdigit() else str(uri)
+        self.live = _is_live_uri(uri)
+        self.loop = loop
+        self._index = 0
+        self._cap = None
+        self._open()
+        if not self._cap.isOpened() and not self.live:
+            raise FileNotFoundError(f"Cannot open video {uri}")
+        self.fps = 0.0 if self.live else float(self._cap.get(cv2.CAP_PROP_FPS) or 0.0)
+
+    def _open(self):
+        if self._cap is not None:
+            self._cap.release()
+        self._cap = cv2.VideoCapture(self.uri)
+        if self.live:
+            # ให้ buffer ของ driver เก็บแค่ภาพล่าสุด (กล้องสดไม่ควรได้ภาพที่ค้างอยู่ในคิว)
+            self._cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+
+    def __len__(self):
+        return 0 if self.live else int(self._cap.get(cv2.CAP_PROP_FRAME_COUNT))
+
+    def read(self):
+        ok, frame = self._cap.read() if self._cap.isOpened() else (False, None)
+        if not ok and self.live:
+            print(f"Camera {self.uri}: no frame, reconnecting in {CAMERA_RECONNECT_SECONDS} s")
+            time.sleep(CAMERA_RECONNECT_SECONDS)
+            self._open()
+            return None, None
+        if not ok and self.loop and self._index > 0:
+            self._cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            self._index = 0
+            ok, frame = self._cap.read()
+        if not ok:
+            return None, None
+        name = str(self._index)
+        self._index += 1
+        return name, frame
+
+    def close(self):
+        self._cap.release()
+
+
+# -----------------------------
+# Sources ที่อ่านภาพเอง (ไม่มี hardware encoder)
+# -----------------------------
+class ReaderSource(FrameSource):
+    """
+    FrameSource บน reader (ImageFolderReader / VideoCaptureReader)
+    - กล้องสด หรือ fps > 0: thread ของ source อ่านภาพต่อเนื่อง เก็บภาพล่าสุดไว้
+      และ encode JPEG ให้ stream ไม่เกิน stream_fps (เฉพาะตอนมีผู้ชม)
+      capture_frames() รอภาพใหม่ถัดไป (เหมือน capture_request ของ Picamera2)
+    - ไฟล์ที่ fps = 0: ภาพเปลี่ยนเฉพาะตอน capture (เล่นทีละภาพตามจังหวะของผู้เรียก)
+    """
+
+    def __init__(self, fps=None, loop=True, stream_fps=CAMERA_STREAM_FPS):
+        super().__init__()
+        self.fps = fps
+        self.loop = loop
+        self.default_stream_fps = stream_fps
+        self.stream_fps = stream_fps
+        self.reader = None
+        self._read_lock = threading.Lock()
+        self._cond = threading.Condition()
+        self._frame = None
+        self._seq = 0
+        self._thread = None
+        self._stop = threading.Event()
+
+    def _open_reader(self):
+        raise NotImplementedError
+
+    @property
+    def threaded(self):
+        return self._thread is not None
+
+    def set_stream_fps(self, fps):
+        super().set_stream_fps(self.default_stream_fps if fps is None else fps)
+
+    def init_camera(self):
+        if self.reader is not None:
+            return
+        self.reader = self._open_reader()
+        fps = self.fps if self.fps is not None else self.reader.fps
+        if self.reader.live or fps > 0:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._grab_loop, args=(fps,), name=f"{self.kind}-grab", daemon=True)
+            self._thread.start()
+
+    def close_camera(self):
+        self._stop.set()
+        with self._cond:
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+        if self.reader is not None:
+            self.reader.close()
+            self.reader = None
+
+    def _read_main(self):
+        """ภาพถัดไปจาก reader (None = หมดแล้ว / กล้องสดยังไม่มีภาพ)"""
+        with self._read_lock:
+            if self.reader is None:
+                return None
+            name, frame = self.reader.read()
+            if frame is None:
+                return None
+            self.current_name = name
+        return _to_main(frame)
+
+    def _grab_loop(self, fps):
+        interval = 1.0 / fps if fps > 0 else 0.0
+        next_time = time.monotonic()
+        last_stream = 0.0
+        while not self._stop.is_set():
+            frame = self._read_main()
+            if frame is None:
+                if not self.reader.live:
+                    break               # ไฟล์จบ (loop=False)
+                continue
+            with self._cond:
+                self._frame = frame
+                self._seq += 1
+                self._cond.notify_all()
+
+            now = time.monotonic()
+            stream_interval = 1.0 / self.stream_fps if self.stream_fps else 0.0
+            if self.stream_wanted and now - last_stream >= stream_interval and not self.is_frozen:
+                last_stream = now
+                jpeg = getattr(self.reader, "jpeg", None)
+                if jpeg is None:
+                    ok, buf = cv2.imencode(".jpg", frame)
+                    jpeg = buf.tobytes() if ok else None
+                if jpeg is not None:
+                    self.publish_jpeg(jpeg)
+
+            if interval:
+                next_time += interval
+                self._stop.wait(max(0.0, next_time - time.monotonic()))
+
+    def capture_frames(self, timeout=2.0):
+        if self._thread is None:
+            main = self._read_main()
+            return (None, None) if main is None else (main, _lores_of(main))
+        with self._cond:
+            seq = self._seq
+            # ภาพใหม่ถัดไป (thread ของ source แทน array ใหม่ทุกเฟรม จึงไม่ต้อง copy)
+            self._cond.wait_for(lambda: self._seq != seq or self._stop.is_set(), timeout)
+            main = self._frame if self._seq != seq else None
+        return (None, None) if main is None else (main, _lores_of(main))
+
+
+class OpenCVSource(ReaderSource):
+    """
+    uri = เลข index / "/dev/video0" (USB, V4L2) / "rtsp://..." (IP camera) / path ไฟล์วิดีโอ
+    fps = None: กล้องสดใช้ fps ของกล้อง / ไฟล์ใช้ fps ของไฟล์
+    """
+
+    kind = "opencv"
+
+    def __init__(self, uri, fps=None, loop=True, stream_fps=CAMERA_STREAM_FPS):
+        super().__init__(fps, loop, stream_fps)
+        self.uri = uri
+
+    def _open_reader(self):
+        print(f"Opening video source {self.uri}...")
+        return VideoCaptureReader(self.uri, self.loop)
+
+
+class ImageFolderSource(ReaderSource):
+    """ภาพในโฟลเดอร์ เล่นตาม fps (0 = ภาพเปลี่ยนเฉพาะตอน capture)"""
+
+    kind = "folder"
+
+    def __init__(self, folder, fps=None, loop=True, stream_fps=CAMERA_STREAM_FPS, preload=False):
+        super().__init__(fps, loop, stream_fps)
+        self.folder = folder
+        self.preload = preload
+
+    def _open_reader(self):
+        print(f"Opening image folder {self.folder}...")
+        return ImageFolderReader(self.folder, self.loop, self.preload)
+
+
+def open_file_source(path, fps=None, loop=True, preload=False):
+    """โฟลเดอร์ภาพ -> ImageFolderSource / ไฟล์อื่น -> OpenCVSource (preload ใช้กับโฟลเดอร์เท่านั้น)"""
+    if Path(path).is_dir():
+        return ImageFolderSource(path, fps, loop, preload=preload)
+    return OpenCVSource(path, fps, loop)
+
+
+# -----------------------------
+# Cameras จาก config
+# -----------------------------
+def open_camera(spec):
+    """
+    spec ตัวหนึ่งของ CAMERAS -> camera object
+    "cameralow" คือ module cameralow เอง (mockcamera.install() แทนที่ได้ ใช้กับ benchmark / load test)
+    """
+    kind = spec.get("source", "cameralow")
+    if kind == "cameralow":
+        import cameralow
+        return cameralow
+    if kind == "picamera2":
+        return Picamera2Source(spec.get("camera_num", 0))
+    if kind == "opencv":
+        return OpenCVSource(spec["uri"], spec.get("fps"), spec.get("loop", True))
+    if kind == "folder":
+        return ImageFolderSource(spec["uri"], spec.get("fps"), spec.get("loop", True))
+    raise ValueError(f"Unknown camera source {kind!r} for camera {spec.get('id')!r}")
+
+
+def build_cameras(specs=CAMERAS):
+    """{camera id: camera} ตามลำดับใน CAMERAS (ตัวแรกคือกล้อง default ของ endpoint ที่ไม่ระบุ camera)"""
+    cameras = {}
+    for spec in specs:
+        if spec["id"] in cameras:
+            raise ValueError(f"Duplicate camera id {spec['id']!r}")
+        cameras[spec["id"]] = open_camera(spec)
+    if not cameras:
+        raise ValueError("CAMERAS is empty")
+    return cameras
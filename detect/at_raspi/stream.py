@@ -1,20 +1,53 @@
 # stream.py
+# stream ที่วาดกรอบ YOLO ทับภาพ (ใช้กับ camera.py)
+# YOLO รันใน thread ของตัวเองบนภาพล่าสุด stream วาดกรอบล่าสุดที่มี (frame_results.ResultCache)
+# fps ของ stream จึงไม่ถูกจำกัดด้วยความเร็วของ detect
 import cv2
+import threading
 import time
 from camera import capture_frame
-from detector import detect
+from detector import detect_plate, class_names
+from detector_backends import draw_detections
+from dualstream import frame_size
+from frame_results import ResultCache
 
 last_raw_frame = None
 last_annotated_frame = None
 is_frozen = False
 
+results = ResultCache()
+_detect_thread = None
+
 def toggle_freeze():
     global is_frozen
     is_frozen = not is_frozen
     return is_frozen
 
+def _detect_loop():
+    """detect ภาพล่าสุดที่ stream จับได้ ต่อเนื่องเท่าที่โมเดลทำได้"""
+    last = None
+    while True:
+        frame = last_raw_frame
+        if frame is None or frame is last or is_frozen:
+            time.sleep(0.01)
+            continue
+        last = frame
+        try:
+            results.set_latest("stream", detect_plate(frame), frame_size(frame))
+        except Exception as e:
+            # โมเดลโหลดไม่ได้ / backend error: thread ต้องอยู่ต่อ ไม่งั้น stream ไม่มีกรอบอีกเลย
+            print(f"Stream detect error: {e}")
+            time.sleep(1.0)
+
+def start_detector():
+    global _detect_thread
+    if _detect_thread is None:
+        _detect_thread = threading.Thread(target=_detect_loop, name="stream-detect", daemon=True)
+        _detect_thread.start()
+
 def generate_frames():
     global last_raw_frame, last_annotated_frame
+    start_detector()
 
     while True:
         if is_frozen and last_annotated_frame is not None:
@@ -22,10 +55,12 @@ def generate_frames():
             time.sleep(0.1)
         else:
             raw = capture_frame()
-            last_raw_frame = raw.copy()
-            results = detect(raw)
-            annotated = results[0].plot()
-            last_annotated_frame = annotated.copy()
+            last_raw_frame = raw
+            annotated = raw.copy()
+            latest = results.latest("stream")
+            if latest is not None and latest["detections"] is not None:
+                draw_detections(annotated, latest["detections"], class_names())
+            last_annotated_frame = annotated
             frame = annotated
 
         _, buffer = cv2.imencode(".jpg", frame)
@@ -0,0 +1,183 @@
+# sync.py
+"""
+ส่ง record จาก Pi ขึ้นเครื่องกลาง (aggregator.py) แบบ batch + gzip
+- spool คือตาราง records ใน SQLite ของ RecordStore เอง (WAL, อยู่บนดิสก์อยู่แล้ว)
+  ตัวส่งจำแค่ id ล่าสุดที่ aggregator ยืนยันแล้ว (ตาราง sync_state) เน็ตหลุด/เครื่องดับก็ส่งต่อจากจุดเดิมได้
+- thread แยกอ่าน record ที่ id มากกว่า cursor ครั้งละ SYNC_BATCH_SIZE ไม่แตะงาน scan / writer เลย
+- ล้มเหลว: รอแบบ exponential backoff + jitter แล้วส่ง batch เดิมซ้ำ
+- aggregator ตัดซ้ำด้วย (node, id) ส่งซ้ำกี่ครั้งก็ได้ record เดียว
+"""
+import gzip
+import json
+import random
+import socket
+import threading
+import time
+import urllib.error
+import urllib.request
+
+from config import (
+    RECORD_DB_PATH, SYNC_URL, SYNC_NODE_ID, SYNC_TOKEN, SYNC_BATCH_SIZE, SYNC_INTERVAL_SECONDS,
+    SYNC_TIMEOUT_SECONDS, SYNC_RETRY_SECONDS, SYNC_MAX_BACKOFF_SECONDS
+)
+from record_store import connect
+
+SYNC_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sync_state (
+    target TEXT PRIMARY KEY,
+    last_id INTEGER NOT NULL,
+    updated REAL NOT NULL
+);
+"""
+FIELDS = ("id", "ts", "plate", "province", "confidence", "province_score", "camera")
+
+
+class SyncError(Exception):
+    """aggregator ตอบกลับผิดปกติ (จะลองใหม่ตาม backoff)"""
+
+
+class RecordSync:
+    def __init__(self, url=SYNC_URL, db_path=RECORD_DB_PATH, node_id=SYNC_NODE_ID, token=SYNC_TOKEN,
+                 batch_size=SYNC_BATCH_SIZE, interval=SYNC_INTERVAL_SECONDS, timeout=SYNC_TIMEOUT_SECONDS):
+        self.url = url.rstrip("/")
+        self.db_path = db_path
+        self.node_id = node_id or socket.gethostname()
+        self.token = token
+        self.batch_size = batch_size
+        self.interval = interval
+        self.timeout = timeout
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+
+        conn = connect(self.db_path)
+        conn.executescript(SYNC_SCHEMA)
+        row = conn.execute("SELECT last_id FROM sync_state WHERE target = ?", (self.url,)).fetchone()
+        conn.close()
+
+        self.last_id = row["last_id"] if row else 0     # id ล่าสุดที่ aggregator รับแล้ว
+        self.pending = 0
+        self.uploaded = 0
+        self.duplicates = 0
+        self.batches = 0
+        self.failures = 0
+        self.bytes_sent = 0
+        self.backoff = 0.0
+        self.last_error = None
+        self.last_success = None
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name="record-sync", daemon=True)
+        self._thread.start()
+        print(f"Record sync: {self.node_id} -> {self.url} (from id {self.last_id})")
+
+    def stop(self):
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._wake.set()
+        self._thread.join(timeout=self.timeout + 5)
+        self._thread = None
+
+    def wake(self):
+        """ให้ตรวจ record ใหม่ทันที (ไม่ต้องรอรอบ interval)"""
+        self._wake.set()
+
+    # --- Upload ---
+    def _read_batch(self, conn):
+        rows = conn.execute(
+            f"SELECT {', '.join(FIELDS)} FROM records WHERE id > ? ORDER BY id LIMIT ?",
+            (self.last_id, self.batch_size),
+        ).fetchall()
+        (newest,) = conn.execute("SELECT COALESCE(MAX(id), 0) FROM records").fetchone()
+        return [dict(row) for row in rows], newest
+
+    def _post(self, records):
+        body = gzip.compress(json.dumps({"node": self.node_id, "records": records}, ensure_ascii=False).encode("utf-8"))
+        headers = {"Content-Type": "application/json", "Content-Encoding": "gzip"}
+        if self.token:
+            headers["Authorization"] = f"Bearer {self.token}"
+        request = urllib.request.Request(self.url + "/ingest", data=body, headers=headers, method="POST")
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                result = json.loads(response.read())
+        except urllib.error.HTTPError as e:
+            raise SyncError(f"HTTP {e.code}: {e.read()[:200]!r}") from e
+        if result.get("last_id") != records[-1]["id"]:
+            raise SyncError(f"unexpected ack {result}")
+        return result, len(body)
+
+    def upload_once(self):
+        """ส่ง batch ถัดไป 1 batch คืนค่าจำนวน record ที่ส่ง (0 = ไม่มีของใหม่)"""
+        conn = connect(self.db_path)
+        try:
+            records, newest = self._read_batch(conn)
+            self.pending = newest - self.last_id
+            if not records:
+                return 0
+
+            result, sent_bytes = self._post(records)
+
+            # เลื่อน cursor หลัง aggregator ยืนยันแล้วเท่านั้น (ดับก่อนบรรทัดนี้ = ส่งซ้ำ ไม่ใช่หาย)
+            with conn:
+                conn.execute(
+                    "INSERT INTO sync_state (target, last_id, updated) VALUES (?, ?, ?) "
+                    "ON CONFLICT(target) DO UPDATE SET last_id = excluded.last_id, updated = excluded.updated",
+                    (self.url, records[-1]["id"], time.time()),
+                )
+        finally:
+            conn.close()
+
+        with self._lock:
+            self.last_id = records[-1]["id"]
+            self.pending = max(newest - self.last_id, 0)
+            self.uploaded += result.get("accepted", 0)
+            self.duplicates += result.get("duplicates", 0)
+            self.batches += 1
+            self.bytes_sent += sent_bytes
+            self.last_success = time.time()
+        return len(records)
+
+    def _loop(self):
+        delay = 0.0
+        while not self._stop.is_set():
+            if delay:
+                self._wake.wait(delay)
+                self._wake.clear()
+                if self._stop.is_set():
+                    break
+            try:
+                sent = self.upload_once()
+            except Exception as e:
+                with self._lock:
+                    self.failures += 1
+                    self.last_error = f"{type(e).__name__}: {e}"
+                    self.backoff = min(max(self.backoff * 2, SYNC_RETRY_SECONDS), SYNC_MAX_BACKOFF_SECONDS)
+                # jitter: Pi หลายตัวที่เน็ตกลับมาพร้อมกันจะไม่ยิงเข้า aggregator พร้อมกัน
+                delay = self.backoff * random.uniform(0.5, 1.0)
+                print(f"Record sync failed ({self.last_error}), retry in {delay:.1f} s")
+                continue
+            self.backoff = 0.0
+            # batch เต็ม = ยังมีค้าง ส่งต่อทันที
+            delay = 0.0 if sent >= self.batch_size else self.interval
+
+    def stats(self):
+        with self._lock:
+            return {
+                "url": self.url,
+                "node": self.node_id,
+                "last_id": self.last_id,
+                "pending": self.pending,
+                "uploaded": self.uploaded,
+                "duplicates": self.duplicates,
+                "batches": self.batches,
+                "failures": self.failures,
+                "bytes_sent": self.bytes_sent,
+                "backoff_seconds": round(self.backoff, 1),
+                "last_error": self.last_error,
+                "last_success": self.last_success,
+            }
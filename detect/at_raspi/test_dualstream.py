@@ -0,0 +1,87 @@
+# test_dualstream.py
+# ทดสอบด้วยภาพสังเคราะห์ (ไม่ต้องมีกล้อง): python -m pytest test_dualstream.py
+import cv2
+import numpy as np
+
+from dualstream import compact_i420, crop_region, frame_size, lores_to_rgb, scale_detections
+
+MAIN_SIZE, LORES_SIZE = (1280, 720), (640, 360)
+
+
+def _pad_i420(yuv, w, h, stride):
+    """I420 ไม่มี padding -> layout ของ Picamera2: Y แถวละ stride, U / V แถวละ stride/2 ต่อกัน"""
+    flat = yuv.reshape(-1)
+    padded = np.zeros(h * 3 // 2 * stride, np.uint8)
+    padded[:h * stride].reshape(h, stride)[:, :w] = yuv[:h]
+    ch, cw, cstride = h // 2, w // 2, stride // 2
+    for i in range(2):
+        src = flat[w * h + i * ch * cw:w * h + (i + 1) * ch * cw].reshape(ch, cw)
+        start = h * stride + i * ch * cstride
+        padded[start:start + ch * cstride].reshape(ch, cstride)[:, :cw] = src
+    return padded.reshape(h * 3 // 2, stride)
+
+
+def _noise(h, w):
+    return np.random.default_rng(0).integers(0, 256, (h, w, 3), np.uint8)
+
+
+def test_compact_i420_without_padding_is_a_view():
+    w, h = LORES_SIZE
+    yuv = cv2.cvtColor(_noise(h, w), cv2.COLOR_BGR2YUV_I420)
+    assert np.shares_memory(compact_i420(yuv, w, h), yuv)
+
+
+def test_padded_stride_matches_unpadded_buffer():
+    w, h = LORES_SIZE
+    yuv = cv2.cvtColor(_noise(h, w), cv2.COLOR_BGR2YUV_I420)
+    padded = _pad_i420(yuv, w, h, stride=704)      # stride มี padding ท้ายแถว (เหมือน lores ที่กว้างไม่ลงตัว 64)
+    assert np.array_equal(compact_i420(padded, w, h), yuv)
+    assert np.array_equal(lores_to_rgb(padded, LORES_SIZE), lores_to_rgb(yuv, LORES_SIZE))
+
+
+def test_padded_stride_with_odd_chroma_rows():
+    w, h = 200, 150                                 # h/2 คี่: U กับ V แบ่งแถวของ array กันคนละครึ่ง
+    yuv = cv2.cvtColor(_noise(h, w), cv2.COLOR_BGR2YUV_I420)
+    padded = _pad_i420(yuv, w, h, stride=256)
+    assert np.array_equal(compact_i420(padded, w, h), yuv)
+
+
+def test_lores_to_rgb_writes_into_out():
+    w, h = LORES_SIZE
+    bgr = _noise(h, w)
+    out = np.empty_like(bgr)
+    assert lores_to_rgb(bgr, LORES_SIZE, out=out) is out
+    assert np.array_equal(out, bgr)
+
+
+def test_box_found_on_lores_maps_back_to_main():
+    main = np.zeros((MAIN_SIZE[1], MAIN_SIZE[0], 3), np.uint8)
+    box = (400, 300, 560, 380)
+    main[box[1]:box[3], box[0]:box[2]] = 255
+    lores = cv2.resize(main, LORES_SIZE, interpolation=cv2.INTER_AREA)
+
+    ys, xs = np.nonzero(lores[:, :, 0] == 255)
+    found = np.array([[xs.min(), ys.min(), xs.max() + 1, ys.max() + 1, 0.9, 1]], np.float32)
+    mapped = scale_detections(found, frame_size(lores), frame_size(main))[0]
+
+    assert tuple(int(v) for v in mapped[:4]) == box
+    assert mapped[4] == np.float32(0.9) and mapped[5] == 1        # conf / class ไม่ถูกแปลง
+    assert found[0, 0] == xs.min()                                # ไม่แก้ array เดิม
+
+
+def test_scale_detections_per_axis():
+    dets = np.array([[10, 10, 20, 30, 0.5, 0]], np.float32)
+    scaled = scale_detections(dets, (100, 100), (200, 50))
+    assert scaled[0, :4].tolist() == [20, 5, 40, 15]
+
+
+def test_crop_region_rounds_outward():
+    frame = np.arange(100 * 100).reshape(100, 100)
+    crop = crop_region(frame, (10.2, 20.7, 30.1, 40.01))
+    assert crop.shape == (41 - 20, 31 - 10)                        # floor ซ้าย/บน ceil ขวา/ล่าง
+    assert crop[0, 0] == frame[20, 10]
+
+
+def test_crop_region_clips_to_frame():
+    frame = np.zeros((50, 80, 3), np.uint8)
+    assert crop_region(frame, (-5.5, -3.0, 90.2, 60.0)).shape == (50, 80, 3)
@@ -0,0 +1,93 @@
+# test_frame_ring.py
+# python -m pytest test_frame_ring.py
+import multiprocessing as mp
+
+import numpy as np
+import pytest
+
+from frame_ring import FrameRing
+
+PLANES = {"main": ((72, 128, 3), "uint8"), "lores": ((36, 64, 3), "uint8")}
+
+
+def _frame(value):
+    return {name: np.full(shape, value, dtype) for name, (shape, dtype) in PLANES.items()}
+
+
+@pytest.fixture
+def ring():
+    ring = FrameRing.create(3, PLANES)
+    yield ring
+    ring.close()
+
+
+def test_write_then_lease_is_zero_copy_and_read_only(ring):
+    seq = ring.write(**_frame(7))
+    assert seq == ring.last_seq == 1
+    with ring.lease(seq) as (got, views):
+        assert got == seq
+        assert int(views["main"][0, 0, 0]) == 7 and int(views["lores"][0, 0, 0]) == 7
+        assert not views["main"].flags.owndata and not views["main"].flags.writeable
+
+
+def test_lease_latest_and_overwritten(ring):
+    seqs = [ring.write(**_frame(v)) for v in (1, 2, 3, 4)]      # 3 slot: seq แรกถูกเขียนทับ
+    with ring.lease() as (got, views):
+        assert got == seqs[-1] and int(views["main"][0, 0, 0]) == 4
+    with ring.lease(seqs[0]) as (got, views):
+        assert got is None and views is None
+
+
+def test_leased_slot_is_not_overwritten(ring):
+    seq = ring.write(**_frame(9))
+    with ring.lease(seq) as (_, views):
+        for v in range(10):                                      # วนเขียนรอบ ring หลายรอบ
+            ring.write(**_frame(v))
+        assert int(views["main"][0, 0, 0]) == 9
+    assert ring.write(**_frame(1)) is not None
+
+
+def test_write_returns_none_when_every_slot_is_leased(ring):
+    seqs = [ring.write(**_frame(v)) for v in range(ring.slots)]
+    leases = [ring.lease(seq) for seq in seqs]
+    for lease in leases:
+        lease.__enter__()
+    try:
+        assert ring.write(**_frame(0)) is None
+    finally:
+        for lease in leases:
+            lease.__exit__(None, None, None)
+    assert ring.write(**_frame(0)) is not None
+
+
+def _read_in_other_process(spec, seqs, results):
+    """ฝั่ง process อื่น: attach แล้วอ่านทุก seq ส่ง (seq, ค่า pixel, เป็น view ของ shared memory หรือไม่) กลับ"""
+    ring = FrameRing.attach(spec)
+    try:
+        for seq in seqs:
+            with ring.lease(seq) as (got, views):
+                if views is None:
+                    results.put((seq, None, False))
+                    continue
+                main = views["main"]
+                results.put((got, int(main[0, 0, 0]), not main.flags.owndata))
+    finally:
+        ring.close()
+
+
+def test_attach_from_spawned_process():
+    ctx = mp.get_context("spawn")                                # แบบเดียวกับที่ Pi ใช้สร้าง worker process
+    ring = FrameRing.create(4, PLANES, ctx=ctx)
+    try:
+        seqs = [ring.write(**_frame(v)) for v in (11, 22, 33)]
+        results = ctx.Queue()
+        reader = ctx.Process(target=_read_in_other_process, args=(ring.spec, seqs, results))
+        reader.start()
+        got = [results.get(timeout=30) for _ in seqs]
+        reader.join(timeout=10)
+        assert reader.exitcode == 0
+        assert got == [(seq, v, True) for seq, v in zip(seqs, (11, 22, 33))]
+        # reader คืน lease ครบ: writer เขียนได้ทุก slot อีกครั้ง
+        assert all(ring.write(**_frame(0)) is not None for _ in range(ring.slots))
+    finally:
+        ring.close()
@@ -0,0 +1,75 @@
+# test_motion.py
+# ภาพสังเคราะห์ + เวลาจำลอง (check(now=...)) ไม่ต้องรอเวลาจริง: python -m pytest test_motion.py
+import numpy as np
+import pytest
+
+from motion import MotionGate
+
+STEP = 0.1
+
+
+@pytest.fixture
+def gate():
+    return MotionGate(hold_seconds=0.5, refresh_seconds=2.0)
+
+
+@pytest.fixture
+def noisy():
+    rng = np.random.default_rng(0)
+
+    def add_noise(img):
+        # noise ของเซนเซอร์ต้องไม่ทำให้ gate เปิด
+        return np.clip(img.astype(np.int16) + rng.integers(-4, 5, img.shape), 0, 255).astype(np.uint8)
+    return add_noise
+
+
+def _scene():
+    return np.full((360, 640, 3), 90, np.uint8)
+
+
+def _car(scene):
+    car = scene.copy()
+    car[150:300, 200:420] = 220
+    return car
+
+
+def _run(gate, frame_fn, start, count):
+    decisions = [gate.check(frame_fn(), now=start + i * STEP) for i in range(count)]
+    return decisions, start + count * STEP
+
+
+def test_static_scene_closes_after_first_frame(gate, noisy):
+    scene = _scene()
+    decisions, _ = _run(gate, lambda: noisy(scene), 0.0, 15)
+    assert decisions[0]                     # เฟรมแรก: ยังไม่มีพื้นหลัง
+    assert not any(decisions[-5:])          # พ้น hold แล้วข้าม
+    assert gate.stats()["skip"] > 0
+
+
+def test_car_entering_opens_gate(gate, noisy):
+    scene = _scene()
+    _, t = _run(gate, lambda: noisy(scene), 0.0, 15)
+    assert gate.check(noisy(_car(scene)), now=t)
+    assert gate.stats()["active"]
+
+
+def test_parked_car_is_absorbed_then_refreshed(gate, noisy):
+    scene = _scene()
+    _, t = _run(gate, lambda: noisy(scene), 0.0, 15)
+    car = _car(scene)
+    decisions, t = _run(gate, lambda: noisy(car), t, 60)
+    assert decisions[0] and not decisions[-1]   # พื้นหลังค่อยๆ กลืนรถที่จอดนิ่ง แล้ว gate ปิด
+    assert gate.check(noisy(car), now=t + 2.0)  # บังคับ detect ตาม refresh_seconds
+    assert gate.stats()["forced"] >= 1
+
+
+def test_reset_forgets_background(gate, noisy):
+    scene = _scene()
+    _, t = _run(gate, lambda: noisy(scene), 0.0, 15)
+    assert not gate.check(noisy(scene), now=t)
+    gate.reset()
+    assert gate.check(noisy(scene), now=t + STEP)
+
+
+def test_accepts_grayscale_frames(gate):
+    assert gate.check(np.full((360, 640), 90, np.uint8), now=0.0)
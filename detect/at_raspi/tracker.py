@@ -0,0 +1,200 @@
+# tracker.py
+import time
+import itertools
+from collections import defaultdict
+
+import cv2
+import numpy as np
+from config import (
+    TRACK_IOU_THRESHOLD,
+    TRACK_CENTROID_RATIO,
+    TRACK_TIMEOUT_SECONDS,
+    TRACK_OCR_FRAMES,
+    TRACK_MIN_HITS,
+)
+
+NOT_FOUND_CHARS = "ไม่พบอักษร"
+NOT_FOUND_PROVINCE = "ไม่พบจังหวัด"
+
+
+def iou_matrix(a, b):
+    """IoU ระหว่างกรอบทุกคู่ a (N,4) กับ b (M,4) -> (N,M)"""
+    x1 = np.maximum(a[:, None, 0], b[None, :, 0])
+    y1 = np.maximum(a[:, None, 1], b[None, :, 1])
+    x2 = np.minimum(a[:, None, 2], b[None, :, 2])
+    y2 = np.minimum(a[:, None, 3], b[None, :, 3])
+    inter = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+    area_a = (a[:, 2] - a[:, 0]) * (a[:, 3] - a[:, 1])
+    area_b = (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1])
+    return inter / np.maximum(area_a[:, None] + area_b[None, :] - inter, 1e-6)
+
+
+def sharpness(gray):
+    """ค่าความคมของภาพ (variance of Laplacian) ยิ่งมากยิ่งชัด"""
+    return float(cv2.Laplacian(gray, cv2.CV_64F).var())
+
+
+# -----------------------------
+# Track
+# -----------------------------
+class Track:
+    def __init__(self, track_id, bbox, now):
+        self.id = track_id
+        self.bbox = bbox
+        self.first_seen = now
+        self.last_seen = now
+        self.hits = 0
+        self.samples = []       # [(sharpness, crop, local_detections)] เก็บแค่ภาพที่คมที่สุด
+
+    def add_sample(self, frame, detections, max_samples):
+        h, w = frame.shape[:2]
+        x1, y1, x2, y2 = self.bbox
+        # ขยายกรอบเล็กน้อยกันตัวอักษรชิดขอบ
+        mx, my = (x2 - x1) * 0.1, (y2 - y1) * 0.1
+        cx1, cy1 = max(int(x1 - mx), 0), max(int(y1 - my), 0)
+        cx2, cy2 = min(int(x2 + mx), w), min(int(y2 + my), h)
+        crop = frame[cy1:cy2, cx1:cx2]
+        if crop.size == 0:
+            return
+
+        score = sharpness(cv2.cvtColor(crop, cv2.COLOR_RGB2GRAY))
+        if len(self.samples) >= max_samples and score <= self.samples[-1][0]:
+            return
+
+        local = detections.copy()
+        local[:, [0, 2]] -= cx1
+        local[:, [1, 3]] -= cy1
+        self.samples.append((score, crop.copy(), local))
+        self.samples.sort(key=lambda s: s[0], reverse=True)
+        del self.samples[max_samples:]
+
+
+# -----------------------------
+# Plate Tracker
+# -----------------------------
+class PlateTracker:
+    """
+    ให้ track ID กับป้ายแต่ละป้ายจากผล detect ต่อเนื่องหลายเฟรม (IoU ก่อน แล้วค่อย centroid)
+    เก็บเฉพาะภาพป้ายที่คมที่สุดไม่กี่ภาพต่อ track ไว้ OCR ตอน track จบ
+    """
+
+    def __init__(self, iou_threshold=TRACK_IOU_THRESHOLD, centroid_ratio=TRACK_CENTROID_RATIO,
+                 timeout=TRACK_TIMEOUT_SECONDS, max_samples=TRACK_OCR_FRAMES, min_hits=TRACK_MIN_HITS):
+        self.iou_threshold = iou_threshold
+        self.centroid_ratio = centroid_ratio
+        self.timeout = timeout
+        self.max_samples = max_samples
+        self.min_hits = min_hits
+        self.tracks = []
+        self._ids = itertools.count(1)
+
+    def update(self, frame, plates, now=None):
+        """
+        plates = [detections ของแต่ละป้าย (N,6)]
+        คืนค่า track ที่จบแล้ว (หายไปนานเกิน timeout) พร้อมให้ OCR
+        """
+        now = time.monotonic() if now is None else now
+        boxes = np.array([[d[:, 0].min(), d[:, 1].min(), d[:, 2].max(), d[:, 3].max()] for d in plates],
+                         dtype=np.float32).reshape(-1, 4)
+
+        # track ที่หายไปนานเกิน timeout ถือว่าจบ ไม่เอามาจับคู่แล้ว
+        ended = [t for t in self.tracks if now - t.last_seen > self.timeout]
+        self.tracks = [t for t in self.tracks if now - t.last_seen <= self.timeout]
+
+        matches = self._match(boxes)
+        for pi, dets in enumerate(plates):
+            track = matches.get(pi)
+            if track is None:
+                track = Track(next(self._ids), tuple(boxes[pi]), now)
+                self.tracks.append(track)
+            track.bbox = tuple(boxes[pi])
+            track.last_seen = now
+            track.hits += 1
+            track.add_sample(frame, dets, self.max_samples)
+
+        return [t for t in ended if t.hits >= self.min_hits and t.samples]
+
+    def flush(self):
+        ended = [t for t in self.tracks if t.hits >= self.min_hits and t.samples]
+        self.tracks = []
+        return ended
+
+    def _match(self, boxes):
+        """จับคู่ป้ายในเฟรมนี้กับ track เดิม คืนค่า {index ของป้าย: track}"""
+        if not self.tracks or len(boxes) == 0:
+            return {}
+        track_boxes = np.array([t.bbox for t in self.tracks], dtype=np.float32)
+        iou = iou_matrix(boxes, track_boxes)
+
+        # ระยะ centroid เทียบกับเส้นทแยงของ track (ใช้ตอนรถเคลื่อนเร็วจน IoU ต่ำ)
+        c_new = (boxes[:, :2] + boxes[:, 2:]) / 2
+        c_old = (track_boxes[:, :2] + track_boxes[:, 2:]) / 2
+        dist = np.linalg.norm(c_new[:, None] - c_old[None], axis=2)
+        diag = np.linalg.norm(track_boxes[:, 2:] - track_boxes[:, :2], axis=1)
+        near = dist / np.maximum(diag[None], 1e-6)
+
+        # greedy: คู่ที่ IoU สูงสุดก่อน ถ้า IoU ไม่พอใช้ centroid ที่ใกล้สุด
+        score = np.where(iou >= self.iou_threshold, 1.0 + iou,
+                         np.where(near <= self.centroid_ratio, 1.0 - near / self.centroid_ratio, -1.0))
+        matches = {}
+        used_tracks = set()
+        for flat in np.argsort(-score, axis=None):
+            pi, ti = np.unravel_index(flat, score.shape)
+            if score[pi, ti] < 0:
+                break
+            if pi in matches or ti in used_tracks:
+                continue
+            matches[pi] = self.tracks[ti]
+            used_tracks.add(ti)
+        return matches
+
+
+# -----------------------------
+# Voting
+# -----------------------------
+def vote(readings):
+    """
+    รวมผล OCR หลายเฟรมของ track เดียว (readings = [dict จาก run_ocr])
+    ตัวอักษร: เลือกความยาวที่ได้คะแนนมากสุด แล้วโหวตทีละตำแหน่ง
+    จังหวัด: โหวตทั้งชื่อ น้ำหนัก = confidence x province_score
+    """
+    char_reads = [(r["chars"], r.get("confidence", 1.0)) for r in readings if r["chars"] != NOT_FOUND_CHARS]
+    prov_reads = [(r["province"], r.get("confidence", 1.0) * r.get("province_score", 1.0))
+                  for r in readings if r["province"] != NOT_FOUND_PROVINCE]
+
+    chars = NOT_FOUND_CHARS
+    char_conf = 0.0
+    if char_reads:
+        by_len = defaultdict(float)
+        for text, w in char_reads:
+            by_len[len(text)] += w
+        length = max(by_len, key=by_len.get)
+        same_len = [(t, w) for t, w in char_reads if len(t) == length]
+
+        out = []
+        for i in range(length):
+            pos = defaultdict(float)
+            for text, w in same_len:
+                pos[text[i]] += w
+            out.append(max(pos, key=pos.get))
+        chars = "".join(out)
+        char_conf = by_len[length] / max(sum(w for _, w in char_reads), 1e-6)
+
+    province = NOT_FOUND_PROVINCE
+    province_score = 0.0
+    if prov_reads:
+        by_name = defaultdict(float)
+        for name, w in prov_reads:
+            by_name[name] += w
+        province = max(by_name, key=by_name.get)
+        scores = [r.get("province_score", 0.0) for r in readings if r["province"] == province]
+        province_score = max(scores)
+
+    confidences = [r.get("confidence", 0.0) for r in readings]
+    return {
+        "chars": chars,
+        "province": province,
+        "province_score": province_score,
+        "confidence": round(float(np.mean(confidences)) * char_conf, 3) if confidences else 0.0,
+        "votes": len(readings),
+    }
@@ -0,0 +1,148 @@
+"""
+Export seperate-v8s.pt to ONNX / OpenVINO and build an INT8 ONNX model.
+
+usage:
+    python export_model.py --model ./seperate-v8s.pt --calib ./calib_images
+    python export_model.py --model ./seperate-v8s.pt --skip-openvino
+
+Outputs (next to the .pt file, the same names config.py expects):
+    seperate-v8s.onnx                        FP32 ONNX (static Bx3x640x640, B = --batch)
+    seperate-v8s-int8.onnx                   INT8 QDQ ONNX (static calibration)
+    seperate-v8s_openvino_model/*.xml        OpenVINO IR (FP32)
+    export_manifest.json                     arguments + sha256 of every output
+"""
+import argparse
+import hashlib
+import json
+import random
+import sys
+from pathlib import Path
+
+import cv2
+
+# ใช้ preprocess ตัวเดียวกับตอน inference จริง (calibration จะได้ตรงกัน)
+sys.path.insert(0, str(Path(__file__).resolve().parent / "at_raspi"))
+from detector_backends import preprocess
+
+IMAGE_EXTS = {".jpg", ".jpeg", ".png", ".bmp"}
+
+
+def sha256(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def export_onnx(model_path, imgsz, opset, batch):
+    from ultralytics import YOLO
+    out = YOLO(str(model_path)).export(format="onnx", imgsz=imgsz, opset=opset, simplify=True, dynamic=False, batch=batch)
+    return Path(out)
+
+
+def export_openvino(model_path, imgsz, batch):
+    from ultralytics import YOLO
+    out = YOLO(str(model_path)).export(format="openvino", imgsz=imgsz, dynamic=False, half=False, batch=batch)
+    return Path(out) / (model_path.stem + ".xml")
+
+
+class CalibrationReader:
+    """ป้อนภาพ calibration ทีละ batch (ตาม static batch ของโมเดล) ให้ onnxruntime.quantization"""
+
+    def __init__(self, input_name, images, imgsz, batch=1):
+        self.input_name = input_name
+        self.images = images
+        self.imgsz = imgsz
+        self.batch = batch
+        self._index = 0
+
+    def get_next(self):
+        if self._index >= len(self.images):
+            return None
+        # batch สุดท้ายที่ไม่ครบ วนใช้ภาพแรกๆ เติมให้ครบ shape
+        paths = [self.images[(self._index + i) % len(self.images)] for i in range(self.batch)]
+        self._index += self.batch
+        tensor, _ = preprocess([cv2.imread(str(p)) for p in paths], self.imgsz)
+        return {self.input_name: tensor}
+
+    def rewind(self):
+        self._index = 0
+
+
+def quantize_int8(onnx_path, out_path, calib_dir, imgsz, max_images, seed, batch=1):
+    import onnxruntime as ort
+    from onnxruntime.quantization import (
+        CalibrationMethod, QuantFormat, QuantType, quantize_static, quantize_dynamic
+    )
+    from onnxruntime.quantization.shape_inference import quant_pre_process
+
+    prepared = onnx_path.with_name(onnx_path.stem + "-prep.onnx")
+    quant_pre_process(str(onnx_path), str(prepared))
+
+    if calib_dir is None:
+        # ไม่มีภาพ calibration: quantize เฉพาะ weight (ช้ากว่า static แต่ไม่ต้องใช้ข้อมูล)
+        print("No --calib images, falling back to dynamic (weight-only) quantization")
+        quantize_dynamic(str(prepared), str(out_path), weight_type=QuantType.QInt8)
+        prepared.unlink()
+        return {"mode": "dynamic"}
+
+    images = sorted(p for p in Path(calib_dir).iterdir() if p.suffix.lower() in IMAGE_EXTS)
+    random.Random(seed).shuffle(images)
+    images = images[:max_images]
+    if not images:
+        raise SystemExit(f"No calibration images in {calib_dir}")
+
+    input_name = ort.InferenceSession(str(prepared), providers=["CPUExecutionProvider"]).get_inputs()[0].name
+    quantize_static(
+        str(prepared),
+        str(out_path),
+        CalibrationReader(input_name, images, imgsz, batch),
+        quant_format=QuantFormat.QDQ,
+        activation_type=QuantType.QUInt8,
+        weight_type=QuantType.QInt8,
+        per_channel=True,
+        calibrate_method=CalibrationMethod.MinMax,
+    )
+    prepared.unlink()
+    return {"mode": "static", "calib_images": [p.name for p in images]}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export YOLO model for ONNX Runtime / OpenVINO + INT8")
+    parser.add_argument("--model", default="./seperate-v8s.pt")
+    parser.add_argument("--imgsz", type=int, default=640)
+    parser.add_argument("--opset", type=int, default=12)
+    parser.add_argument("--batch", type=int, default=1, help="static batch size (B > 1 speeds up /scan_batch, live scans pad to B)")
+    parser.add_argument("--calib", default=None, help="folder of plate images for INT8 calibration")
+    parser.add_argument("--calib-images", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--skip-openvino", action="store_true")
+    args = parser.parse_args()
+
+    model_path = Path(args.model).resolve()
+    manifest = {"args": vars(args), "outputs": {}}
+
+    onnx_path = export_onnx(model_path, args.imgsz, args.opset, args.batch)
+    manifest["outputs"]["onnx"] = onnx_path
+
+    int8_path = model_path.with_name(model_path.stem + "-int8.onnx")
+    manifest["int8"] = quantize_int8(onnx_path, int8_path, args.calib, args.imgsz, args.calib_images, args.seed, args.batch)
+    manifest["outputs"]["onnx_int8"] = int8_path
+
+    if not args.skip_openvino:
+        xml_path = export_openvino(model_path, args.imgsz, args.batch)
+        manifest["outputs"]["openvino"] = xml_path
+        manifest["outputs"]["openvino_bin"] = xml_path.with_suffix(".bin")
+
+    for key, path in manifest["outputs"].items():
+        manifest["outputs"][key] = {"path": str(path), "sha256": sha256(path)}
+        print(f"{key:10s} {path}")
+
+    manifest_path = model_path.with_name("export_manifest.json")
+    manifest_path.write_text(json.dumps(manifest, indent=2, ensure_ascii=False), encoding="utf-8")
+    print(f"Manifest: {manifest_path}")
+
+
+if __name__ == "__main__":
+    main()
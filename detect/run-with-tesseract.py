@@ -1,13 +1,23 @@
+import sys
 import cv2
 import time
 import pytesseract
 import numpy as np
 from PIL import Image
+from pathlib import Path
 from ultralytics import YOLO
 
+# camera sources are shared with the Raspberry Pi service (at_raspi/sources.py)
+sys.path.insert(0, str(Path(__file__).resolve().parent / "at_raspi"))
+from sources import open_camera
+
 # Path model YOLOv8s
 MODEL_PATH = './seperate-v8s.pt'
 
+# Camera: webcam index (default 0), /dev/videoN, rtsp://..., video file or image folder
+# usage: python run-with-tesseract.py [source]
+SOURCE = sys.argv[1] if len(sys.argv) > 1 else "0"
+
 # Define Class ID : 0 for char, 1 for province
 CHAR_CLASS_ID = 0
 PROVINCE_CLASS_ID = 1
@@ -122,10 +132,17 @@ except Exception as e:
     exit()
 
 # connect camera
-cap = cv2.VideoCapture(0)
+camera = open_camera({
+    "id": "desktop",
+    "source": "folder" if Path(SOURCE).is_dir() else "opencv",
+    "uri": SOURCE,
+    "loop": False,  # video file / folder: stop at the end like before
+})
 
-if not cap.isOpened():
-    print("❌ Error: Cannot connect to camera")
+try:
+    camera.init_camera()
+except Exception as e:
+    print(f"❌ Error: Cannot connect to camera {SOURCE}, Error detail: {e}")
     exit()
 
 print("Connected camera")
@@ -139,9 +156,9 @@ prev_time = time.time()
 
 try:
     while True:
-        ret, frame = cap.read()
+        frame = camera.capture_frame()
         
-        if not ret:
+        if frame is None:
             print("Can't receive frame (stream end?). Exiting ...")
             break
 
@@ -175,6 +192,6 @@ except Exception as e:
     print(f"An unexpected error occurred in main loop: {e}")
 
 finally:
-    cap.release()
+    camera.close_camera()
     cv2.destroyAllWindows()
     print("Stopped program")